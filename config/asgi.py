@@ -14,3 +14,5 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# uvicorn config.asgi:application --workers 4 (асинхронные маршруты /async/; нужен DATABASE_POOL=True)
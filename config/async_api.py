@@ -0,0 +1,58 @@
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.authentication import AUTH_HEADER_TYPES
+
+from config.renderers import FastJSONRenderer
+from users.authentication import ClaimsJWTAuthentication
+
+
+def json_response(data, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status, headers=headers, content_type='application/json'
+    )
+
+
+async def aauthenticate(request):
+    """Пользователь по JWT из заголовка Authorization или None, если заголовка нет.
+
+    Токен проверяется как в ClaimsJWTAuthentication: при claims в токене пользователь
+    собирается из них без запроса к БД, иначе читается асинхронным ORM.
+    """
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    return await authentication.aget_user(authentication.get_validated_token(raw_token))
+
+
+def async_api_view(require_auth=False):
+    """Асинхронное GET-представление с JWT-аутентификацией и ошибками в формате DRF.
+
+    Представление не уходит в поток синхронного DRF: аутентификация и запросы к БД
+    выполняются асинхронным ORM, ответ рендерится тем же FastJSONRenderer.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return json_response(
+                    {'detail': f'Метод "{request.method}" не разрешен.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED, headers={'Allow': 'GET, HEAD'}
+                )
+            try:
+                request.user = await aauthenticate(request) or AnonymousUser()
+                if require_auth and not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                headers = None
+                if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    headers = {'WWW-Authenticate': f'{AUTH_HEADER_TYPES[0]} realm="api"'}
+                data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+                return json_response(data, status=exc.status_code, headers=headers)
+        return wrapper
+    return decorator
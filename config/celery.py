@@ -1,6 +1,10 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
+from django.db import close_old_connections
+
+from config import metrics
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -12,5 +16,28 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Автоматическое обнаружение и регистрация задач из файлов tasks.py в приложениях Django
 app.autodiscover_tasks()
 
+
+@task_prerun.connect
+@task_postrun.connect
+def close_old_db_connections(task=None, **kwargs):
+    # Как на границах HTTP-запроса: закрываются только устаревшие и оборванные соединения,
+    # остальные переходят к следующей задаче воркера (CONN_MAX_AGE, CONN_HEALTH_CHECKS).
+    # DjangoWorkerFixup этого не делает: при CELERY_DB_REUSE_MAX он закрывает соединение только
+    # раз в столько задач, и без этой проверки после обрыва связи с БД падали бы все задачи до того момента
+    if task is not None and getattr(task.request, 'is_eager', False):
+        return
+    close_old_connections()
+
+
+@task_prerun.connect
+def start_task_metrics(task_id=None, **kwargs):
+    metrics.start_task(task_id)
+
+
+@task_postrun.connect
+def finish_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    metrics.finish_task(task_id, task.name, state)
+
+
 # celery -A config.celery worker --pool=solo -l INFO
 # celery -A config.celery beat -l INFO
@@ -0,0 +1,193 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from habits.cache import public_feed_stats
+
+# Границы корзин гистограмм: время в секундах и число SQL-запросов
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+# Имя метрики: (тип, описание, корзины гистограммы)
+METRICS = {
+    'http_requests_total': ('counter', 'Запросы по представлению, методу и статусу ответа', None),
+    'http_request_duration_seconds': ('histogram', 'Полное время обработки запроса', SECONDS_BUCKETS),
+    'http_request_db_queries': ('histogram', 'SQL-запросов на HTTP-запрос', QUERIES_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Время в БД на HTTP-запрос', SECONDS_BUCKETS),
+    'http_request_render_seconds': ('histogram', 'Время рендеринга ответа (сериализация в JSON)', SECONDS_BUCKETS),
+    'celery_tasks_total': ('counter', 'Задачи Celery по имени и итоговому состоянию', None),
+    'celery_task_duration_seconds': ('histogram', 'Время выполнения задачи Celery', SECONDS_BUCKETS),
+    'celery_task_db_queries': ('histogram', 'SQL-запросов на задачу Celery', QUERIES_BUCKETS),
+    'celery_task_db_seconds': ('histogram', 'Время в БД на задачу Celery', SECONDS_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Последняя ячейка — значения больше верхней границы (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def format_labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """Счетчики и гистограммы в памяти процесса в текстовом формате Prometheus.
+
+    Каждый процесс (воркер WSGI/ASGI, воркер Celery) копит свои значения:
+    Prometheus опрашивает процессы по отдельности и суммирует сам.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels.items()))
+        with self.lock:
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items(), key=lambda item: item[0])
+            lines = []
+            for name, (kind, description, buckets) in METRICS.items():
+                series = [(labels, value) for (metric, labels), value in values if metric == name]
+                if not series:
+                    continue
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+                for labels, value in series:
+                    if kind == 'counter':
+                        lines.append(f'{name}{format_labels(labels)} {value}')
+                        continue
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), value.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{format_labels(labels, le=bound)} {cumulative}')
+                    lines.append(f'{name}_sum{format_labels(labels)} {value.sum}')
+                    lines.append(f'{name}_count{format_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryStats:
+    """Обертка выполнения запросов (``execute_wrapper``): считает SQL-запросы и время в БД."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = None
+        self.stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def start(self):
+        # Соединения потока текущего запроса или задачи; подключение к БД при этом не открывается
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def stop(self):
+        self.stack.close()
+        return time.perf_counter() - self.started
+
+
+def record_request(request, response, stats, elapsed):
+    match = request.resolver_match
+    labels = {'view': match.view_name if match else 'unmatched', 'method': request.method}
+    registry.inc('http_requests_total', {**labels, 'status': response.status_code})
+    registry.observe('http_request_duration_seconds', labels, elapsed)
+    registry.observe('http_request_db_queries', labels, stats.queries)
+    registry.observe('http_request_db_seconds', labels, stats.db_time)
+    if stats.render_time is not None:
+        registry.observe('http_request_render_seconds', labels, stats.render_time)
+
+
+# Замеры выполняющихся задач Celery по task_id
+_task_stats = {}
+
+
+def start_task(task_id):
+    if settings.METRICS_ENABLED:
+        _task_stats[task_id] = QueryStats().start()
+
+
+def finish_task(task_id, task_name, state):
+    stats = _task_stats.pop(task_id, None)
+    if stats is None:
+        return
+    elapsed = stats.stop()
+    labels = {'task': task_name}
+    registry.inc('celery_tasks_total', {**labels, 'state': state or 'UNKNOWN'})
+    registry.observe('celery_task_duration_seconds', labels, elapsed)
+    registry.observe('celery_task_db_queries', labels, stats.queries)
+    registry.observe('celery_task_db_seconds', labels, stats.db_time)
+
+
+def render_public_feed_stats():
+    """Попадания и промахи кеша ленты публичных привычек.
+
+    Счетчики лежат в общем кеше, а не в памяти процесса: все процессы отдают одни и те же
+    значения, поэтому по процессам их берут через max, а не sum.
+    """
+    name = 'public_feed_cache_requests_total'
+    lines = [f'# HELP {name} Обращения к кешу ленты публичных привычек по результату', f'# TYPE {name} counter']
+    for result, value in public_feed_stats().items():
+        lines.append(f'{name}{format_labels((("result", result),))} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Метрики процесса для Prometheus по заголовку ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    Без METRICS_TOKEN эндпоинт не отдается, даже если сбор метрик включен.
+    """
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise Http404
+    expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+        return HttpResponseForbidden()
+    body = registry.render() + render_public_feed_stats()
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
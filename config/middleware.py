@@ -0,0 +1,80 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.middleware.gzip import GZipMiddleware
+
+from config.metrics import QueryStats, record_request
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """GZip для ответов от ``GZIP_MIN_LENGTH`` байт; отключается через ``GZIP_ENABLED``.
+
+    Мелкие ответы не сжимаются: выигрыш в байтах меньше затрат на сжатие.
+    Потоковые ответы (длина заранее неизвестна) сжимаются всегда.
+    """
+
+    def __init__(self, get_response):
+        if not settings.GZIP_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
+
+
+class MetricsMiddleware:
+    """Число SQL-запросов, время в БД, время рендеринга и полное время каждого запроса.
+
+    Значения копятся в гистограммах ``config.metrics`` по имени представления.
+    При ``METRICS_ENABLED = False`` middleware исключается из цепочки и ничего не стоит.
+    Запросы потоковых ответов, выполняемые после возврата ответа, не учитываются.
+    Работает в синхронной и в асинхронной цепочке: под ASGI запрос к асинхронному
+    представлению не переводится из-за middleware в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.query_stats = stats = QueryStats().start()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = stats.stop()
+        record_request(request, response, stats, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        # Соединения с БД принадлежат потоку: асинхронный ORM ходит в базу из потока
+        # sync_to_async(thread_sensitive=True), поэтому и счетчик ставится в нем
+        request.query_stats = stats = await sync_to_async(QueryStats().start)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = await sync_to_async(stats.stop)()
+        record_request(request, response, stats, elapsed)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после всех process_template_response; middleware стоит первым,
+        # поэтому вызывается последним — прямо перед рендерингом
+        started = time.perf_counter()
+
+        def rendered(response):
+            request.query_stats.render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -44,7 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'config.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,15 +77,32 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "django.db.backends.postgresql",
         'NAME': os.getenv('DATABASE_NAME'),
         'USER': os.getenv('DATABASE_USER'),
         'PASSWORD': os.getenv('DATABASE_PASSWORD'),
         'HOST': os.getenv('DATABASE_HOST'),
         'PORT': os.getenv('DATABASE_PORT'),
+        # Постоянные соединения: сколько секунд переиспользовать соединение (0 — новое на каждый запрос)
+        'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+        # Проверять соединение перед повторным использованием, чтобы не получить ошибку на оборванном
+        'CONN_HEALTH_CHECKS': os.getenv('DATABASE_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# Пул соединений psycopg 3 (нужен пакет psycopg[pool]); с пулом постоянные соединения не используются.
+# Под ASGI (config.asgi) пул обязателен: каждый запрос работает с БД в своем потоке, и постоянные соединения
+# не переиспользуются
+if os.getenv('DATABASE_POOL', 'False') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+        },
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -125,6 +144,16 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Таймаут SMTP-соединения в секундах: без него задача зависает на недоступном сервере
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 10))
+
+# Сколько писем отправлять одним SMTP-соединением (одной задачей Celery)
+EMAIL_BATCH_SIZE = 100
+
+# Повторы отправки при временных ошибках SMTP и начальная задержка между ними в секундах
+EMAIL_SEND_RETRIES = 5
+EMAIL_RETRY_BACKOFF = 30
+
 AUTH_USER_MODEL = 'users.CustomUser'
 
 # LOGIN_REDIRECT_URL = 'customers:mailing_list'
@@ -139,16 +168,53 @@ REST_FRAMEWORK = {
 
     # Настройки JWT-токенов
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
+    ],
+
+    # JSON через orjson, если он установлен
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
+# Сжатие ответов gzip и минимальный размер сжимаемого ответа в байтах
+GZIP_ENABLED = os.getenv('GZIP_ENABLED', 'True') == 'True'
+GZIP_MIN_LENGTH = int(os.getenv('GZIP_MIN_LENGTH', 1024))
+
+# Сбор метрик запросов и задач Celery (SQL-запросы, время в БД, рендеринг, полное время) и токен доступа к /metrics/
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 # Настройки срока действия токенов
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # В токены добавляются is_staff и is_active, чтобы не читать пользователя из БД на каждый запрос
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.ClaimsTokenRefreshSerializer',
+}
+
+# Сколько секунд процесс помнит, отзывались ли токены пользователя (блокировка, снятие прав)
+JWT_REVOCATION_CHECK_TTL = int(os.getenv('JWT_REVOCATION_CHECK_TTL', 30))
+
+# Общий кеш для всех процессов (блокировки задач, кеширование ответов)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+    }
 }
 
+# Максимальное количество привычек в одном массовом запросе
+HABITS_BULK_MAX_SIZE = 500
+
+# Сколько строк выгрузки привычек читать из серверного курсора за раз
+HABITS_EXPORT_CHUNK_SIZE = 2000
+
+# Сколько секунд хранить страницы ленты публичных привычек
+PUBLIC_HABITS_CACHE_TIMEOUT = 60
+
 # URL-адрес брокера сообщений
 CELERY_BROKER_URL = 'redis://localhost:6379'
 
@@ -164,15 +230,51 @@ CELERY_TASK_TRACK_STARTED = True
 # Максимальное время на выполнение задачи
 CELERY_TASK_TIME_LIMIT = 30 * 60
 
+# Через сколько задач воркер принудительно переоткрывает соединение с БД; без настройки Celery
+# закрывает соединение до и после каждой задачи, а между ними действует CONN_MAX_AGE
+CELERY_DB_REUSE_MAX = int(os.getenv('CELERY_DB_REUSE_MAX', 100))
+
+# Количество id пользователей в одном шарде рассылки напоминаний
+REMINDER_SHARD_SIZE = 5000
+
+# Окно напоминаний в секундах: на каждом тике рассылаются привычки со сроком до конца окна
+REMINDER_WINDOW = 300
+
 CELERY_BEAT_SCHEDULE = {
     'send-daily-reminders': {
         'task': 'habits.tasks.send_daily_reminders',
-        'schedule': 300.0,  # Каждый день в 9:00 утра
+        'schedule': float(REMINDER_WINDOW),  # Каждые 5 минут — привычки, срок которых подходит
+    },
+    'rollover-habit-statuses': {
+        'task': 'habits.tasks.rollover_habit_statuses',
+        'schedule': crontab(hour=0, minute=5),  # Каждый день после полуночи
     },
 }
 
+# Сколько привычек обновлять одним UPDATE при смене периода
+HABITS_ROLLOVER_BATCH_SIZE = 5000
+
+# Через сколько дней без входа пользователь деактивируется и сколько пользователей деактивировать одним UPDATE
+INACTIVE_USER_DAYS = 30
+USERS_DEACTIVATION_BATCH_SIZE = 5000
+
+# Сколько адресов деактивированных пользователей перечислить в письме-отчете
+USERS_DEACTIVATION_REPORT_SAMPLE = 100
+
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
+# Адрес Bot API (для тестов и бенчмарков можно указать локальный сервер)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# Лимиты Telegram: сообщений в секунду всего и в один чат. Общий лимит делят через кеш
+# все воркеры и шарды рассылки (habits.delivery.SharedRateLimiter)
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_CHAT_RATE = 1
+
+# Количество одновременных запросов к Bot API и повторов при 429/5xx
+TELEGRAM_DELIVERY_CONCURRENCY = 20
+TELEGRAM_DELIVERY_RETRIES = 3
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:8000",
     "http://127.0.0.1:8000",
@@ -5,6 +5,8 @@ from drf_yasg import openapi
 from django.conf import settings
 from django.conf.urls.static import static
 
+from config.metrics import metrics_view
+
 
 # Создает документацию API с использованием Swagger/OpenAPI
 schema_view = get_schema_view(
@@ -26,6 +28,7 @@ urlpatterns = [
     path("registration/", include("users.urls", namespace="registration")),
     re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 
@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from config.async_api import async_api_view, json_response
+from habits.cache import get_public_page, set_public_page
+from habits.conditional import make_etag, not_modified, with_validators
+from habits.models import Habit
+from habits.paginators import AsyncHabitCursorPagination
+from habits.rows import RowSerializer
+from habits.serializers import HabitSerializer
+
+# Асинхронные варианты частых чтений из HabitViewSet (list, retrieve, public) для запуска под ASGI:
+# пока запрос ждет БД, процесс обслуживает другие соединения. Ответы совпадают с синхронными.
+
+
+def user_habits(user):
+    if user.is_authenticated:
+        return Habit.objects.filter(user=user)
+    return Habit.objects.none()
+
+
+async def paginated_rows(request, queryset):
+    rows = RowSerializer(HabitSerializer, context={'request': request})
+    paginator = AsyncHabitCursorPagination()
+    page = await paginator.apaginate_queryset(rows.rows(queryset), Request(request))
+    return paginator.get_paginated_response(rows.to_representation(page)).data
+
+
+@async_api_view()
+async def habit_list(request):
+    queryset = user_habits(request.user)
+    version = await queryset.aaggregate(count=Count('id'), modified=Max('updated_at'))
+    etag = make_etag('habits', request.user.id, version['count'], version['modified'])
+    response = not_modified(request, etag, version['modified'])
+    if response is not None:
+        return response
+
+    data = await paginated_rows(request, queryset)
+    return with_validators(json_response(data), etag, version['modified'])
+
+
+@async_api_view()
+async def habit_detail(request, pk):
+    queryset = user_habits(request.user).filter(pk=pk)
+    version = await queryset.values_list('created_at', 'updated_at').afirst()
+    if version is None:
+        raise exceptions.NotFound()
+
+    etag = make_etag('habit', pk, *version)
+    response = not_modified(request, etag, version[1])
+    if response is not None:
+        return response
+
+    rows = RowSerializer(HabitSerializer, context={'request': request})
+    row = await rows.rows(queryset).afirst()
+    return with_validators(json_response(rows.to_representation([row])[0]), etag, version[1])
+
+
+@async_api_view()
+async def habit_public(request):
+    page = await sync_to_async(get_public_page)(request)
+    if page is not None:
+        data, built_at = page
+        etag = make_etag('public', built_at)
+        response = not_modified(request, etag, built_at)
+        if response is not None:
+            return response
+        return with_validators(json_response(data, headers={'X-Cache': 'HIT'}), etag, built_at)
+
+    data = await paginated_rows(request, Habit.objects.filter(is_public=True))
+    built_at = await sync_to_async(set_public_page)(request, data)
+    return with_validators(json_response(data, headers={'X-Cache': 'MISS'}), make_etag('public', built_at), built_at)
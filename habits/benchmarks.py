@@ -0,0 +1,162 @@
+import random
+import statistics
+import time as timer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.utils import timezone
+
+from habits.models import Habit
+from users.models import CustomUser
+
+
+def seed_habits(users=10, habits_per_user=10, batch_size=2000, seed=0, password=None, prefix=None):
+    """Быстро наполняет базу пользователями и привычками через ``bulk_create``.
+
+    Значения полей распределены так, чтобы выборки по статусу, публичности,
+    связанным привычкам и срокам напоминаний были селективными, как в реальных данных.
+    С ``password`` пользователи могут войти; пароль хешируется один раз на всех.
+    """
+    rnd = random.Random(seed)
+    now = timezone.now()
+    today = timezone.localdate(now)
+    prefix = prefix or f"seed{seed}-{rnd.getrandbits(32):x}"
+    hashed = make_password(password) if password else ""
+
+    created_users = CustomUser.objects.bulk_create(
+        [
+            CustomUser(
+                username=f"{prefix}-{i}",
+                email=f"{prefix}-{i}@example.com",
+                password=hashed,
+                telegram_chat_id=str(i) if i % 2 else None,
+            )
+            for i in range(users)
+        ],
+        batch_size=batch_size,
+    )
+
+    habits = []
+    for user in created_users:
+        for i in range(habits_per_user):
+            status = rnd.choices(["Active", "Completed", "Overdue"], weights=[6, 3, 1])[0]
+            habits.append(Habit(
+                user=user,
+                place="Дом",
+                time=time(rnd.randrange(24), rnd.randrange(60)),
+                action=f"Привычка {i}",
+                is_pleasant=i % 5 == 0,
+                periodicity=rnd.choice([Habit.DAILY, Habit.WEEKLY, Habit.MONTHLY]),
+                status=status,
+                last_completed_on=None if status == "Active" else today - timedelta(days=rnd.randrange(60)),
+                reward=None if i % 5 == 0 else "Награда",
+                duration=rnd.randint(1, 120),
+                is_public=rnd.random() < 0.05,
+                next_due_at=now + timedelta(minutes=rnd.randrange(60 * 24 * 30)),
+            ))
+            if len(habits) >= batch_size:
+                Habit.objects.bulk_create(habits)
+                habits = []
+    if habits:
+        Habit.objects.bulk_create(habits)
+
+    return created_users
+
+
+SEED_USERS_SQL = """
+    INSERT INTO {users} (password, is_superuser, username, first_name, last_name, email,
+                         is_staff, is_active, date_joined, telegram_chat_id)
+    SELECT %(password)s, false, %(prefix)s || '-' || i, '', '', %(prefix)s || '-' || i || '@example.com',
+           false, true, now(), CASE WHEN i %% 2 = 1 THEN i::text END
+    FROM generate_series(%(start)s, %(end)s) AS i
+    RETURNING id
+"""
+
+# Распределения те же, что в seed_habits; случайные значения считаются во вложенном запросе,
+# который PostgreSQL не разворачивает из-за random(), поэтому статус и дата выполнения согласованы
+SEED_HABITS_SQL = """
+    INSERT INTO {habits} (user_id, place, time, action, is_pleasant, periodicity, status, last_completed_on,
+                          reward, duration, is_public, created_at, updated_at, next_due_at,
+                          current_streak, longest_streak)
+    SELECT user_id, 'Дом', make_time(floor(r_hour * 24)::int, floor(r_minute * 60)::int, 0), 'Привычка ' || n,
+           n %% 5 = 0, (ARRAY['daily', 'weekly', 'monthly'])[1 + floor(r_period * 3)::int],
+           CASE WHEN r_status < 0.6 THEN 'Active' WHEN r_status < 0.9 THEN 'Completed' ELSE 'Overdue' END,
+           CASE WHEN r_status >= 0.6 THEN current_date - floor(r_days * 60)::int END,
+           CASE WHEN n %% 5 <> 0 THEN 'Награда' END, 1 + floor(r_duration * 120)::int, r_public < 0.05,
+           now(), now(), now() + floor(r_due * 60 * 24 * 30) * interval '1 minute', 0, 0
+    FROM (
+        SELECT u.id AS user_id, n, random() AS r_hour, random() AS r_minute, random() AS r_period,
+               random() AS r_status, random() AS r_days, random() AS r_duration, random() AS r_public,
+               random() AS r_due
+        FROM unnest(%(user_ids)s::bigint[]) AS u(id) CROSS JOIN generate_series(0, %(last)s) AS n
+    ) AS generated
+"""
+
+
+def seed_habits_sql(users=10, habits_per_user=10, batch_users=10_000, seed=0, password=None, prefix="seed",
+                    progress=None):
+    """Как ``seed_habits``, но строки генерирует сам PostgreSQL (``generate_series``).
+
+    Объекты в Python не создаются, поэтому так можно завести миллионы привычек.
+    ``progress(users_created)`` вызывается после каждой порции пользователей.
+    """
+    hashed = make_password(password) if password else ""
+    users_sql = SEED_USERS_SQL.format(users=connection.ops.quote_name(CustomUser._meta.db_table))
+    habits_sql = SEED_HABITS_SQL.format(habits=connection.ops.quote_name(Habit._meta.db_table))
+
+    with connection.cursor() as cursor:
+        # Тот же seed — те же данные
+        cursor.execute("SELECT setseed(%s)", [random.Random(seed).uniform(-1, 1)])
+        for start in range(0, users, batch_users):
+            end = min(start + batch_users, users) - 1
+            cursor.execute(users_sql, {"password": hashed, "prefix": prefix, "start": start, "end": end})
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(habits_sql, {"user_ids": user_ids, "last": habits_per_user - 1})
+            if progress:
+                progress(end + 1)
+
+
+class Timer:
+    """Замер времени блока: ``with Timer() as t: ...; t.elapsed``."""
+
+    def __enter__(self):
+        self.started = timer.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = timer.perf_counter() - self.started
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с постоянным набором потоков (как gthread-воркер): соединение с БД живет в потоке."""
+
+    def __init__(self, *args, threads=8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) > 1 else values[0] * 1000
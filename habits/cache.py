@@ -0,0 +1,66 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+PUBLIC_VERSION_KEY = "habits:public:version"
+PUBLIC_HITS_KEY = "habits:public:hits"
+PUBLIC_MISSES_KEY = "habits:public:misses"
+
+# Параметры запроса, от которых зависит страница ленты; остальные (метки, мусор) в ключ не попадают
+PUBLIC_PAGE_PARAMS = ("cursor", "page_size")
+
+
+def public_feed_version():
+    """Текущая версия ленты публичных привычек; при изменении ленты версия растет."""
+    version = cache.get(PUBLIC_VERSION_KEY)
+    if version is None:
+        # Начинаем с отметки времени, чтобы после потери ключа не совпасть со старыми версиями
+        cache.add(PUBLIC_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(PUBLIC_VERSION_KEY)
+    return version
+
+
+def invalidate_public_feed():
+    """Делает все закешированные страницы ленты устаревшими."""
+    try:
+        cache.incr(PUBLIC_VERSION_KEY)
+    except ValueError:
+        cache.add(PUBLIC_VERSION_KEY, time.time_ns(), None)
+
+
+def public_page_key(request):
+    # Хост тоже в ключе: ссылки next/previous в странице абсолютные
+    parts = [request.get_host(), *(request.GET.get(name, "") for name in PUBLIC_PAGE_PARAMS)]
+    digest = hashlib.md5("\n".join(parts).encode()).hexdigest()
+    return f"habits:public:{public_feed_version()}:{digest}"
+
+
+def get_public_page(request):
+    """Закешированная страница ленты для запроса: (данные, время построения) или None."""
+    page = cache.get(public_page_key(request))
+    _count(PUBLIC_MISSES_KEY if page is None else PUBLIC_HITS_KEY)
+    return page
+
+
+def set_public_page(request, data):
+    """Кеширует страницу ленты и возвращает время ее построения (для ETag и Last-Modified)."""
+    built_at = timezone.now()
+    cache.set(public_page_key(request), (data, built_at), settings.PUBLIC_HABITS_CACHE_TIMEOUT)
+    return built_at
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def public_feed_stats():
+    """Счетчики попаданий и промахов кеша ленты по всем процессам."""
+    values = cache.get_many([PUBLIC_HITS_KEY, PUBLIC_MISSES_KEY])
+    return {"hits": values.get(PUBLIC_HITS_KEY, 0), "misses": values.get(PUBLIC_MISSES_KEY, 0)}
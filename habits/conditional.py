@@ -0,0 +1,34 @@
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def version_part(value):
+    """Часть версии для ETag: дата-время с точностью до микросекунды или число как есть."""
+    if hasattr(value, 'timestamp'):
+        return int(value.timestamp() * 1_000_000)
+    return 0 if value is None else value
+
+
+def make_etag(*parts):
+    return '"%s"' % "-".join(str(version_part(part)) for part in parts)
+
+
+def not_modified(request, etag, last_modified=None):
+    """Ответ 304 (или 412), если у клиента актуальная версия ресурса, иначе None.
+
+    Проверка идет до сериализации, поэтому неизменившийся ресурс стоит
+    одного легкого запроса к БД (или кешу), без построения тела ответа.
+    """
+    return get_conditional_response(
+        request, etag=etag, last_modified=timegm(last_modified.utctimetuple()) if last_modified else None
+    )
+
+
+def with_validators(response, etag, last_modified=None):
+    """Проставляет ETag и Last-Modified в ответ."""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    return response
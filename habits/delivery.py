@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+
+import urllib3
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ограничитель частоты: не более ``rate`` операций в секунду с запасом ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class SharedRateLimiter:
+    """Ограничитель частоты, общий для всех процессов: не более ``rate`` операций в секунду.
+
+    Каждая секунда делится на ``rate`` слотов, номера слотов раздает ``cache.incr`` по ключу секунды,
+    поэтому параллельные шарды рассылки делят один лимит, а не получают каждый свой.
+    Слоты, время которых уже прошло, пропускаются одним сдвигом счетчика — после простоя
+    не бывает всплеска. Без общего кеша (LocMem) лимит действует в пределах процесса.
+    """
+
+    def __init__(self, rate, key):
+        self.rate = rate
+        self.key = key
+
+    def _claim_slot(self):
+        """Занимает ближайший свободный слот и возвращает время его начала (``time.time()``)."""
+        now = time.time()
+        second = int(now)
+        # Первый слот текущей секунды, который еще не прошел
+        first_slot = int((now - second) * self.rate) + 1
+        while True:
+            key = f"{self.key}:{second}"
+            cache.add(key, 0, timeout=int(second - now) + 2)
+            slot = cache.incr(key)
+            if slot < first_slot:
+                slot = cache.incr(key, first_slot - slot)
+            if slot <= self.rate:
+                return second + (slot - 1) / self.rate
+            # Секунда разобрана — в очередь на следующую
+            second += 1
+            first_slot = 1
+
+    async def acquire(self):
+        # Синхронный incr атомарен и в Redis, и в LocMem; асинхронный aincr в Django — это get и set.
+        # Запрос к кешу уходит в поток, чтобы не останавливать цикл событий
+        starts_at = await asyncio.to_thread(self._claim_slot)
+        delay = starts_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class DeliveryStats:
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self):
+        """Отправленных сообщений в секунду."""
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other):
+        self.sent += other.sent
+        self.failed += other.failed
+        self.retries += other.retries
+        self.elapsed += other.elapsed
+        return self
+
+    def as_dict(self):
+        return {**asdict(self), "throughput": round(self.throughput, 2)}
+
+
+class TelegramDelivery:
+    """Конкурентная отправка сообщений в Telegram Bot API.
+
+    HTTP-запросы идут через общий пул соединений urllib3 в потоках, а asyncio
+    распределяет их с учетом глобального и поканального лимитов Telegram.
+    Глобальный лимит общий для всех процессов (``SharedRateLimiter``): шарды рассылки
+    выполняются параллельно, но вместе не превышают ``TELEGRAM_GLOBAL_RATE``.
+    Ответы 429 и 5xx повторяются с экспоненциальной задержкой.
+    """
+
+    def __init__(self, token=None, api_url=None, global_rate=None, chat_rate=None,
+                 concurrency=None, max_retries=None, backoff=0.5, timeout=10.0):
+        self.token = token or settings.TELEGRAM_BOT_TOKEN
+        self.api_url = (api_url or settings.TELEGRAM_API_URL).rstrip("/")
+        self.global_rate = global_rate or settings.TELEGRAM_GLOBAL_RATE
+        self.chat_rate = chat_rate or settings.TELEGRAM_CHAT_RATE
+        self.concurrency = concurrency or settings.TELEGRAM_DELIVERY_CONCURRENCY
+        self.max_retries = settings.TELEGRAM_DELIVERY_RETRIES if max_retries is None else max_retries
+        self.backoff = backoff
+        self.http = urllib3.PoolManager(
+            maxsize=self.concurrency,
+            block=True,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=False,
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="telegram")
+        # Лимит Telegram действует на бота, поэтому ключ зависит от токена, но не раскрывает его
+        token_digest = hashlib.sha256((self.token or "").encode()).hexdigest()[:16]
+        self.global_limiter = SharedRateLimiter(self.global_rate, f"habits:telegram:rate:{token_digest}")
+
+    @property
+    def send_url(self):
+        return f"{self.api_url}/bot{self.token}/sendMessage"
+
+    def _post(self, chat_id, text):
+        """Блокирующий запрос sendMessage, возвращает (HTTP-статус, тело ответа)."""
+        try:
+            response = self.http.request(
+                "POST",
+                self.send_url,
+                body=json.dumps({"chat_id": chat_id, "text": text}).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+        except urllib3.exceptions.HTTPError as exc:
+            return None, {"description": str(exc)}
+
+        try:
+            payload = json.loads(response.data or b"{}")
+        except ValueError:
+            payload = {}
+        return response.status, payload
+
+    def _retry_delay(self, attempt, status, payload):
+        if status == 429:
+            retry_after = payload.get("parameters", {}).get("retry_after")
+            if retry_after is not None:
+                return float(retry_after)
+        return self.backoff * 2 ** attempt * (1 + random.random() / 2)
+
+    async def _send(self, chat_id, text, stats, chat_buckets, semaphore):
+        if chat_id not in chat_buckets:
+            chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+        chat_bucket = chat_buckets[chat_id]
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            # Лимит чата ждем до семафора: сообщения в один чат не занимают слоты, пока ждут своей очереди
+            await chat_bucket.acquire()
+            async with semaphore:
+                await self.global_limiter.acquire()
+                status, payload = await loop.run_in_executor(self.executor, self._post, chat_id, text)
+
+            if status == 200:
+                stats.sent += 1
+                return
+
+            # 429 и ошибки сервера/сети имеет смысл повторить, остальные 4xx — нет
+            if (status is None or status == 429 or status >= 500) and attempt < self.max_retries:
+                stats.retries += 1
+                await asyncio.sleep(self._retry_delay(attempt, status, payload))
+                continue
+
+            break
+
+        stats.failed += 1
+        logger.warning("Не удалось отправить сообщение в чат %s: %s %s", chat_id, status, payload.get("description"))
+
+    async def deliver_async(self, messages):
+        stats = DeliveryStats()
+        started = time.monotonic()
+
+        chat_buckets = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        await asyncio.gather(*(
+            self._send(chat_id, text, stats, chat_buckets, semaphore)
+            for chat_id, text in messages
+        ))
+
+        stats.elapsed = time.monotonic() - started
+        return stats
+
+    def deliver(self, messages):
+        """Отправляет пары (chat_id, text) и возвращает статистику доставки."""
+        stats = asyncio.run(self.deliver_async(messages))
+        logger.info("Доставка в Telegram: %s", stats.as_dict())
+        return stats
+
+
+_delivery = None
+
+
+def get_delivery():
+    """Общий для процесса экземпляр доставки, чтобы пул соединений переиспользовался между задачами."""
+    global _delivery
+    if _delivery is None:
+        _delivery = TelegramDelivery()
+    return _delivery
+
+
+def deliver_messages(messages):
+    return get_delivery().deliver(messages)
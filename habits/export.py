@@ -0,0 +1,61 @@
+import csv
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from config.renderers import FastJSONRenderer
+
+
+class Echo:
+    """Буфер для ``csv.writer``: записанная строка сразу возвращается, а не копится."""
+
+    def write(self, value):
+        return value
+
+
+def export_batches(rows, queryset, chunk_size):
+    """Порции сериализованных строк из серверного курсора: в памяти не больше ``chunk_size`` строк."""
+    iterator = rows.rows(queryset).iterator(chunk_size=chunk_size)
+    while batch := list(islice(iterator, chunk_size)):
+        yield rows.to_representation(batch)
+
+
+# Ячейки, которые табличные редакторы исполняют как формулы (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """Строка, похожая на формулу, экранируется апострофом; импорт снимает его обратно."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(rows, batches):
+    writer = csv.writer(Echo())
+    names = [name for name, _, _ in rows.columns]
+    yield writer.writerow(names)
+    for batch in batches:
+        yield ''.join(writer.writerow([csv_cell(item[name]) for name in names]) for item in batch)
+
+
+def ndjson_lines(rows, batches):
+    renderer = FastJSONRenderer()
+    for batch in batches:
+        yield b''.join(renderer.render(item) + b'\n' for item in batch)
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
+
+
+def export_response(rows, queryset, file_format, filename, chunk_size=None):
+    """Потоковый ответ с выгрузкой ``queryset`` в CSV или NDJSON; память не зависит от числа строк."""
+    content_type, lines = EXPORT_FORMATS[file_format]
+    batches = export_batches(rows, queryset, chunk_size or settings.HABITS_EXPORT_CHUNK_SIZE)
+    response = StreamingHttpResponse(lines(rows, batches), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
@@ -0,0 +1,295 @@
+import csv
+import io
+import json
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils import timezone
+
+from habits.cache import invalidate_public_feed
+from habits.export import FORMULA_PREFIXES
+from habits.models import Habit
+from habits.scheduling import first_due
+from habits.stats import STATS_REFRESH_BATCH_SIZE, refresh_user_stats
+from users.models import CustomUser
+
+FORMATS = ('json', 'ndjson', 'csv')
+
+# Поля, которые принимаются из файла
+IMPORT_FIELDS = (
+    'id', 'user', 'place', 'time', 'action', 'is_pleasant', 'periodicity', 'status', 'reward', 'duration',
+    'is_public', 'created_at', 'updated_at', 'next_due_at', 'current_streak', 'longest_streak', 'last_completed_on',
+    'related_habit',
+)
+
+# Порция восстановления дат после bulk_create: CASE по id в bulk_update растет квадратично
+TIMESTAMPS_BATCH_SIZE = 500
+
+# Хранится не больше стольких сообщений об ошибках, остальные только считаются
+MAX_STORED_ERRORS = 1000
+
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(file, chunk_size=1 << 16):
+    """Элементы JSON-массива по одному, без чтения всего файла в память."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив')
+
+    pos = 1
+    while True:
+        pos = SEPARATORS.match(buffer, pos).end()
+        if buffer.startswith(']', pos):
+            return
+        try:
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Элемент не поместился в буфер целиком — дочитываем
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        yield item
+
+
+def read_records(file, file_format):
+    """Записи файла по одной: JSON-массив (в том числе фикстура Django), NDJSON или CSV."""
+    if file_format == 'json':
+        return iter_json_array(file)
+    if file_format == 'ndjson':
+        return (json.loads(line) for line in file if line.strip())
+    return ({key: csv_value(value) for key, value in row.items()} for row in csv.DictReader(file))
+
+
+def csv_value(value):
+    # Снимает апостроф, которым выгрузка экранирует ячейки-формулы (habits.export.csv_cell)
+    if value and value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+class HabitImporter:
+    """Массовый импорт привычек, минуя ``save()`` и сигналы.
+
+    Записи проверяются порциями: каждое поле — по всему столбцу порции (``to_python``,
+    варианты выбора, валидаторы), ссылки на пользователей и занятость id — одним
+    запросом на порцию, правила ``Habit.clean`` — по строкам. Корректные строки пишутся
+    ``bulk_create`` или COPY (PostgreSQL); ``created_at`` и id из файла сохраняются.
+    Записи со связанной привычкой откладываются до второго прохода, когда все привычки
+    файла уже в базе, и пишутся только после проверки связи. Ошибочные записи пропускаются.
+    """
+
+    def __init__(self, batch_size=5000, method='insert'):
+        self.batch_size = batch_size
+        self.method = method
+        self.now = timezone.now()
+        self.fields = [Habit._meta.get_field(name) for name in IMPORT_FIELDS]
+        self.aliases = {name: field.attname for field in self.fields for name in (field.name, field.attname)}
+        self.aliases['pk'] = 'id'
+
+        self.imported = 0
+        self.linked = 0
+        self.error_count = 0
+        self.errors = []
+        self.seen_ids = set()
+        self.user_ids = set()
+        self.linked_rows = []
+        self.has_public = False
+
+    def error(self, number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_STORED_ERRORS:
+            self.errors.append((number, message))
+
+    def run(self, records):
+        records = enumerate(records, 1)
+        while batch := list(islice(records, self.batch_size)):
+            self.write(self.validate(batch))
+        self.write_linked()
+        self.finish()
+        return self.imported
+
+    def normalize(self, number, record):
+        if not isinstance(record, dict):
+            self.error(number, 'Запись должна быть объектом')
+            return None
+        if 'fields' in record:
+            # Запись фикстуры: {"model": ..., "pk": ..., "fields": {...}}
+            if record.get('model', 'habits.habit') != 'habits.habit':
+                self.error(number, f"Запись модели {record.get('model')}, а не habits.habit")
+                return None
+            record = {**record['fields'], 'pk': record.get('pk')}
+        # Пустые значения (в том числе пустые ячейки CSV) означают, что поле не указано
+        return {self.aliases[key]: value for key, value in record.items() if key in self.aliases and value != ''}
+
+    def clean_column(self, field, rows, invalid):
+        """Приводит и проверяет значения одного поля во всех строках порции."""
+        choices = {value for value, _ in field.flatchoices} if field.choices else None
+        default = field.get_default() if field.has_default() else None
+        make_aware = settings.USE_TZ and field.get_internal_type() == 'DateTimeField'
+
+        for number, row in rows.items():
+            value = row.get(field.attname)
+            if value is None:
+                value = default
+            if value is None:
+                if not field.null and field.attname not in ('id', 'created_at', 'updated_at', 'next_due_at'):
+                    invalid.setdefault(number, f'{field.name}: обязательное поле')
+                row[field.attname] = None
+                continue
+            try:
+                value = field.to_python(value)
+                if choices is not None and value not in choices:
+                    raise ValidationError(f'недопустимое значение {value!r}')
+                field.run_validators(value)
+            except ValidationError as exc:
+                invalid.setdefault(number, f"{field.name}: {' '.join(exc.messages)}")
+                continue
+            if make_aware and timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            row[field.attname] = value
+
+    def validate(self, batch):
+        rows = {}
+        for number, record in batch:
+            row = self.normalize(number, record)
+            if row is not None:
+                rows[number] = row
+
+        invalid = {}
+        for field in self.fields:
+            self.clean_column(field, rows, invalid)
+        rows = {number: row for number, row in rows.items() if number not in invalid}
+
+        # Ссылки на пользователей и занятость id — по одному запросу на порцию
+        user_ids = {row['user_id'] for row in rows.values()}
+        known_users = set(CustomUser.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        ids = {row['id'] for row in rows.values() if row['id'] is not None}
+        taken = set(Habit.objects.filter(pk__in=ids).values_list('pk', flat=True)) | (ids & self.seen_ids)
+
+        valid = []
+        for number, row in rows.items():
+            message = self.check_row(row, known_users, taken)
+            if message is not None:
+                invalid[number] = message
+                continue
+            if row['id'] is not None:
+                self.seen_ids.add(row['id'])
+                taken.add(row['id'])
+            row['created_at'] = row['created_at'] or self.now
+            row['updated_at'] = row['updated_at'] or self.now
+            row['next_due_at'] = row['next_due_at'] or first_due(row['time'], self.now)
+            if row['related_habit_id'] is not None:
+                # Связанная привычка может идти в файле позже — запись ждет второго прохода
+                self.linked_rows.append((number, row))
+                continue
+            valid.append(row)
+
+        for number, message in sorted(invalid.items()):
+            self.error(number, message)
+        return valid
+
+    def check_row(self, row, known_users, taken):
+        # Правила Habit.clean; приятность связанной привычки проверяется вторым проходом
+        related = row.get('related_habit_id')
+        if row['user_id'] not in known_users:
+            return f"user: пользователь {row['user_id']} не найден"
+        if row['id'] is not None and row['id'] in taken:
+            return f"id: привычка {row['id']} уже существует"
+        if row['reward'] and related is not None:
+            return 'Можно указать либо вознаграждение, либо связанную привычку, но не оба поля одновременно.'
+        if row['is_pleasant'] and (row['reward'] or related is not None):
+            return 'Приятная привычка не может иметь вознаграждения или связанной привычки.'
+        return None
+
+    def write(self, rows):
+        if not rows:
+            return
+        if self.method == 'copy':
+            # Строки без id получают его из последовательности, поэтому пишутся отдельно
+            for with_id in (True, False):
+                group = [row for row in rows if (row['id'] is not None) == with_id]
+                if group:
+                    self.copy_rows([field for field in self.fields if with_id or field.attname != 'id'], group)
+        else:
+            self.insert_rows(rows)
+        self.imported += len(rows)
+        self.user_ids.update(row['user_id'] for row in rows)
+        self.has_public = self.has_public or any(row['is_public'] for row in rows)
+
+    def insert_rows(self, rows):
+        # В PostgreSQL Django вставляет порции bulk_create через UNNEST — по параметру на столбец, а не на значение
+        habits = Habit.objects.bulk_create([Habit(**row) for row in rows], batch_size=self.batch_size)
+        # auto_now_add и auto_now перезаписали даты в pre_save — возвращаем значения из файла
+        for habit, row in zip(habits, rows):
+            habit.created_at, habit.updated_at = row['created_at'], row['updated_at']
+        Habit.objects.bulk_update(
+            habits, ['created_at', 'updated_at'], batch_size=min(self.batch_size, TIMESTAMPS_BATCH_SIZE)
+        )
+
+    @staticmethod
+    def copy_rows(fields, rows):
+        quote = connection.ops.quote_name
+        sql = f"COPY {quote(Habit._meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) FROM STDIN"
+        with connection.cursor() as cursor:
+            db = cursor.db
+            values = [[field.get_db_prep_save(row[field.attname], db) for field in fields] for row in rows]
+            raw = cursor.cursor
+            if hasattr(raw, 'copy'):
+                # psycopg 3: строки передаются как есть, адаптацию делает драйвер
+                with raw.copy(sql) as copy:
+                    for row in values:
+                        copy.write_row(row)
+                return
+            # psycopg2: CSV, где NULL — пустое значение без кавычек, а строки всегда в кавычках
+            buffer = io.StringIO()
+            csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(
+                [[value.isoformat() if hasattr(value, 'isoformat') else value for value in row] for row in values]
+            )
+            buffer.seek(0)
+            raw.copy_expert(f"{sql} WITH (FORMAT csv)", buffer)
+
+    def write_linked(self):
+        """Второй проход: записи со связанной привычкой, когда все привычки файла уже записаны.
+
+        Связь проверяется до записи, поэтому запись с неверной связью не попадает в базу вовсе.
+        """
+        for start in range(0, len(self.linked_rows), self.batch_size):
+            chunk = self.linked_rows[start:start + self.batch_size]
+            pleasant = dict(
+                Habit.objects.filter(
+                    pk__in={row['related_habit_id'] for _, row in chunk}
+                ).values_list('pk', 'is_pleasant')
+            )
+            rows = []
+            for number, row in chunk:
+                related = row['related_habit_id']
+                if related not in pleasant:
+                    self.error(number, f'related_habit: привычка {related} не найдена')
+                elif not pleasant[related]:
+                    self.error(number, 'Связанная привычка должна быть приятной.')
+                else:
+                    rows.append(row)
+            self.write(rows)
+            self.linked += len(rows)
+        self.linked_rows = []
+
+    def finish(self):
+        if self.seen_ids:
+            # id из файла не сдвигают последовательность — следующая привычка получила бы занятый id
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Habit]):
+                    cursor.execute(sql)
+        # Сводки пересчитываются только у пользователей из файла
+        user_ids = sorted(self.user_ids)
+        for start in range(0, len(user_ids), STATS_REFRESH_BATCH_SIZE):
+            refresh_user_stats(user_ids=user_ids[start:start + STATS_REFRESH_BATCH_SIZE])
+        if self.has_public:
+            invalidate_public_feed()
@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+@contextmanager
+def cache_lock(key, timeout):
+    """Неблокирующая блокировка через общий кеш (``cache.add`` атомарен в Redis).
+
+    Отдает ``True``, если блокировка захвачена. Снимается только владельцем,
+    поэтому истекшая по таймауту и перехваченная другим процессом блокировка не удаляется.
+    """
+    token = uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
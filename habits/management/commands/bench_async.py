@@ -0,0 +1,180 @@
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import urllib3
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.benchmarks import PooledWSGIServer, QuietHandler, Timer, percentile, seed_habits
+from habits.models import Habit
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+try:
+    import psycopg_pool
+except ImportError:
+    psycopg_pool = None
+
+# Синхронный маршрут DRF и его асинхронный вариант
+ENDPOINTS = {
+    'list': ('habits:habits-list', 'habits:async-habits-list'),
+    'public': ('habits:habits-public', 'habits:async-habits-public'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный замер: синхронные представления под WSGI (пул потоков) против асинхронных под ASGI (uvicorn)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Запросов на каждый уровень конкурентности')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--threads', type=int, default=8, help='Потоков WSGI-сервера')
+        parser.add_argument('--endpoint', choices=ENDPOINTS, default='list')
+        parser.add_argument(
+            '--slow-clients', type=int, default=4,
+            help='Медленных клиентов, которые держат соединение открытым, не дослав запрос'
+        )
+        parser.add_argument(
+            '--pool-size', type=int, default=20,
+            help='Размер пула соединений psycopg 3 для ASGI (0 — без пула, новое соединение на запрос)'
+        )
+        parser.add_argument(
+            '--db-latency', type=float, default=5.0,
+            help='Искусственная задержка каждого SQL-запроса, мс (имитация удаленной БД)'
+        )
+
+    def handle(self, *args, **options):
+        if uvicorn is None:
+            raise CommandError('Нужен uvicorn: pip install uvicorn (или poetry install -E asgi)')
+
+        self.latency = options['db_latency'] / 1000
+        connection_created.connect(self.add_latency)
+        # Серверы работают в своих потоках и видят только закоммиченные данные, поэтому данные удаляются в конце
+        user = seed_habits(users=1, habits_per_user=20, seed=random.randrange(1 << 30))[0]
+        Habit.objects.filter(user=user).update(is_public=True)
+        try:
+            headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+            sync_name, async_name = ENDPOINTS[options['endpoint']]
+            db_settings = connections.settings['default']
+            wsgi_settings = {'CONN_MAX_AGE': db_settings['CONN_MAX_AGE'], 'OPTIONS': db_settings['OPTIONS']}
+            asgi_settings = self.asgi_settings(db_settings, options['pool_size'])
+
+            self.slow_clients = options['slow_clients']
+            self.stdout.write(
+                f"{'клиентов':>8}  {'сервер':<22} {'запр/с':>8} {'p50, мс':>9} {'p99, мс':>9} {'ошибок':>7}"
+            )
+            for concurrency in options['concurrency']:
+                db_settings.update(wsgi_settings)
+                with self.wsgi_server(options['threads']) as port:
+                    self.report(concurrency, f"WSGI, {options['threads']} потоков", self.run(
+                        f"http://127.0.0.1:{port}{reverse(sync_name)}", headers, options['requests'], concurrency
+                    ))
+                db_settings.update(asgi_settings)
+                with self.asgi_server() as port:
+                    self.report(concurrency, 'ASGI, uvicorn', self.run(
+                        f"http://127.0.0.1:{port}{reverse(async_name)}", headers, options['requests'], concurrency
+                    ))
+                if 'pool' in asgi_settings['OPTIONS']:
+                    connection.close_pool()
+            db_settings.update(wsgi_settings)
+        finally:
+            connection_created.disconnect(self.add_latency)
+            Habit.objects.filter(user=user).delete()
+            user.delete()
+
+    def asgi_settings(self, db_settings, pool_size):
+        # Под ASGI у каждого запроса свой поток для ORM, постоянные соединения не переиспользуются:
+        # соединения берутся из пула, а без него открываются на каждый запрос
+        asgi_settings = {'CONN_MAX_AGE': 0, 'OPTIONS': db_settings['OPTIONS']}
+        if 'pool' in db_settings['OPTIONS'] or not pool_size:
+            return asgi_settings
+        if connection.vendor != 'postgresql' or psycopg_pool is None:
+            self.stdout.write(self.style.WARNING('Пул недоступен (нужен psycopg[pool]): ASGI без пула'))
+            return asgi_settings
+        asgi_settings['OPTIONS'] = {**db_settings['OPTIONS'], 'pool': {'min_size': 2, 'max_size': pool_size}}
+        return asgi_settings
+
+    def add_latency(self, sender, connection, **kwargs):
+        # Задержка добавляется только соединениям, открытым серверами во время замера
+        if self.latency and self.delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.delay)
+
+    def delay(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def report(self, concurrency, label, result):
+        elapsed, results = result
+        latencies = [latency for latency, ok in results if ok]
+        self.stdout.write(
+            f"{concurrency:>8}  {label:<22} {len(latencies) / elapsed:>8.0f} "
+            f"{percentile(latencies, 50):>9.2f} {percentile(latencies, 99):>9.2f} {len(results) - len(latencies):>7}"
+        )
+
+    def run(self, url, headers, count, concurrency):
+        http = urllib3.PoolManager(maxsize=concurrency, retries=False)
+
+        def request(_):
+            with Timer() as timer:
+                response = http.request('GET', url, headers=headers)
+            # Ошибки (например, исчерпанный max_connections в БД) считаются, а не прерывают замер
+            return timer.elapsed, response.status == 200
+
+        request(None)  # прогрев: импорт представлений, первое соединение
+        port = urllib3.util.parse_url(url).port
+        slow = [socket.create_connection(('127.0.0.1', port)) for _ in range(self.slow_clients)]
+        for sock in slow:
+            sock.sendall(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n')
+        try:
+            with Timer() as total, ThreadPoolExecutor(concurrency) as executor:
+                results = list(executor.map(request, range(count)))
+        finally:
+            for sock in slow:
+                sock.close()
+        http.clear()
+        return total.elapsed, results
+
+    def wsgi_server(self, threads):
+        server = PooledWSGIServer(('127.0.0.1', 0), QuietHandler, threads=threads)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return ServerContext(server.server_port, lambda: (server.shutdown(), server.server_close()))
+
+    def asgi_server(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        server = uvicorn.Server(uvicorn.Config(get_asgi_application(), log_level='warning', lifespan='off'))
+        thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        def stop():
+            server.should_exit = True
+            thread.join()
+            sock.close()
+        return ServerContext(sock.getsockname()[1], stop)
+
+
+class ServerContext:
+    """Порт запущенного сервера в ``with``; по выходе сервер останавливается."""
+
+    def __init__(self, port, stop):
+        self.port, self.stop = port, stop
+
+    def __enter__(self):
+        return self.port
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,106 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from wsgiref.simple_server import make_server
+
+import urllib3
+from celery.fixups.django import DjangoWorkerFixup
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.celery import app as celery_app, close_old_db_connections
+from habits.benchmarks import PooledWSGIServer, QuietHandler, Timer, percentile, seed_habits
+from habits.models import Habit
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный замер: новые соединения с БД и p50/p99 запросов и задач без переиспользования и с ним'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--tasks', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.connections_opened = 0
+        self.lock = threading.Lock()
+        connection_created.connect(self.count_connection)
+
+        # Сервер работает в своих потоках и видит только закоммиченные данные, поэтому данные удаляются в конце
+        user = seed_habits(users=1, habits_per_user=20, seed=random.randrange(1 << 30))[0]
+        try:
+            token = str(AccessToken.for_user(user))
+            db_settings = connections.settings['default']
+            configured = (db_settings['CONN_MAX_AGE'], settings.CELERY_DB_REUSE_MAX)
+
+            for label, (max_age, reuse_max) in (('Без переиспользования', (0, None)), ('С настройками', configured)):
+                db_settings['CONN_MAX_AGE'] = max_age
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"{label}: CONN_MAX_AGE={max_age}, CELERY_DB_REUSE_MAX={reuse_max}"
+                ))
+                self.report('HTTP', *self.run_requests(token, options['requests'], options['concurrency']))
+                self.report('Celery', *self.run_tasks(user, options['tasks'], reuse_max))
+
+            db_settings['CONN_MAX_AGE'] = configured[0]
+        finally:
+            Habit.objects.filter(user=user).delete()
+            user.delete()
+            connection_created.disconnect(self.count_connection)
+
+    def count_connection(self, sender, connection, **kwargs):
+        with self.lock:
+            self.connections_opened += 1
+
+    def report(self, label, count, latencies, opened):
+        self.stdout.write(
+            f"{label:<7} {count:>6} шт.  новых соединений: {opened:>5}  "
+            f"p50 {percentile(latencies, 50):6.2f} мс  p99 {percentile(latencies, 99):6.2f} мс"
+        )
+
+    def run_requests(self, token, count, concurrency):
+        server = make_server(
+            '127.0.0.1', 0, get_wsgi_application(), server_class=PooledWSGIServer, handler_class=QuietHandler
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}{reverse('habits:habits-list')}"
+        http = urllib3.PoolManager(maxsize=concurrency)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        def request(_):
+            with Timer() as timer:
+                response = http.request('GET', url, headers=headers)
+            assert response.status == 200, response.status
+            return timer.elapsed
+
+        opened = self.connections_opened
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(request, range(count)))
+        opened = self.connections_opened - opened
+
+        server.shutdown()
+        server.server_close()
+        return count, latencies, opened
+
+    def run_tasks(self, user, count, reuse_max):
+        # Те же обработчики, что вызывает воркер Celery вокруг каждой задачи
+        fixup = DjangoWorkerFixup(celery_app)
+        fixup.db_reuse_max = reuse_max
+        task = SimpleNamespace(request=SimpleNamespace(is_eager=False))
+
+        latencies = []
+        opened = self.connections_opened
+        for _ in range(count):
+            with Timer() as timer:
+                fixup.on_task_prerun(sender=task)
+                close_old_db_connections(task=task)
+                Habit.objects.filter(user=user, status='Active').count()
+                fixup.on_task_postrun(sender=task)
+                close_old_db_connections(task=task)
+            latencies.append(timer.elapsed)
+        return count, latencies, self.connections_opened - opened
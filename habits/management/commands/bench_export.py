@@ -0,0 +1,48 @@
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from habits.benchmarks import Timer, seed_habits
+from habits.export import EXPORT_FORMATS, export_response
+from habits.models import Habit
+from habits.rows import RowSerializer
+from habits.serializers import HabitSerializer
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка привычек против сериализации всего списка: время и пик памяти (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Сколько привычек сгенерировать')
+        parser.add_argument('--chunk-size', type=int, default=settings.HABITS_EXPORT_CHUNK_SIZE)
+
+    def measure(self, label, produce):
+        # Время и пик памяти снимаются разными прогонами: tracemalloc заметно замедляет код
+        with Timer() as timer:
+            size = produce()
+        tracemalloc.start()
+        produce()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(f"{label:<40} {timer.elapsed:7.2f} с  пик памяти {peak / 2 ** 20:8.1f} МБ  {size:>11} байт")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_habits(users=max(1, options['rows'] // 20), habits_per_user=20)
+            queryset = Habit.objects.order_by('id')
+            self.stdout.write(f"Привычек: {queryset.count()}, порция: {options['chunk_size']}")
+
+            self.measure('HabitSerializer(many=True) + JSONRenderer', lambda: len(
+                JSONRenderer().render(HabitSerializer(queryset, many=True).data)
+            ))
+            for file_format in EXPORT_FORMATS:
+                self.measure(f'Потоковая выгрузка, {file_format}', lambda: sum(
+                    len(chunk) for chunk in export_response(
+                        RowSerializer(HabitSerializer), queryset, file_format, 'habits', options['chunk_size']
+                    ).streaming_content
+                ))
+
+            transaction.set_rollback(True)
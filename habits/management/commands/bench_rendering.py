@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from config.renderers import FastJSONRenderer, orjson
+from habits.benchmarks import Timer, seed_habits
+from habits.models import Habit
+from habits.rows import RowSerializer
+from habits.serializers import HabitSerializer
+
+
+class Command(BaseCommand):
+    help = 'Замеряет рендеринг JSON и размер ответа с gzip для страниц привычек (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[5, 20, 100])
+        parser.add_argument('--repeat', type=int, default=200, help='Сколько раз отрендерить каждую страницу')
+
+    def render_time(self, renderer, page, repeat):
+        with Timer() as timer:
+            for _ in range(repeat):
+                renderer.render(page)
+        return timer.elapsed * 1e6 / repeat
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson не установлен: FastJSONRenderer использует JSONRenderer'))
+
+        with transaction.atomic():
+            seed_habits(users=10, habits_per_user=max(options['page_sizes']))
+            rows = RowSerializer(HabitSerializer)
+
+            self.stdout.write(
+                f"{'строк':>6} {'JSONRenderer':>14} {'FastJSON':>12} {'байт':>8} {'gzip':>8}"
+            )
+            for page_size in options['page_sizes']:
+                page = {
+                    'next': f'http://testserver/habits/public/?cursor=cD0yMDI1LTAzLTAx&page_size={page_size}',
+                    'previous': None,
+                    'results': rows.to_representation(rows.rows(Habit.objects.all()[:page_size])),
+                }
+                body = FastJSONRenderer().render(page)
+                self.stdout.write(
+                    f"{page_size:>6} "
+                    f"{self.render_time(JSONRenderer(), page, repeat):>11.1f} мкс "
+                    f"{self.render_time(FastJSONRenderer(), page, repeat):>9.1f} мкс "
+                    f"{len(body):>8} {len(compress_string(body)):>8}"
+                )
+
+            transaction.set_rollback(True)
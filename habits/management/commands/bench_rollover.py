@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from habits.benchmarks import Timer, seed_habits
+from habits.models import Habit
+from habits.tasks import rollover_habit_statuses
+
+
+class Command(BaseCommand):
+    help = 'Замеряет смену периода привычек на сгенерированной таблице (данные откатываются после замера)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Сколько привычек сгенерировать')
+        parser.add_argument('--habits-per-user', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        per_user = options['habits_per_user']
+
+        with transaction.atomic():
+            self.stdout.write(f"Генерация {rows} привычек...")
+            with Timer() as seeding:
+                seed_habits(users=max(1, rows // per_user), habits_per_user=per_user)
+            self.stdout.write(f"Сгенерировано за {seeding.elapsed:.1f} с, всего привычек: {Habit.objects.count()}")
+
+            with Timer() as first:
+                result = rollover_habit_statuses(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Смена периода: {result} за {first.elapsed:.2f} с "
+                f"({(result['reset'] + result['overdue']) / first.elapsed:.0f} строк/с)"
+            ))
+
+            with Timer() as second:
+                repeated = rollover_habit_statuses(batch_size=options['batch_size'])
+            self.stdout.write(f"Повторный запуск: {repeated} за {second.elapsed:.2f} с")
+
+            transaction.set_rollback(True)
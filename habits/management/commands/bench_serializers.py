@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from habits.benchmarks import Timer, seed_habits
+from habits.models import Habit
+from habits.rows import RowSerializer
+from habits.serializers import HabitSerializer
+from users.models import CustomUser
+from users.serializers import CustomUserSerializer
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стоимость сериализации строки: ModelSerializer против .values() (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help='Сколько привычек сгенерировать')
+        parser.add_argument('--habits-per-user', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=3, help='Сколько раз повторить замер (берется лучший)')
+
+    def measure(self, label, serialize, rows, repeat):
+        best, queries = None, 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured, Timer() as timer:
+                serialize()
+            best = timer.elapsed if best is None else min(best, timer.elapsed)
+            queries = len(captured)
+        self.stdout.write(f"{label:<45} {best * 1e6 / rows:8.1f} мкс/строка  {queries:>5} запросов")
+        return best
+
+    def compare(self, title, rows, repeat, variants):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{title}: {rows} строк"))
+        timings = [self.measure(label, serialize, rows, repeat) for label, serialize in variants]
+        self.stdout.write(self.style.SUCCESS(f"Ускорение: x{timings[0] / timings[-1]:.1f}"))
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        per_user = options['habits_per_user']
+
+        with transaction.atomic():
+            seed_habits(users=max(1, rows // per_user), habits_per_user=per_user)
+            habits = Habit.objects.all()
+            users = CustomUser.objects.all()
+            habit_rows = RowSerializer(HabitSerializer)
+            user_rows = RowSerializer(CustomUserSerializer)
+
+            self.compare('Привычки', habits.count(), repeat, [
+                ('HabitSerializer(many=True)', lambda: HabitSerializer(habits.all(), many=True).data),
+                ('RowSerializer + values()', lambda: habit_rows.to_representation(habit_rows.rows(habits))),
+            ])
+            self.compare('Пользователи', users.count(), repeat, [
+                ('CustomUserSerializer (N+1 по groups)', lambda: CustomUserSerializer(users.all(), many=True).data),
+                ('CustomUserSerializer + prefetch_related',
+                 lambda: CustomUserSerializer(users.prefetch_related('groups'), many=True).data),
+                ('RowSerializer + values()', lambda: user_rows.to_representation(user_rows.rows(users))),
+            ])
+
+            transaction.set_rollback(True)
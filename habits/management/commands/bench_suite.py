@@ -0,0 +1,293 @@
+import json
+import platform
+import random
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+import urllib3
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.db.models import F, Min
+from django.db.models.functions import Mod
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from config.celery import app as celery_app
+from config.metrics import QueryStats
+from habits.benchmarks import PooledWSGIServer, QuietHandler, Timer, percentile, seed_habits, seed_habits_sql
+from habits.models import Habit, HabitCompletion, UserHabitStats
+from habits.tasks import send_daily_reminders
+from habits.testing import FakeTelegramServer
+from users.models import CustomUser
+from users.serializers import ClaimsTokenObtainPairSerializer
+from users.tasks import check_last_login
+
+ENDPOINTS = ('list', 'public', 'retrieve', 'login', 'perform')
+PASSWORD = 'bench-password'
+
+# Метрика: чем больше, тем лучше (True) или чем меньше, тем лучше (False)
+HIGHER_IS_BETTER = {'rps': True, 'p50_ms': False, 'p99_ms': False, 'seconds': False, 'queries': False}
+
+
+class Command(BaseCommand):
+    help = (
+        'Набор нагрузочных замеров: запросы/с и p50/p99 основных маршрутов API, время и число SQL-запросов '
+        'задач рассылки и деактивации; результат — JSON для сравнения с прошлым прогоном. '
+        'Запускайте на отдельной БД: сгенерированные данные удаляются в конце, задачи выполняются в откатываемой '
+        'транзакции, Telegram, почта и кеш подменяются локальными заглушками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Сколько пользователей сгенерировать')
+        parser.add_argument('--habits-per-user', type=int, default=10, help='10 000 привычек по умолчанию')
+        parser.add_argument('--requests', type=int, default=1000, help='Запросов на каждый маршрут')
+        parser.add_argument('--login-requests', type=int, default=100, help='Вход дорогой из-за хеширования пароля')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--threads', type=int, default=8, help='Потоков WSGI-сервера')
+        parser.add_argument(
+            '--sample-users', type=int, default=50, help='От имени скольких пользователей слать запросы'
+        )
+        parser.add_argument('--due-percent', type=int, default=1, help='Доля привычек к напоминанию, %%')
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Куда записать результаты в JSON')
+        parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения')
+        parser.add_argument('--tolerance', type=float, default=20.0, help='Допустимое ухудшение метрик, %%')
+        parser.add_argument('--keep', action='store_true', help='Не удалять сгенерированные данные')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+
+        self.prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        results = {'meta': self.meta(options), 'http': {}, 'tasks': {}}
+        eager = celery_app.conf.task_always_eager
+        # Уведомления из perform выполняются в потоке запроса, брокер не нужен
+        celery_app.conf.task_always_eager = True
+        try:
+            with Timer() as seeding:
+                self.seed(options)
+            results['meta']['seed_seconds'] = round(seeding.elapsed, 2)
+            self.stdout.write(f"Данные сгенерированы за {seeding.elapsed:.1f} с")
+
+            with FakeTelegramServer() as telegram, override_settings(
+                TELEGRAM_API_URL=telegram.url, TELEGRAM_BOT_TOKEN='bench',
+                TELEGRAM_GLOBAL_RATE=1_000_000, TELEGRAM_CHAT_RATE=1_000_000,
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            ):
+                results['http'] = self.run_http(options)
+                results['tasks'] = self.run_tasks(options, telegram)
+        finally:
+            celery_app.conf.task_always_eager = eager
+            if not options['keep']:
+                self.cleanup()
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Результаты записаны в {options['output']}")
+        if baseline is not None:
+            self.compare(baseline, results, options['tolerance'])
+
+    def meta(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'commit': commit,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'users': options['users'],
+            'habits': options['users'] * options['habits_per_user'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'threads': options['threads'],
+        }
+
+    def seed(self, options):
+        users, per_user = options['users'], options['habits_per_user']
+        self.stdout.write(f"Генерация {users} пользователей и {users * per_user} привычек ({self.prefix})...")
+        if connection.vendor == 'postgresql':
+            seed_habits_sql(
+                users, per_user, seed=options['seed'], password=PASSWORD, prefix=self.prefix,
+                progress=lambda done: self.stdout.write(f"  пользователей: {done}") if done % 100_000 == 0 else None
+            )
+        else:
+            seed_habits(users, per_user, seed=options['seed'], password=PASSWORD, prefix=self.prefix)
+
+    def seeded_users(self):
+        return CustomUser.objects.filter(username__startswith=f"{self.prefix}-")
+
+    def cleanup(self):
+        # Прямые DELETE без сборщика каскадов Django: на миллионах строк он не уложится в память
+        quote = connection.ops.quote_name
+        users_table = quote(CustomUser._meta.db_table)
+        pattern = f"{self.prefix}-%"
+        with connection.cursor() as cursor:
+            for model in (HabitCompletion, UserHabitStats, Habit):
+                cursor.execute(
+                    f"DELETE FROM {quote(model._meta.db_table)} "
+                    f"WHERE user_id IN (SELECT id FROM {users_table} WHERE username LIKE %s)",
+                    [pattern],
+                )
+            cursor.execute(f"DELETE FROM {users_table} WHERE username LIKE %s", [pattern])
+
+    def requests_for(self, endpoint, options, rnd):
+        """Список запросов (метод, путь, заголовки, тело) к маршруту от имени пользователей выборки."""
+        users = list(self.seeded_users().order_by('id')[:options['sample_users']])
+        tokens = {user.id: f"Bearer {ClaimsTokenObtainPairSerializer.get_token(user).access_token}" for user in users}
+        habits = list(Habit.objects.filter(user__in=users).values_list('id', 'user_id', 'status'))
+        count = options['requests']
+
+        def auth(user_id):
+            return {'Authorization': tokens[user_id]}
+
+        if endpoint == 'list':
+            return [('GET', reverse('habits:habits-list'), auth(rnd.choice(users).id), None) for _ in range(count)]
+        if endpoint == 'public':
+            return [('GET', reverse('habits:habits-public'), auth(rnd.choice(users).id), None) for _ in range(count)]
+        if endpoint == 'retrieve':
+            return [
+                ('GET', reverse('habits:habits-detail', args=[habit_id]), auth(user_id), None)
+                for habit_id, user_id, _ in (rnd.choice(habits) for _ in range(count))
+            ]
+        if endpoint == 'login':
+            return [
+                ('POST', reverse('registration:login'), {'Content-Type': 'application/json'},
+                 json.dumps({'email': rnd.choice(users).email, 'password': PASSWORD}))
+                for _ in range(options['login_requests'])
+            ]
+        # Каждую привычку можно выполнить один раз, поэтому запросов не больше активных привычек выборки
+        active = [(habit_id, user_id) for habit_id, user_id, status in habits if status == 'Active']
+        rnd.shuffle(active)
+        return [
+            ('POST', reverse('habits:habits-perform', args=[habit_id]), auth(user_id), None)
+            for habit_id, user_id in active[:count]
+        ]
+
+    def run_http(self, options):
+        server = PooledWSGIServer(('127.0.0.1', 0), QuietHandler, threads=options['threads'])
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        http = urllib3.PoolManager(maxsize=options['concurrency'])
+        rnd = random.Random(options['seed'])
+
+        def send(request):
+            method, path, headers, body = request
+            with Timer() as timer:
+                response = http.request(method, base + path, headers=headers, body=body)
+            return timer.elapsed, response.status == 200
+
+        results = {}
+        try:
+            for endpoint in options['endpoints']:
+                requests = self.requests_for(endpoint, options, rnd)
+                if not requests:
+                    continue
+                if endpoint in ('list', 'public', 'retrieve'):
+                    # Прогрев: соединения с БД в потоках сервера, кеш ленты
+                    with ThreadPoolExecutor(options['concurrency']) as executor:
+                        list(executor.map(send, requests[:options['concurrency'] * 2]))
+                with ThreadPoolExecutor(options['concurrency']) as executor, Timer() as total:
+                    outcomes = list(executor.map(send, requests))
+                latencies = [elapsed for elapsed, _ in outcomes]
+                results[endpoint] = {
+                    'requests': len(outcomes),
+                    'errors': sum(not ok for _, ok in outcomes),
+                    'rps': round(len(outcomes) / total.elapsed, 1),
+                    'p50_ms': round(percentile(latencies, 50), 2),
+                    'p99_ms': round(percentile(latencies, 99), 2),
+                }
+        finally:
+            server.shutdown()
+            server.server_close()
+        return results
+
+    def run_tasks(self, options, telegram):
+        results = {}
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        # Задачи меняют и чужие строки (деактивация — всех неактивных), поэтому все откатывается
+        with transaction.atomic(), override_settings(CACHES=locmem):
+            # Отсчет от первой сгенерированной привычки — при том же --seed срок подойдет у тех же привычек.
+            # Модуль простой: у пользователя привычки с подряд идущими id, и при % 100 срок подошел бы
+            # только у пользователей с четным номером, а Telegram подключен у нечетных
+            habits = Habit.objects.filter(user__in=self.seeded_users())
+            first_id = habits.aggregate(first_id=Min('id'))['first_id']
+            habits.filter(status='Active', related_habit__isnull=True).alias(
+                bucket=Mod(F('id') - first_id, 101)
+            ).filter(bucket__lt=options['due_percent']).update(next_due_at=timezone.now())
+
+            for name, run in (
+                ('send_daily_reminders', lambda: send_daily_reminders.apply().result),
+                ('check_last_login', check_last_login),
+            ):
+                sent = len(telegram.messages)
+                stats = QueryStats().start()
+                try:
+                    result = run()
+                finally:
+                    seconds = stats.stop()
+                results[name] = {
+                    'seconds': round(seconds, 3),
+                    'queries': stats.queries,
+                    'db_seconds': round(stats.db_time, 3),
+                    'result': result,
+                }
+                if name == 'send_daily_reminders':
+                    results[name]['telegram_messages'] = len(telegram.messages) - sent
+            transaction.set_rollback(True)
+        return results
+
+    def report(self, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'маршрут':<10} {'запросов':>8} {'ошибок':>7} {'запр/с':>9} {'p50, мс':>9} {'p99, мс':>9}"
+        ))
+        for endpoint, values in results['http'].items():
+            self.stdout.write(
+                f"{endpoint:<10} {values['requests']:>8} {values['errors']:>7} {values['rps']:>9.1f} "
+                f"{values['p50_ms']:>9.2f} {values['p99_ms']:>9.2f}"
+            )
+        for task, values in results['tasks'].items():
+            self.stdout.write(
+                f"{task:<22} {values['seconds']:8.3f} с  SQL-запросов: {values['queries']:>6}  "
+                f"в БД: {values['db_seconds']:.3f} с"
+            )
+
+    def compare(self, baseline, results, tolerance):
+        """Сравнивает с прошлым прогоном; ухудшение любой метрики больше ``tolerance`` % — ошибка.
+
+        Число запросов тоже сравнивается с допуском: шарды рассылки выровнены по id пользователей,
+        поэтому их количество, а с ним и число запросов, зависит от того, с какого id начались данные.
+        """
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING('Сравнение с базовым прогоном'))
+        for section in ('http', 'tasks'):
+            for name, values in results[section].items():
+                old_values = baseline.get(section, {}).get(name, {})
+                for metric, higher_is_better in HIGHER_IS_BETTER.items():
+                    if metric not in values or not old_values.get(metric):
+                        continue
+                    old, new = old_values[metric], values[metric]
+                    change = (new - old) / old * 100
+                    worse = -change if higher_is_better else change
+                    regressed = worse > tolerance
+                    line = f"{name:<22} {metric:<8} {old:>10} → {new:<10} {change:+7.1f}%"
+                    self.stdout.write(self.style.ERROR(line) if regressed else line)
+                    if regressed:
+                        regressions.append(f"{name}.{metric}")
+        if regressions:
+            raise CommandError(f"Ухудшились метрики: {', '.join(regressions)}")
@@ -0,0 +1,56 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from habits.benchmarks import Timer
+from habits.importing import FORMATS, HabitImporter, read_records
+
+EXTENSIONS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Массовый импорт привычек из JSON (в том числе фикстур), NDJSON или CSV: '
+        'файл читается потоково, запись идет порциями без save() и сигналов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--format', choices=FORMATS, help='Формат файла (по умолчанию — по расширению)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--method', choices=['insert', 'copy'],
+            help='Запись порциями bulk_create или COPY (только PostgreSQL, по умолчанию в нем)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Проверить файл и откатить запись')
+        parser.add_argument('--show-errors', type=int, default=20, help='Сколько ошибок вывести')
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or EXTENSIONS.get(os.path.splitext(options['path'])[1].lower())
+        if file_format is None:
+            raise CommandError('Не удалось определить формат файла, укажите --format')
+        method = options['method'] or ('copy' if connection.vendor == 'postgresql' else 'insert')
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только в PostgreSQL')
+
+        importer = HabitImporter(batch_size=options['batch_size'], method=method)
+        try:
+            with open(options['path'], encoding='utf-8', newline='') as file, Timer() as timer:
+                with transaction.atomic():
+                    importer.run(read_records(file, file_format))
+                    if options['dry_run']:
+                        transaction.set_rollback(True)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Не удалось прочитать файл: {exc}')
+
+        for number, message in importer.errors[:options['show_errors']]:
+            self.stderr.write(f'Запись {number}: {message}')
+        if importer.error_count:
+            self.stderr.write(self.style.ERROR(f'Пропущено записей с ошибками: {importer.error_count}'))
+
+        verb = 'Проверено (без записи)' if options['dry_run'] else 'Импортировано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: {importer.imported} привычек, связей: {importer.linked} за {timer.elapsed:.2f} с '
+            f'({importer.imported / max(timer.elapsed, 1e-9):.0f} строк/с)'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from habits.benchmarks import Timer
+from habits.stats import STATS_REFRESH_BATCH_SIZE, refresh_all_user_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Полная сверка сводок по привычкам пользователей. Сводки поддерживаются по переходам статусов; '
+        'команда нужна только для починки после правок в обход приложения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=STATS_REFRESH_BATCH_SIZE, help='Пользователей на один запрос'
+        )
+
+    def handle(self, *args, **options):
+        with Timer() as timer:
+            refreshed = refresh_all_user_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано сводок: {refreshed} за {timer.elapsed:.2f} с"))
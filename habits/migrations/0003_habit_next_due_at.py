@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+from habits.scheduling import first_due
+
+
+def schedule_habits(apps, schema_editor):
+    Habit = apps.get_model('habits', 'Habit')
+    batch = []
+    for habit in Habit.objects.filter(next_due_at__isnull=True).only('id', 'time').iterator(chunk_size=2000):
+        habit.next_due_at = first_due(habit.time)
+        batch.append(habit)
+        if len(batch) >= 2000:
+            Habit.objects.bulk_update(batch, ['next_due_at'])
+            batch = []
+    if batch:
+        Habit.objects.bulk_update(batch, ['next_due_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='next_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Следующее напоминание'),
+        ),
+        migrations.RunPython(schedule_habits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0004_habit_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='current_streak',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Текущая серия'),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='last_completed_on',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Последнее выполнение'),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='longest_streak',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Лучшая серия'),
+        ),
+        migrations.CreateModel(
+            name='HabitCompletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_on', models.DateField(verbose_name='Дата выполнения')),
+                ('completed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время выполнения')),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completions', to='habits.habit', verbose_name='Привычка')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Выполнение привычки',
+                'verbose_name_plural': 'Выполнения привычек',
+                'ordering': ['-completed_at'],
+                'indexes': [models.Index(fields=['habit', '-completed_on'], name='completion_habit_date_idx')],
+            },
+        ),
+    ]
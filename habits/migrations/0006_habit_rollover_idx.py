@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0005_habit_completions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['status', 'periodicity', 'last_completed_on'], name='habit_rollover_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0006_habit_rollover_idx'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHabitStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='habit_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('active_count', models.IntegerField(default=0, verbose_name='Активных привычек')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Выполненных привычек')),
+                ('overdue_count', models.IntegerField(default=0, verbose_name='Просроченных привычек')),
+                ('completions_count', models.IntegerField(default=0, verbose_name='Всего выполнений')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Статистика привычек пользователя',
+                'verbose_name_plural': 'Статистика привычек пользователей',
+            },
+        ),
+    ]
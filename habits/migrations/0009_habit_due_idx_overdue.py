@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0008_habit_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='habit',
+            name='habit_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('related_habit__isnull', True), ('status__in', ['Active', 'Overdue'])), fields=['next_due_at'], name='habit_due_idx'),
+        ),
+    ]
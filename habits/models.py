@@ -1,6 +1,92 @@
-from django.db import models
+from django.db import connection, models
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from habits.scheduling import first_due
+from habits.streaks import streak_sql
+from habits.stats import refresh_user_stats
+
+
+class HabitManager(models.Manager):
+    def complete(self, ids, user_id):
+        """Атомарно отмечает выполненными невыполненные привычки пользователя.
+
+        Один запрос PostgreSQL: изменяющие CTE блокируют строки и запоминают прежние статусы,
+        обновляют привычки с проверкой владельца и статуса (повторное нажатие не выполнит
+        привычку дважды) и пересчетом серий, пишут в журнал выполнений по строке на привычку
+        и сдвигают сводку пользователя (``UserHabitStats``) на совершенные переходы.
+        Возвращает строки (id, action, is_public, has_related) только для обновленных привычек.
+        """
+        if not ids:
+            return []
+
+        now = timezone.now()
+        today = timezone.localdate(now)
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        completions = quote(HabitCompletion._meta.db_table)
+        stats = quote(UserHabitStats._meta.db_table)
+
+        update, update_params = self._complete_sql(table, ids, user_id, today, now)
+        lost = ", ".join(
+            f"COUNT(*) FILTER (WHERE old_status = %s) AS lost_{field}"
+            for field in UserHabitStats.STATUS_FIELDS.values()
+        )
+        shifted = ", ".join(
+            f"{field} = {field} - changes.lost_{field}" + (" + changes.done" if status == "Completed" else "")
+            for status, field in UserHabitStats.STATUS_FIELDS.items()
+        )
+        sql = (
+            f"WITH old AS ("
+            f"SELECT id AS old_id, status AS old_status FROM {table} "
+            f"WHERE id IN ({', '.join(['%s'] * len(ids))}) AND user_id = %s AND status <> %s "
+            f"ORDER BY id FOR UPDATE"
+            f"), done AS ("
+            f"{update} FROM old WHERE {table}.id = old.old_id AND {table}.status <> %s "
+            f"RETURNING {table}.id, {table}.action, {table}.is_public, old.old_status, "
+            f"{self._has_related_sql(table)} AS has_related"
+            f"), logged AS ("
+            f"INSERT INTO {completions} (habit_id, user_id, completed_on, completed_at) "
+            f"SELECT id, %s, %s, %s FROM done"
+            f"), changes AS ("
+            f"SELECT COUNT(*) AS done, {lost} FROM done"
+            f"), counted AS ("
+            f"UPDATE {stats} SET {shifted}, completions_count = completions_count + changes.done, updated_at = %s "
+            f"FROM changes WHERE user_id = %s AND changes.done > 0 RETURNING user_id"
+            f") "
+            f"SELECT id, action, is_public, has_related, EXISTS(SELECT 1 FROM counted) FROM done"
+        )
+        params = [
+            *ids, user_id, "Completed",
+            *update_params, "Completed", "Active",
+            user_id, today, now,
+            *UserHabitStats.STATUS_FIELDS,
+            now, user_id,
+        ]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        if rows and not rows[0][4]:
+            # Строки сводки еще нет — считаем ее с нуля уже по новым статусам
+            refresh_user_stats(user_id, user_id + 1)
+        return [(pk, action, is_public, has_related) for pk, action, is_public, has_related, _ in rows]
+
+    def _complete_sql(self, table, ids, user_id, today, now):
+        streak, streak_params = streak_sql(today)
+        sql = (
+            f"UPDATE {table} SET status = %s, last_completed_on = %s, updated_at = %s, "
+            f"current_streak = {streak}, "
+            f"longest_streak = CASE WHEN {streak} > longest_streak THEN {streak} ELSE longest_streak END"
+        )
+        return sql, ["Completed", today, now, *streak_params, *streak_params, *streak_params]
+
+    def _has_related_sql(self, table):
+        return (
+            f"EXISTS(SELECT 1 FROM {table} AS related "
+            f"WHERE related.related_habit_id = {table}.id AND related.status = %s)"
+        )
 
 
 class Habit(models.Model):
@@ -51,11 +137,45 @@ class Habit(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    # Меняется при каждой записи привычки, в том числе массовыми UPDATE; основа ETag/Last-Modified
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+
+    # Когда привычка должна попасть в следующее напоминание; пусто — еще не запланирована
+    next_due_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name='Следующее напоминание'
+    )
+
+    # Серии выполнения обновляются инкрементально при каждом выполнении
+    current_streak = models.PositiveIntegerField(default=0, editable=False, verbose_name='Текущая серия')
+    longest_streak = models.PositiveIntegerField(default=0, editable=False, verbose_name='Лучшая серия')
+    last_completed_on = models.DateField(null=True, blank=True, editable=False, verbose_name='Последнее выполнение')
+
+    objects = HabitManager()
 
     class Meta:
         verbose_name = 'Привычка'
         verbose_name_plural = 'Привычки'
         ordering = ['-created_at']
+        indexes = [
+            # Список привычек пользователя и выборки по статусу
+            models.Index(fields=['user', 'status', '-created_at'], name='habit_user_status_created_idx'),
+            # Лента публичных привычек
+            models.Index(
+                fields=['-created_at', '-id'], condition=models.Q(is_public=True), name='habit_public_created_idx'
+            ),
+            # Связанные привычки: main_habits.filter(status=...)
+            models.Index(fields=['related_habit', 'status'], name='habit_related_status_idx'),
+            # Напоминания: только невыполненные основные привычки по сроку
+            models.Index(
+                fields=['next_due_at'],
+                condition=models.Q(status__in=['Active', 'Overdue'], related_habit__isnull=True),
+                name='habit_due_idx',
+            ),
+            # Смена периода: выборка по статусу, периодичности и дате последнего выполнения
+            models.Index(fields=['status', 'periodicity', 'last_completed_on'], name='habit_rollover_idx'),
+            # Версия списка привычек пользователя для условных запросов: COUNT и MAX(updated_at)
+            models.Index(fields=['user', 'updated_at'], name='habit_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Я буду {self.action} в {self.time} в {self.place}"
@@ -79,15 +199,85 @@ class Habit(models.Model):
                 "Приятная привычка не может иметь вознаграждения или связанной привычки."
             )
 
+    # Поля, исходные значения которых запоминаются при загрузке из БД
+    TRACKED_FIELDS = ('time', 'periodicity', 'is_public', 'status', 'user_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def _remember_loaded_values(self):
+        self._loaded_values = {name: self.__dict__.get(name) for name in self.TRACKED_FIELDS}
+
+    def loaded_value(self, name):
+        """Значение поля на момент загрузки из БД (None для новой привычки)."""
+        return getattr(self, '_loaded_values', {}).get(name)
+
+    def schedule_changed(self):
+        return (self.loaded_value('time'), self.loaded_value('periodicity')) != (self.time, self.periodicity)
+
     def save(self, *args, **kwargs):
         self.full_clean()  # Вызов валидации перед сохранением
+        if self.next_due_at is None or self.schedule_changed():
+            self.next_due_at = first_due(self.time)
         super().save(*args, **kwargs)
+        self._remember_loaded_values()
+
+
+class HabitCompletion(models.Model):
+    """Журнал выполнений привычек: строки только добавляются."""
+
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='completions', verbose_name='Привычка')
+    user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE, verbose_name='Пользователь')
+    completed_on = models.DateField(verbose_name='Дата выполнения')
+    completed_at = models.DateTimeField(default=timezone.now, verbose_name='Время выполнения')
+
+    class Meta:
+        verbose_name = 'Выполнение привычки'
+        verbose_name_plural = 'Выполнения привычек'
+        ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['habit', '-completed_on'], name='completion_habit_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.habit_id} выполнена {self.completed_on}"
+
+
+class UserHabitStats(models.Model):
+    """Сводка по привычкам пользователя, которая обновляется при каждом переходе статуса и выполнении."""
+
+    # Счетчик сводки для каждого статуса привычки
+    STATUS_FIELDS = {
+        "Active": 'active_count',
+        "Completed": 'completed_count',
+        "Overdue": 'overdue_count',
+    }
+
+    user = models.OneToOneField(
+        'users.CustomUser', on_delete=models.CASCADE, primary_key=True,
+        related_name='habit_stats', verbose_name='Пользователь'
+    )
+    active_count = models.IntegerField(default=0, verbose_name='Активных привычек')
+    completed_count = models.IntegerField(default=0, verbose_name='Выполненных привычек')
+    overdue_count = models.IntegerField(default=0, verbose_name='Просроченных привычек')
+    completions_count = models.IntegerField(default=0, verbose_name='Всего выполнений')
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Статистика привычек пользователя'
+        verbose_name_plural = 'Статистика привычек пользователей'
+
+    def __str__(self):
+        return f"Статистика пользователя {self.user_id}"
 
+    @property
+    def total_count(self):
+        return self.active_count + self.completed_count + self.overdue_count
 
-# class HabitCompletion(models.Model):
-#     habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='completions')
-#     completion_date = models.DateTimeField(auto_now_add=True)
-#     user = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE)
-#
-#     class Meta:
-#         ordering = ['-completion_date']
+    @property
+    def completion_rate(self):
+        """Доля выполненных привычек среди всех привычек пользователя (от 0 до 1)."""
+        return round(self.completed_count / self.total_count, 2) if self.total_count else 0.0
@@ -1,6 +1,90 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
 
 
 class MyPagination(PageNumberPagination):
     page_size = 5
     page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class HabitCursorPagination(CursorPagination):
+    """Keyset-пагинация по (created_at, id).
+
+    Вместо OFFSET и COUNT(*) следующая страница выбирается по позиции из курсора,
+    поэтому время ответа не зависит от глубины страницы. В позиции хранится пара
+    (created_at, id) граничной строки: строки с одинаковым created_at различаются по id,
+    и смещение в курсоре не нужно.
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return f"{instance['created_at'].isoformat()}|{instance['id']}"
+        return f"{instance.created_at.isoformat()}|{instance.pk}"
+
+    def position_filter(self, position, reverse):
+        """Строки после позиции в порядке обхода: при обратном обходе — больше нее."""
+        created_at, _, pk = position.rpartition('|')
+        try:
+            created_at, pk = datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'gt' if reverse else 'lt'
+        return Q(**{f'created_at__{lookup}': created_at}) | Q(created_at=created_at, **{f'id__{lookup}': pk})
+
+    def page_queryset(self, queryset, request):
+        """Упорядоченная выборка страницы (с одной лишней строкой) или None, если пагинация отключена."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if self.cursor and self.cursor.position is not None:
+            queryset = queryset.filter(self.position_filter(self.cursor.position, reverse))
+        # Берется на одну строку больше, чтобы узнать о следующей странице
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        reverse, current_position = (self.cursor.reverse, self.cursor.position) if self.cursor else (False, None)
+        self.page = results[:self.page_size]
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position, self.previous_position = following_position, current_position
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+
+class AsyncHabitCursorPagination(HabitCursorPagination):
+    """Та же keyset-пагинация для асинхронных представлений: страница читается асинхронным ORM."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
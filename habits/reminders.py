@@ -0,0 +1,130 @@
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from habits.cache import invalidate_public_feed
+from habits.models import Habit
+from habits.scheduling import next_due_after
+
+# Сколько строк забирать из курсора БД за один раз
+REMINDER_CHUNK_SIZE = 2000
+
+# Сколько пользователей обрабатывать (отправлять и переносить сроки) за раз
+REMINDER_BATCH_SIZE = 100
+
+REMINDER_HEADER = [
+    "🔔 Основные привычки на сегодня:",
+    "Следующие привычки требуют выполнения:"
+]
+
+
+# Статусы, при которых привычке нужны напоминания: просроченная тоже ждет выполнения
+REMINDER_STATUSES = ["Active", "Overdue"]
+
+
+def due_habits(window_end):
+    """Невыполненные основные привычки, срок которых наступает до ``window_end`` или еще не запланирован.
+
+    Выборка идет по индексу ``next_due_at``, поэтому стоимость тика зависит
+    от количества привычек к напоминанию, а не от размера таблицы.
+    """
+    return Habit.objects.filter(
+        Q(next_due_at__lte=window_end) | Q(next_due_at__isnull=True),
+        status__in=REMINDER_STATUSES,
+        related_habit__isnull=True,
+        user__isnull=False,
+    )
+
+
+def user_id_shards(shard_size, window_end):
+    """Диапазоны id пользователей ``[start, end)`` с привычками к напоминанию.
+
+    Границы выровнены по ``shard_size``, поэтому при пересекающихся запусках
+    шарды совпадают и их можно блокировать по ключу диапазона.
+    """
+    bounds = due_habits(window_end).aggregate(min_id=Min("user_id"), max_id=Max("user_id"))
+    if bounds["min_id"] is None:
+        return []
+
+    first = bounds["min_id"] // shard_size * shard_size
+    return [(start, start + shard_size) for start in range(first, bounds["max_id"] + 1, shard_size)]
+
+
+def shard_habits(window_end, start_id=None, end_id=None):
+    """Привычки к напоминанию пользователей с id из ``[start_id, end_id)`` в порядке рассылки."""
+    habits = due_habits(window_end)
+
+    if start_id is not None:
+        habits = habits.filter(user_id__gte=start_id)
+    if end_id is not None:
+        habits = habits.filter(user_id__lt=end_id)
+
+    return habits.order_by("user_id", "-created_at")
+
+
+def reminder_rows(window_end, start_id=None, end_id=None, chunk_size=REMINDER_CHUNK_SIZE):
+    """Строки привычек к напоминанию, сгруппированные по пользователю.
+
+    Каждая строка — (user_id, chat_id, id, periodicity, next_due_at, is_public, action, time, place).
+    Один запрос вместо двух на каждого пользователя: строки читаются через
+    серверный курсор порциями по ``chunk_size``.
+    """
+    return (
+        shard_habits(window_end, start_id, end_id)
+        .values_list(
+            "user_id", "user__telegram_chat_id", "id", "periodicity", "next_due_at", "is_public",
+            "action", "time", "place",
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def build_reminder_text(habits):
+    """Текст напоминания по строкам (action, time, place)."""
+    message_lines = list(REMINDER_HEADER)
+    for action, habit_time, place in habits:
+        message_lines.append(f"- {action} в {habit_time.strftime('%H:%M')} ({place})")
+    return "\n".join(message_lines)
+
+
+def iter_reminders(rows, window_end):
+    """Отдает (chat_id, text, schedule) по одному на пользователя, не загружая всю выборку в память.
+
+    ``schedule`` — тройки (habit_id, next_due_at, is_public) с новыми сроками напоминаний.
+    Для пользователей без chat-id ``text`` пустой, но сроки все равно переносятся,
+    чтобы их привычки не выбирались на каждом тике.
+    """
+    for (user_id, chat_id), user_rows in groupby(rows, key=itemgetter(0, 1)):
+        user_rows = list(user_rows)
+        schedule = [
+            (habit_id, next_due_after(due, periodicity, habit_time, window_end), is_public)
+            for _, _, habit_id, periodicity, due, is_public, _, habit_time, _ in user_rows
+        ]
+        text = build_reminder_text(row[6:] for row in user_rows) if chat_id else ""
+        yield chat_id, text, schedule
+
+
+def reschedule(schedule):
+    """Сохраняет новые сроки напоминаний одним запросом.
+
+    ``schedule`` — тройки (habit_id, next_due_at, is_public), как в ``iter_reminders``.
+    """
+    if schedule:
+        now = timezone.now()
+        Habit.objects.bulk_update(
+            [Habit(id=habit_id, next_due_at=due, updated_at=now) for habit_id, due, _ in schedule],
+            ["next_due_at", "updated_at"],
+        )
+        # Сроки и updated_at есть в ленте публичных привычек, а bulk_update не отправляет post_save.
+        # Перенос только личных привычек ленту не меняет — ее кеш остается
+        if any(is_public for _, _, is_public in schedule):
+            invalidate_public_feed()
+
+
+def batched(iterable, size=REMINDER_BATCH_SIZE):
+    """Разбивает поток на списки длиной не более ``size``."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
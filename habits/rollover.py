@@ -0,0 +1,74 @@
+from datetime import datetime, time
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from habits.models import Habit
+from habits.scheduling import local_timezone, next_due_after
+from habits.stats import record_transitions
+from habits.streaks import period_bounds
+
+
+def transition_in_batches(queryset, batch_size, old_status, new_status, now, reschedule=False):
+    """Переводит привычки ``queryset`` из ``old_status`` в ``new_status`` порциями не больше ``batch_size``.
+
+    Порция выбирается с блокировкой строк (SKIP LOCKED) и обновляется одним UPDATE ... RETURNING
+    в той же транзакции, поэтому параллельный запуск берет другие строки. Сводки владельцев
+    сдвигаются на переходы порции из RETURNING, без пересчета всех привычек. С ``reschedule``
+    тот же UPDATE переносит срок напоминания на ближайший после ``now``. Возвращает число строк.
+    """
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    table = quote(Habit._meta.db_table)
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                queryset.select_for_update(skip_locked=True).order_by()
+                .values_list('pk', 'periodicity', 'next_due_at', 'time')[:batch_size]
+            )
+            if not rows:
+                return total
+
+            assignments = [f"{quote('status')} = %s", f"{quote('updated_at')} = %s"]
+            params = [new_status, adapt(now)]
+            if reschedule:
+                # ELSE по колонке задает тип CASE, поэтому параметры не нужно приводить явно
+                assignments.append(
+                    f"{quote('next_due_at')} = CASE {quote('id')} {' '.join(['WHEN %s THEN %s'] * len(rows))} "
+                    f"ELSE {quote('next_due_at')} END"
+                )
+                for pk, periodicity, due, habit_time in rows:
+                    params += [pk, adapt(next_due_after(due, periodicity, habit_time, now))]
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET {', '.join(assignments)} "
+                    f"WHERE {quote('id')} IN ({', '.join(['%s'] * len(rows))}) RETURNING {quote('user_id')}",
+                    [*params, *(pk for pk, *_ in rows)],
+                )
+                record_transitions([(user_id, old_status, new_status) for user_id, in cursor])
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def rollover_querysets(today):
+    """Пары (привычки к сбросу в «Активный», привычки к отметке «Просроченный») по периодичностям."""
+    for periodicity, _ in Habit.PERIODICITY_CHOICES:
+        current_start, previous_start = period_bounds(periodicity, today)
+        period_started_at = datetime.combine(current_start, time.min, tzinfo=local_timezone())
+        habits = Habit.objects.filter(periodicity=periodicity)
+
+        # Выполнена в одном из прошлых периодов — в новом периоде снова активна, срок переносится вперед
+        reset = habits.filter(status="Completed").filter(
+            Q(last_completed_on__lt=current_start) | Q(last_completed_on__isnull=True)
+        )
+
+        # Активна, но предыдущий период прошел без выполнения
+        overdue = habits.filter(status="Active").filter(
+            Q(last_completed_on__lt=previous_start)
+            | Q(last_completed_on__isnull=True, created_at__lt=period_started_at)
+        )
+
+        yield reset, overdue
@@ -0,0 +1,77 @@
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+
+class RowSerializer:
+    """Отдает строки ``.values()`` в том же виде, что и ``serializer_class``, без модельных объектов.
+
+    Поля и их преобразования берутся из обычного сериализатора один раз на запрос;
+    на строку остается переименование ключей и форматирование дат, времени и файлов.
+    Связи многие-ко-многим добираются одним запросом к промежуточной таблице на страницу.
+    """
+
+    # Поля, значения которых из БД нужно привести к виду, который отдает DRF
+    CONVERTED_FIELDS = (serializers.DateTimeField, serializers.DateField, serializers.TimeField)
+
+    def __init__(self, serializer_class, context=None):
+        self.context = context or {}
+        serializer = serializer_class(context=self.context)
+        self.model = serializer.Meta.model
+        self.columns = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, ManyRelatedField):
+                self.columns.append((name, None, self.model._meta.get_field(field.source)))
+            else:
+                self.columns.append((name, field.source, self._converter(field)))
+
+    def _converter(self, field):
+        if isinstance(field, self.CONVERTED_FIELDS):
+            return field.to_representation
+        if isinstance(field, serializers.FileField):
+            storage = self.model._meta.get_field(field.source).storage
+            request = self.context.get('request')
+
+            def file_url(name):
+                if not name:
+                    return None
+                return request.build_absolute_uri(storage.url(name)) if request else storage.url(name)
+            return file_url
+        return None
+
+    @property
+    def lookups(self):
+        """Колонки для ``queryset.values(...)``."""
+        return ['pk', *(source for _, source, _ in self.columns if source is not None)]
+
+    def rows(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def _related_ids(self, model_field, pks):
+        through = model_field.remote_field.through
+        source, target = f"{model_field.m2m_field_name()}_id", f"{model_field.m2m_reverse_field_name()}_id"
+        related = {pk: [] for pk in pks}
+        for pk, related_pk in through.objects.filter(**{f"{source}__in": pks}).values_list(source, target):
+            related[pk].append(related_pk)
+        return related
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        pks = [row['pk'] for row in rows]
+        related = {
+            name: self._related_ids(model_field, pks) for name, source, model_field in self.columns if source is None
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, converter in self.columns:
+                if source is None:
+                    item[name] = related[name][row['pk']]
+                    continue
+                value = row[source]
+                item[name] = converter(value) if converter is not None and value is not None else value
+            data.append(item)
+        return data
@@ -0,0 +1,58 @@
+import calendar
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def local_timezone():
+    """Часовой пояс, в котором пользователи указывают время привычек."""
+    return ZoneInfo(settings.TIME_ZONE)
+
+
+def add_months(value, months):
+    """Сдвигает дату на ``months`` месяцев, прижимая день к концу короткого месяца."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def first_due(habit_time, after=None):
+    """Первое наступление времени ``habit_time`` (по местному времени) строго после ``after``."""
+    tz = local_timezone()
+    after = (after or timezone.now()).astimezone(tz)
+
+    due = datetime.combine(after.date(), habit_time, tzinfo=tz)
+    if due <= after:
+        due = datetime.combine(after.date() + timedelta(days=1), habit_time, tzinfo=tz)
+    return due
+
+
+def advance_due(due, periodicity):
+    """Следующий срок после ``due`` с учетом периодичности привычки.
+
+    Шаг считается в местном времени, поэтому переход на летнее время
+    не сдвигает напоминание относительно часов пользователя.
+    """
+    from habits.models import Habit
+
+    local = due.astimezone(local_timezone())
+    if periodicity == Habit.WEEKLY:
+        day = local.date() + timedelta(weeks=1)
+    elif periodicity == Habit.MONTHLY:
+        day = add_months(local.date(), 1)
+    else:
+        day = local.date() + timedelta(days=1)
+    return datetime.combine(day, local.timetz())
+
+
+def next_due_after(due, periodicity, habit_time, after):
+    """Ближайший срок позже ``after``; для еще не запланированной привычки — от ее времени."""
+    if due is None:
+        return first_due(habit_time, after)
+
+    while due <= after:
+        due = advance_due(due, periodicity)
+    return due
@@ -1,16 +1,157 @@
+from copy import copy
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from habits.models import Habit
+from rest_framework.settings import api_settings
+
+from habits.cache import invalidate_public_feed
+from habits.models import Habit, UserHabitStats
+from habits.scheduling import first_due
+from habits.stats import habit_transitions, record_transitions
+
+
+class HabitRelatedField(serializers.PrimaryKeyRelatedField):
+    """Связь с привычкой по id; при массовых операциях берется из заранее загруженного словаря ``prefetched``."""
+
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.prefetched[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+def related_habit_ids(data):
+    """Id связанных привычек из элементов запроса, которые похожи на корректные."""
+    ids = set()
+    for item in data if isinstance(data, list) else []:
+        value = item.get('related_habit') if isinstance(item, dict) else None
+        if isinstance(value, str) and value.isdigit():
+            value = int(value)
+        if isinstance(value, int) and not isinstance(value, bool):
+            ids.add(value)
+    return ids
+
+
+class HabitBulkSerializer(serializers.ListSerializer):
+    """Массовое создание и частичное обновление привычек.
+
+    Все элементы проверяются до записи (включая ``Habit.clean``), затем
+    пишутся одним ``bulk_create``/``bulk_update`` в одной транзакции.
+    При обновлении ``instance`` — словарь {id: привычка}.
+    """
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            self.child.instance = self.instance.get(data.get('id'))
+        return super().run_child_validation(data)
+
+    def _build(self, index, attrs):
+        """Привычка в том виде, в каком она будет сохранена (без записи в БД)."""
+        if self.instance is None:
+            return Habit(**attrs)
+
+        habit = copy(self.instance[self.initial_data[index]['id']])
+        for name, value in attrs.items():
+            setattr(habit, name, value)
+        return habit
+
+    def to_internal_value(self, data):
+        # Связанные привычки всех элементов — одним запросом, а не по запросу на элемент
+        related = self.child.fields['related_habit']
+        related.prefetched = Habit.objects.in_bulk(related_habit_ids(data))
+        try:
+            attrs = super().to_internal_value(data)
+        finally:
+            related.prefetched = None
+
+        # Проверки модели — здесь, а не в validate(), чтобы ошибки остались привязаны к элементам списка
+        errors = []
+        for index, item in enumerate(attrs):
+            try:
+                self._build(index, item).clean()
+            except DjangoValidationError as exc:
+                errors.append({api_settings.NON_FIELD_ERRORS_KEY: exc.messages})
+            else:
+                errors.append({})
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        now = timezone.now()
+        habits = [Habit(**attrs) for attrs in validated_data]
+        for habit in habits:
+            habit.next_due_at = first_due(habit.time, now)
+
+        with transaction.atomic():
+            habits = Habit.objects.bulk_create(habits)
+            record_transitions([(habit.user_id, None, habit.status) for habit in habits])
+
+        # bulk_create не отправляет post_save, поэтому ленту сбрасываем сами
+        if any(habit.is_public for habit in habits):
+            invalidate_public_feed()
+        return habits
+
+    def update(self, instance, validated_data):
+        habits = []
+        fields = set()
+        touches_public = False
+
+        now = timezone.now()
+        for item, attrs in zip(self.initial_data, validated_data):
+            habit = instance[item['id']]
+            touches_public |= habit.is_public
+            for name, value in attrs.items():
+                setattr(habit, name, value)
+            # bulk_update не выставляет auto_now сам
+            habit.updated_at = now
+            fields.update(attrs)
+
+            if habit.schedule_changed():
+                habit.next_due_at = first_due(habit.time)
+                fields.add('next_due_at')
+
+            touches_public |= habit.is_public
+            habits.append(habit)
+
+        if fields:
+            with transaction.atomic():
+                Habit.objects.bulk_update(habits, fields | {'updated_at'})
+                record_transitions([change for habit in habits for change in habit_transitions(habit)])
+
+        if touches_public:
+            invalidate_public_feed()
+        return habits
 
 
 class HabitSerializer(serializers.ModelSerializer):
+    serializer_related_field = HabitRelatedField
+
     class Meta:
         model = Habit
         fields = "__all__"
+        list_serializer_class = HabitBulkSerializer
 
     def validate(self, data):
         reward = data.get('reward')
         related_habit = data.get('related_habit')
 
+        # При частичном обновлении недостающие поля берем из привычки
+        if self.partial and self.instance is not None:
+            reward = data.get('reward', self.instance.reward)
+            related_habit = data.get('related_habit', self.instance.related_habit)
+
         if reward and related_habit:
             raise serializers.ValidationError(
                 "Можно указать либо вознаграждение, либо связанную привычку, но не оба"
@@ -25,3 +166,15 @@ class HabitSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         return super().create(validated_data)
+
+
+class UserHabitStatsSerializer(serializers.ModelSerializer):
+    total_count = serializers.IntegerField(read_only=True)
+    completion_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UserHabitStats
+        fields = (
+            'active_count', 'completed_count', 'overdue_count', 'total_count',
+            'completion_rate', 'completions_count', 'updated_at',
+        )
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from habits.cache import invalidate_public_feed
+from habits.models import Habit
+from habits.stats import habit_transitions, record_transitions, refresh_user_stats
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def invalidate_public_habits(sender, instance, **kwargs):
+    # Лента меняется, если привычка публичная сейчас или была публичной до сохранения
+    if instance.is_public or instance.loaded_value('is_public'):
+        invalidate_public_feed()
+
+
+@receiver(post_save, sender=Habit)
+def count_habit_status(sender, instance, raw=False, **kwargs):
+    # Загрузка фикстур пишет строки как есть: сводки потом сверяются целиком
+    if raw:
+        return
+
+    record_transitions(habit_transitions(instance))
+
+
+@receiver(post_delete, sender=Habit)
+def recount_deleted_habit(sender, instance, **kwargs):
+    # Вместе с привычкой каскадом удалены ее выполнения, поэтому сводку владельца пересчитываем
+    if instance.user_id is not None:
+        refresh_user_stats(instance.user_id, instance.user_id + 1)
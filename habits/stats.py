@@ -0,0 +1,121 @@
+from collections import Counter, defaultdict
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+# Сколько пользователей пересчитывать одним запросом при полной сверке
+STATS_REFRESH_BATCH_SIZE = 5000
+
+
+def habit_transitions(habit):
+    """Переходы для ``record_transitions`` от загруженного из БД состояния привычки к текущему."""
+    old_user_id, old_status = habit.loaded_value('user_id'), habit.loaded_value('status')
+    if old_user_id == habit.user_id:
+        return [(habit.user_id, old_status, habit.status)]
+    return [(old_user_id, old_status, None), (habit.user_id, None, habit.status)]
+
+
+def record_transitions(transitions, completions=None):
+    """Сдвигает счетчики сводок на переходы (user_id, старый статус, новый статус).
+
+    Пустой старый статус — привычка появилась у пользователя, пустой новый — ушла от него.
+    ``completions`` — {user_id: сколько выполнений добавилось}. Пользователи с одинаковыми
+    сдвигами обновляются одним UPDATE с F()-выражениями; если строки сводки еще нет, она считается с нуля.
+    """
+    from habits.models import UserHabitStats
+
+    changes = defaultdict(Counter)
+    for user_id, old_status, new_status in transitions:
+        if user_id is None or old_status == new_status:
+            continue
+        if old_status in UserHabitStats.STATUS_FIELDS:
+            changes[user_id][UserHabitStats.STATUS_FIELDS[old_status]] -= 1
+        if new_status in UserHabitStats.STATUS_FIELDS:
+            changes[user_id][UserHabitStats.STATUS_FIELDS[new_status]] += 1
+    for user_id, count in (completions or {}).items():
+        changes[user_id]['completions_count'] += count
+
+    groups = defaultdict(list)
+    for user_id, deltas in changes.items():
+        key = tuple(sorted((field, delta) for field, delta in deltas.items() if delta))
+        if key:
+            groups[key].append(user_id)
+
+    now = timezone.now()
+    for key, user_ids in groups.items():
+        stats = UserHabitStats.objects.filter(user_id__in=user_ids)
+        if stats.update(updated_at=now, **{field: F(field) + delta for field, delta in key}) == len(user_ids):
+            continue
+        existing = set(stats.values_list('user_id', flat=True))
+        for user_id in user_ids:
+            if user_id not in existing:
+                refresh_user_stats(user_id, user_id + 1)
+
+
+def refresh_user_stats(start_id=None, end_id=None, user_ids=None):
+    """Пересчитывает сводки пользователей с id из ``[start_id, end_id)`` одним INSERT ... ON CONFLICT.
+
+    ``user_ids`` дополнительно ограничивает пересчет перечисленными пользователями.
+
+    Используется для первой строки пользователя и для сверки после изменений
+    статусов в обход ``record_transitions`` (загрузка фикстур, правки в БД вручную).
+    """
+    from habits.models import Habit, HabitCompletion, UserHabitStats
+    from users.models import CustomUser
+
+    quote = connection.ops.quote_name
+    stats = quote(UserHabitStats._meta.db_table)
+    habits = quote(Habit._meta.db_table)
+    completions = quote(HabitCompletion._meta.db_table)
+    users = quote(CustomUser._meta.db_table)
+
+    status_counts = [
+        f"(SELECT COUNT(*) FROM {habits} AS h WHERE h.user_id = u.id AND h.status = %s)"
+        for _ in UserHabitStats.STATUS_FIELDS
+    ]
+    # WHERE обязателен: без него SQLite принимает ON CONFLICT за условие соединения
+    conditions, params = ["1 = 1"], [*UserHabitStats.STATUS_FIELDS, timezone.now()]
+    if start_id is not None:
+        conditions.append("u.id >= %s")
+        params.append(start_id)
+    if end_id is not None:
+        conditions.append("u.id < %s")
+        params.append(end_id)
+    if user_ids is not None:
+        conditions.append(f"u.id IN ({', '.join(['%s'] * len(user_ids)) or 'NULL'})")
+        params.extend(user_ids)
+
+    fields = [*UserHabitStats.STATUS_FIELDS.values(), 'completions_count', 'updated_at']
+    sql = (
+        f"INSERT INTO {stats} (user_id, {', '.join(fields)}) "
+        f"SELECT u.id, {', '.join(status_counts)}, "
+        f"(SELECT COUNT(*) FROM {completions} AS c WHERE c.user_id = u.id), %s "
+        f"FROM {users} AS u WHERE {' AND '.join(conditions)} "
+        f"ON CONFLICT (user_id) DO UPDATE SET "
+        + ", ".join(f"{field} = excluded.{field}" for field in fields)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def refresh_all_user_stats(batch_size=STATS_REFRESH_BATCH_SIZE):
+    """Сверка всех сводок диапазонами id пользователей по ``batch_size`` (команда refresh_habit_stats)."""
+    from users.models import CustomUser
+
+    last = CustomUser.objects.order_by('-id').values_list('id', flat=True).first()
+    if last is None:
+        return 0
+    return sum(refresh_user_stats(start, start + batch_size) for start in range(0, last + 1, batch_size))
+
+
+def user_stats(user_id):
+    """Сводка пользователя: одна строка, при первом обращении считается с нуля."""
+    from habits.models import UserHabitStats
+
+    stats = UserHabitStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        refresh_user_stats(user_id, user_id + 1)
+        stats = UserHabitStats.objects.get(user_id=user_id)
+    return stats
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from habits.scheduling import add_months
+
+DAILY, WEEKLY, MONTHLY = 'daily', 'weekly', 'monthly'
+
+# Сколько периодов каждого вида укладывается в окно расчета регулярности
+PERIODS_PER_DAY = {DAILY: 1, WEEKLY: 1 / 7, MONTHLY: 12 / 365}
+
+
+def period_bounds(periodicity, today):
+    """Начала текущего и предыдущего периода привычки для даты ``today``."""
+    if periodicity == WEEKLY:
+        current = today - timedelta(days=today.weekday())
+        return current, current - timedelta(weeks=1)
+    if periodicity == MONTHLY:
+        current = today.replace(day=1)
+        return current, add_months(current, -1)
+    return today, today - timedelta(days=1)
+
+
+def streak_sql(today):
+    """SQL-выражение новой серии при выполнении привычки сегодня и его параметры.
+
+    Серия не меняется при повторном выполнении в том же периоде, растет, если
+    прошлое выполнение было в предыдущем периоде, и начинается заново иначе.
+    Выражение считается по текущей строке в том же UPDATE, без чтения истории.
+    """
+    same, previous, params_same, params_previous = [], [], [], []
+    for periodicity in (DAILY, WEEKLY, MONTHLY):
+        current_start, previous_start = period_bounds(periodicity, today)
+        same.append("(periodicity = %s AND last_completed_on >= %s)")
+        params_same += [periodicity, current_start]
+        previous.append("(periodicity = %s AND last_completed_on >= %s)")
+        params_previous += [periodicity, previous_start]
+
+    sql = (
+        f"CASE WHEN {' OR '.join(same)} THEN current_streak "
+        f"WHEN {' OR '.join(previous)} THEN current_streak + 1 "
+        f"ELSE 1 END"
+    )
+    return sql, params_same + params_previous
+
+
+def current_streak(habit, today=None):
+    """Действующая серия: обнуляется, если предыдущий период пропущен."""
+    today = today or timezone.localdate()
+    if habit.last_completed_on is None:
+        return 0
+
+    _, previous_start = period_bounds(habit.periodicity, today)
+    return habit.current_streak if habit.last_completed_on >= previous_start else 0
+
+
+def adherence(habit, completions, days):
+    """Доля выполненных периодов за последние ``days`` дней (от 0 до 1)."""
+    expected = max(1, round(days * PERIODS_PER_DAY.get(habit.periodicity, 1)))
+    return round(min(1.0, completions / expected), 2)
@@ -1,70 +1,137 @@
-from celery import shared_task
-from telegram import Bot
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from celery import chord, shared_task
 from django.conf import settings
+from django.utils import timezone
 from users.models import CustomUser
 from habits.models import Habit
-
-bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+from habits.delivery import DeliveryStats, deliver_messages
+from habits.locks import cache_lock
+from habits.cache import invalidate_public_feed
+from habits.reminders import batched, iter_reminders, reminder_rows, reschedule, user_id_shards
+from habits.rollover import rollover_querysets, transition_in_batches
 
 
 @shared_task(bind=True)
 def send_daily_reminders(self):
+    """Координатор: выбирает пользователей с наступающими привычками и рассылает их шардами параллельно."""
+    window_end = timezone.now() + timedelta(seconds=settings.REMINDER_WINDOW)
+    shards = user_id_shards(settings.REMINDER_SHARD_SIZE, window_end)
+    if not shards:
+        return {"shards": 0}
 
-    users = CustomUser.objects.filter(
-        telegram_chat_id__isnull=False
-    )
+    chord(
+        send_reminders_shard.s(start_id, end_id, window_end.timestamp()) for start_id, end_id in shards
+    )(finish_daily_reminders.s())
+
+    return {"shards": len(shards)}
 
-    for user in users:
-        chat_id = user.telegram_chat_id
-        if not chat_id:
-            continue
 
-        main_habits = user.habits.filter(
-            status="Active",
-            related_habit__isnull=True
-        )
+@shared_task(bind=True)
+def send_reminders_shard(self, start_id, end_id, window_end):
+    """Рассылает напоминания пользователям с id из ``[start_id, end_id)`` о привычках со сроком до ``window_end``."""
+    result = {"start_id": start_id, "end_id": end_id}
+    window_end = datetime.fromtimestamp(window_end, tz=dt_timezone.utc)
 
-        if main_habits.exists():
-            message_lines = [
-                "🔔 Основные привычки на сегодня:",
-                "Следующие привычки требуют выполнения:"
-            ]
+    # Пересекающиеся запуски beat не должны обрабатывать один и тот же шард дважды
+    lock_key = f"habits:reminders:shard:{start_id}:{end_id}"
+    with cache_lock(lock_key, timeout=settings.CELERY_TASK_TIME_LIMIT) as acquired:
+        if not acquired:
+            return {**result, "skipped": True}
 
-            for habit in main_habits:
-                message_lines.append(
-                    f"- {habit.action} в {habit.time.strftime('%H:%M')} ({habit.place})"
-                )
+        stats = DeliveryStats()
+        rows = reminder_rows(window_end, start_id, end_id)
+        for batch in batched(iter_reminders(rows, window_end)):
+            messages = [(chat_id, text) for chat_id, text, _ in batch if text]
+            if messages:
+                stats.merge(deliver_messages(messages))
+            reschedule([item for _, _, schedule in batch for item in schedule])
 
-            bot.send_message(
-                chat_id=chat_id,
-                text="\n".join(message_lines)
-            )
+    return {**result, "skipped": False, **stats.as_dict()}
 
 
 @shared_task
-def send_related_habits_notification(habit_id, user_id):
-    habit = Habit.objects.get(id=habit_id)
-    user = CustomUser.objects.get(id=user_id)
+def finish_daily_reminders(results):
+    """Сводка по всем шардам рассылки, вызывается после завершения группы."""
+    stats = DeliveryStats()
+    skipped = 0
+
+    for result in results:
+        if result.get("skipped"):
+            skipped += 1
+            continue
+        stats.merge(DeliveryStats(
+            sent=result["sent"], failed=result["failed"], retries=result["retries"], elapsed=result["elapsed"]
+        ))
 
-    if not user.telegram_chat_id:
-        return
+    return {"shards": len(results), "skipped": skipped, **stats.as_dict()}
+
+
+@shared_task
+def send_related_habits_notification(habit_id, user_id):
+    return send_related_habits_notifications(habit_ids=[habit_id], user_id=user_id)
 
-    related_habits = habit.main_habits.filter(status="Active")
 
+def related_habits_message(habit, related_habits):
+    """Текст уведомления о выполнении основной привычки или None, если предложить нечего."""
     message_lines = [
         "🎉 Основная привычка выполнена!",
         "Теперь можно вознаградить себя и выполнить:"
     ]
 
-    if related_habits.exists():
+    if related_habits:
         for h in related_habits:
             message_lines.append(f"- {h.action} в {h.time.strftime('%H:%M')} ({h.place})")
     elif habit.reward:
         message_lines.append(habit.reward)
     else:
+        return None
+
+    return "\n".join(message_lines)
+
+
+@shared_task
+def send_related_habits_notifications(habit_ids, user_id):
+    """Уведомления о выполнении нескольких привычек одного пользователя одной задачей."""
+    user = CustomUser.objects.get(id=user_id)
+
+    if not user.telegram_chat_id:
+        return
+
+    related = defaultdict(list)
+    for h in Habit.objects.filter(related_habit_id__in=habit_ids, status="Active"):
+        related[h.related_habit_id].append(h)
+
+    messages = []
+    for habit in Habit.objects.filter(id__in=habit_ids):
+        text = related_habits_message(habit, related[habit.id])
+        if text:
+            messages.append((user.telegram_chat_id, text))
+
+    if not messages:
         return
 
-    bot.send_message(
-        chat_id=user.telegram_chat_id,
-        text="\n".join(message_lines)
-    )
+    return deliver_messages(messages).as_dict()
+
+
+@shared_task
+def rollover_habit_statuses(batch_size=None):
+    """Начало нового периода: выполненные привычки снова активны, пропущенные — просрочены.
+
+    Работает только множественными UPDATE порциями, строки в Python не перебираются.
+    Повторный или параллельный запуск ничего не меняет повторно.
+    """
+    batch_size = batch_size or settings.HABITS_ROLLOVER_BATCH_SIZE
+    result = {"reset": 0, "overdue": 0}
+
+    # Сначала сброс: привычка, выполненная два периода назад, станет активной и сразу просроченной
+    now = timezone.now()
+    for reset, overdue in rollover_querysets(timezone.localdate(now)):
+        result["reset"] += transition_in_batches(reset, batch_size, "Completed", "Active", now, reschedule=True)
+        result["overdue"] += transition_in_batches(overdue, batch_size, "Active", "Overdue", now)
+
+    if result["reset"] or result["overdue"]:
+        invalidate_public_feed()
+
+    return result
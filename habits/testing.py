@@ -0,0 +1,164 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from config.celery import app as celery_app
+
+
+class FakeTelegramServer:
+    """Локальная заглушка Telegram Bot API для тестов и бенчмарков.
+
+    Принимает ``POST /bot<token>/sendMessage`` и сохраняет отправленные сообщения.
+    В ``failures`` можно заранее положить статусы (429, 500, 400 ...), которые
+    сервер вернет на первые запросы, прежде чем начнет отвечать 200.
+    """
+
+    def __init__(self, failures=None, retry_after=0):
+        self.messages = []
+        self.requests = 0
+        self.failures = list(failures or [])
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                status, body = fake.handle(self.path, payload)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, path, payload):
+        with self.lock:
+            self.requests += 1
+            status = self.failures.pop(0) if self.failures else 200
+
+            if not path.endswith("/sendMessage"):
+                return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+            if status == 429:
+                return 429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+            if status != 200:
+                return status, {"ok": False, "error_code": status, "description": "Error"}
+
+            self.messages.append((str(payload["chat_id"]), payload["text"]))
+            return 200, {"ok": True, "result": {"message_id": len(self.messages)}}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class EagerCeleryMixin:
+    """Выполняет задачи Celery (включая group/chord) синхронно внутри теста."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._task_always_eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+
+    @classmethod
+    def tearDownClass(cls):
+        celery_app.conf.task_always_eager = cls._task_always_eager
+        super().tearDownClass()
+
+
+class ExplainTestMixin:
+    """Проверки планов запросов PostgreSQL: запрос читает таблицу через задуманный индекс.
+
+    Планировщик работает с настройками по умолчанию, поэтому таблицу нужно наполнить
+    реалистичным объемом данных и выполнить ANALYZE (см. ``analyze``): на десятке строк
+    полный перебор дешевле любого индекса, и проверка ничего не докажет.
+    """
+
+    @staticmethod
+    def analyze(*models):
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor != "postgresql":
+            self.skipTest("Планы запросов проверяются только на PostgreSQL")
+
+        plan = queryset.explain()
+        # Index Scan using, Index Only Scan using, Bitmap Index Scan on
+        self.assertRegex(plan, rf"Index (Only )?Scan (using|on) {index_name}\b", msg=f"\n{queryset.query}\n{plan}")
+
+
+class _AssertMaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, maximum, connection):
+        self.test_case = test_case
+        self.maximum = maximum
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        self.test_case.assertLessEqual(
+            executed, self.maximum,
+            "Выполнено запросов: %d, допустимо не больше %d\n%s" % (
+                executed, self.maximum, "\n".join(
+                    f"{number}. {query['sql']}" for number, query in enumerate(self.captured_queries, start=1)
+                ),
+            ),
+        )
+
+
+class QueryCountMixin:
+    """Проверки числа SQL-запросов: потолок на вызов и независимость от размера выборки."""
+
+    def assertMaxQueries(self, maximum, using=DEFAULT_DB_ALIAS):
+        """Как ``assertNumQueries``, но допускает и меньшее число запросов."""
+        return _AssertMaxQueriesContext(self, maximum, connections[using])
+
+    def assertQueriesDoNotScale(self, request, sizes, maximum, using=DEFAULT_DB_ALIAS):
+        """Вызывает ``request(size)`` для каждого размера: запросов везде поровну и не больше ``maximum``.
+
+        Рост числа запросов вместе с размером страницы или пакета — признак N+1.
+        """
+        counts = {}
+        for size in sizes:
+            with self.assertMaxQueries(maximum, using=using) as captured:
+                request(size)
+            counts[size] = len(captured)
+        self.assertEqual(
+            len(set(counts.values())), 1, f"Число запросов зависит от размера (размер: запросов): {counts}"
+        )
+        return counts
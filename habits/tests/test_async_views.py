@@ -0,0 +1,128 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.models import Habit
+from users import authentication
+from users.models import CustomUser
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='async', email='async@example.com', password='pass12345')
+        self.other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pass12345')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+        for number in range(7):
+            self.create_habit(self.user, f'Привычка {number}', is_public=number % 2 == 0)
+        self.create_habit(self.other, 'Чужая', is_public=True)
+
+    def use_claims_token(self):
+        authentication._current_claims.clear()
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def create_habit(self, user, action, **extra):
+        return Habit.objects.create(
+            user=user, action=action, time='08:00', place='Дом', duration=60, reward='Награда', **extra
+        )
+
+    def assertSameResponse(self, sync_url, async_url, **headers):
+        expected = self.client.get(sync_url, **self.auth, **headers)
+        actual = self.client.get(async_url, **self.auth, **headers)
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.json(), json.loads(json.dumps(expected.json()).replace('/habits/', '/async/habits/')))
+        return actual
+
+    def test_list_matches_sync_view_across_pages(self):
+        sync_url, async_url = reverse('habits:habits-list'), reverse('habits:async-habits-list')
+        response = self.assertSameResponse(f'{sync_url}?page_size=3', f'{async_url}?page_size=3')
+        self.assertEqual(len(response.json()['results']), 3)
+
+        next_page = response.json()['next']
+        self.assertSameResponse(next_page.replace('/async/habits/', '/habits/'), next_page)
+
+    async def test_served_by_asgi_handler(self):
+        response = await self.async_client.get(
+            reverse('habits:async-habits-list'), headers={'Authorization': self.auth['HTTP_AUTHORIZATION']}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_list_not_modified(self):
+        url = reverse('habits:async-habits-list')
+        first = self.client.get(url, **self.auth)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'], **self.auth).status_code, 304)
+
+    def test_list_anonymous_is_empty(self):
+        response = self.client.get(reverse('habits:async-habits-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_detail_matches_sync_view(self):
+        habit = Habit.objects.filter(user=self.user).first()
+        self.assertSameResponse(
+            reverse('habits:habits-detail', args=[habit.pk]), reverse('habits:async-habits-detail', args=[habit.pk])
+        )
+
+    def test_detail_of_other_user_not_found(self):
+        habit = Habit.objects.get(user=self.other)
+        response = self.client.get(reverse('habits:async-habits-detail', args=[habit.pk]), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_public_matches_sync_view_and_is_cached(self):
+        url = reverse('habits:async-habits-public')
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(len(first.json()['results']), 5)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+
+    def test_invalid_token_rejected(self):
+        response = self.client.get(reverse('habits:async-habits-list'), HTTP_AUTHORIZATION='Bearer invalid')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_write_methods_not_allowed(self):
+        response = self.client.post(reverse('habits:async-habits-list'), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_user_detail(self):
+        own = self.assertSameResponse(
+            reverse('registration:users_detail', args=[self.user.email]),
+            reverse('registration:async_users_detail', args=[self.user.email]),
+        )
+        self.assertIn('last_name', own.json())
+
+        other = self.assertSameResponse(
+            reverse('registration:users_detail', args=[self.other.email]),
+            reverse('registration:async_users_detail', args=[self.other.email]),
+        )
+        self.assertNotIn('last_name', other.json())
+
+        response = self.client.get(reverse('registration:async_users_detail', args=[self.other.email]))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_claims_token_skips_user_lookup(self):
+        self.use_claims_token()
+        self.test_user_detail()
+        # Только строка профиля: пользователь запроса собирается из claims токена
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('registration:async_users_detail', args=[self.user.email]), **self.auth)
+        self.assertIn('last_name', response.json())
+
+    def test_revoked_claims_token_rejected(self):
+        self.use_claims_token()
+        authentication.publish_claims({self.user.pk: {'is_active': False}})
+        response = self.client.get(reverse('habits:async-habits-list'), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'token_revoked')
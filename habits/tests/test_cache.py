@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from habits.cache import public_feed_stats
+from habits.models import Habit
+from habits.reminders import reschedule
+from users.models import CustomUser
+
+
+class PublicFeedCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpass123'
+        )
+        self.public_habit = self.create_habit('Публичная', is_public=True)
+        self.private_habit = self.create_habit('Личная', is_public=False)
+        self.url = reverse('habits:habits-public')
+
+    def create_habit(self, action, is_public):
+        return Habit.objects.create(
+            user=self.user,
+            action=action,
+            time='08:00',
+            place='Дом',
+            duration=60,
+            is_public=is_public,
+            reward='Награда'
+        )
+
+    def get_feed(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_second_request_is_served_from_cache(self):
+        self.assertEqual(self.get_feed()['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get_feed()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(public_feed_stats(), {'hits': 1, 'misses': 1})
+
+    def test_new_public_habit_invalidates_feed(self):
+        self.get_feed()
+        self.create_habit('Еще публичная', is_public=True)
+        response = self.get_feed()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_habit_made_private_invalidates_feed(self):
+        self.get_feed()
+        habit = Habit.objects.get(pk=self.public_habit.pk)
+        habit.is_public = False
+        habit.save()
+        response = self.get_feed()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_deleted_public_habit_invalidates_feed(self):
+        self.get_feed()
+        self.public_habit.delete()
+        self.assertEqual(len(self.get_feed().data['results']), 0)
+
+    def test_private_changes_keep_cache(self):
+        self.get_feed()
+        self.private_habit.action = 'Изменена'
+        self.private_habit.save()
+        self.assertEqual(self.get_feed()['X-Cache'], 'HIT')
+
+    def test_pages_are_cached_separately(self):
+        self.create_habit('Вторая', is_public=True)
+        first = self.client.get(self.url, {'page_size': 1})
+        second = self.client.get(first.data['next'])
+        self.assertNotEqual(first.data['results'], second.data['results'])
+        self.assertEqual(second['X-Cache'], 'MISS')
+
+    def test_unrelated_params_share_cache(self):
+        self.get_feed()
+        response = self.client.get(self.url, {'utm_source': 'mail', 'x': '1'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_reminders_invalidate_feed(self):
+        self.get_feed()
+        reschedule([(self.public_habit.pk, timezone.now(), True)])
+        self.assertEqual(self.get_feed()['X-Cache'], 'MISS')
+
+    def test_private_reminders_keep_cache(self):
+        self.get_feed()
+        reschedule([(self.private_habit.pk, timezone.now(), False)])
+        self.assertEqual(self.get_feed()['X-Cache'], 'HIT')
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from habits.models import Habit
+from users.models import CustomUser
+
+
+class ConditionalRequestsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='etag',
+            email='etag@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.habit = self.create_habit('Зарядка')
+        self.detail_url = reverse('habits:habits-detail', args=[self.habit.id])
+        self.list_url = reverse('habits:habits-list')
+
+    def create_habit(self, action, **extra):
+        return Habit.objects.create(
+            user=self.user, action=action, time='08:00', place='Дом', duration=60, reward='Награда', **extra
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_retrieve_not_modified(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', first)
+
+        # Только выборка версии привычки, без загрузки и сериализации
+        with self.assertNumQueries(1):
+            second = self.revalidate(self.detail_url, first)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second.content, b'')
+
+    def test_retrieve_modified_after_update(self):
+        first = self.client.get(self.detail_url)
+        self.client.patch(self.detail_url, {'place': 'Парк'}, format='json')
+        second = self.revalidate(self.detail_url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data['place'], 'Парк')
+
+    @patch('habits.views.send_related_habits_notification.delay')
+    def test_list_changes_on_perform_create_and_delete(self, mock_delay):
+        first = self.client.get(self.list_url)
+        self.assertEqual(self.revalidate(self.list_url, first).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse('habits:habits-perform', args=[self.habit.id]))
+        second = self.revalidate(self.list_url, first)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+
+        self.create_habit('Чтение')
+        third = self.revalidate(self.list_url, second)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+
+        Habit.objects.get(action='Чтение').delete()
+        self.assertEqual(self.revalidate(self.list_url, third).status_code, status.HTTP_200_OK)
+
+    def test_list_if_modified_since(self):
+        first = self.client.get(self.list_url)
+        second = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_public_not_modified_until_feed_changes(self):
+        self.create_habit('Публичная', is_public=True)
+        url = reverse('habits:habits-public')
+        first = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            second = self.revalidate(url, first)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.create_habit('Еще публичная', is_public=True)
+        third = self.revalidate(url, first)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(third.data['results']), 2)
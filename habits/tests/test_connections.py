@@ -0,0 +1,60 @@
+import time
+from unittest.mock import patch
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase
+
+from habits.tasks import rollover_habit_statuses
+
+
+class WorkerConnectionsTestCase(TransactionTestCase):
+    def run_task(self, is_eager=False):
+        # Границы задачи воркера: те же сигналы, что отправляет Celery вокруг выполнения
+        rollover_habit_statuses.push_request(is_eager=is_eager)
+        try:
+            task_prerun.send(sender=rollover_habit_statuses, task_id='task', task=rollover_habit_statuses)
+            rollover_habit_statuses.run()
+            task_postrun.send(
+                sender=rollover_habit_statuses, task_id='task', task=rollover_habit_statuses, state='SUCCESS'
+            )
+        finally:
+            rollover_habit_statuses.pop_request()
+
+    def connect(self, max_age):
+        connection.ensure_connection()
+        connection.close_at = time.monotonic() + max_age
+
+    def test_connection_is_reused_between_tasks(self):
+        self.connect(max_age=60)
+        raw = connection.connection
+        with patch.object(connection, 'close', wraps=connection.close) as close:
+            self.run_task()
+            self.run_task()
+        close.assert_not_called()
+        self.assertIs(connection.connection, raw)
+
+    def test_obsolete_connection_is_closed(self):
+        self.connect(max_age=-1)
+        with patch.object(connection, 'close', wraps=connection.close) as close:
+            self.run_task()
+        close.assert_called()
+
+    def test_broken_connection_is_closed(self):
+        self.connect(max_age=60)
+        connection.errors_occurred = True
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close', wraps=connection.close) as close:
+            self.run_task()
+        close.assert_called()
+
+    def test_eager_task_keeps_connection(self):
+        # Задача внутри вызывающего кода (тесты, task_always_eager) не должна рвать его транзакцию
+        self.connect(max_age=-1)
+        with patch.object(connection, 'close', wraps=connection.close) as close:
+            self.run_task(is_eager=True)
+        close.assert_not_called()
+
+    def test_workers_do_not_close_connection_after_every_task(self):
+        self.assertTrue(settings.CELERY_DB_REUSE_MAX)
@@ -0,0 +1,136 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from habits.delivery import SharedRateLimiter, TelegramDelivery, TokenBucket
+from habits.testing import FakeTelegramServer
+
+
+class TelegramDeliveryTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def make_delivery(self, server, **kwargs):
+        options = {
+            "token": "123:TEST",
+            "api_url": server.url,
+            "global_rate": 1000,
+            "chat_rate": 1000,
+            "concurrency": 10,
+            "max_retries": 3,
+            "backoff": 0,
+        }
+        options.update(kwargs)
+        return TelegramDelivery(**options)
+
+    def test_delivers_all_messages(self):
+        messages = [(str(i), f"Сообщение {i}") for i in range(50)]
+        with FakeTelegramServer() as server:
+            stats = self.make_delivery(server).deliver(messages)
+
+        self.assertEqual(stats.sent, 50)
+        self.assertEqual(stats.failed, 0)
+        self.assertEqual(sorted(server.messages), sorted(messages))
+        self.assertGreater(stats.throughput, 0)
+
+    def test_retries_rate_limit_and_server_errors(self):
+        with FakeTelegramServer(failures=[429, 500, 502]) as server:
+            stats = self.make_delivery(server, concurrency=1).deliver([("1", "Привет")])
+
+        self.assertEqual(stats.sent, 1)
+        self.assertEqual(stats.retries, 3)
+        self.assertEqual(server.requests, 4)
+
+    def test_client_error_is_not_retried(self):
+        with FakeTelegramServer(failures=[400]) as server:
+            stats = self.make_delivery(server).deliver([("1", "Привет")])
+
+        self.assertEqual(stats.sent, 0)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(server.requests, 1)
+
+    def test_gives_up_after_max_retries(self):
+        with FakeTelegramServer(failures=[500] * 5) as server:
+            stats = self.make_delivery(server, max_retries=2).deliver([("1", "Привет")])
+
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(server.requests, 3)
+
+    def test_per_chat_rate_limit(self):
+        with FakeTelegramServer() as server:
+            started = time.monotonic()
+            stats = self.make_delivery(server, chat_rate=10).deliver([("1", str(i)) for i in range(4)])
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(stats.sent, 4)
+        # Первое сообщение уходит сразу, остальные — не чаще 10 в секунду
+        self.assertGreaterEqual(elapsed, 0.3)
+
+    def test_busy_chat_does_not_hold_slots(self):
+        # Сообщения в чат с исчерпанным лимитом ждут вне семафора, и другой чат получает свое сразу
+        messages = [("1", str(i)) for i in range(4)] + [("2", "Другой чат")]
+        with FakeTelegramServer() as server:
+            self.make_delivery(server, chat_rate=5, concurrency=1).deliver(messages)
+
+        self.assertLess(server.messages.index(("2", "Другой чат")), 2)
+
+    def test_parallel_shards_share_global_rate(self):
+        # Два шарда рассылки в отдельных потоках со своими экземплярами доставки: лимит у них общий
+        with FakeTelegramServer() as server:
+            shards = [self.make_delivery(server, global_rate=20) for _ in range(2)]
+            batches = [[(f"{shard}-{i}", "Привет") for i in range(5)] for shard in range(2)]
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                results = list(executor.map(TelegramDelivery.deliver, shards, batches))
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(sum(stats.sent for stats in results), 10)
+        # 10 сообщений при 20 в секунду на двоих: последнее не раньше чем через 9 слотов по 0.05 с
+        self.assertGreaterEqual(elapsed, 0.4)
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_limits_rate(self):
+        async def take(bucket, count):
+            for _ in range(count):
+                await bucket.acquire()
+
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.monotonic()
+        asyncio.run(take(bucket, 5))
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+
+class SharedRateLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def acquire_times(self, limiter, count):
+        async def take():
+            times = []
+            for _ in range(count):
+                await limiter.acquire()
+                times.append(time.time())
+            return times
+
+        return asyncio.run(take())
+
+    def test_limiters_with_same_key_share_rate(self):
+        limiters = [SharedRateLimiter(rate=20, key="test:rate") for _ in range(2)]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            times = sorted(sum(executor.map(self.acquire_times, limiters, [5, 5]), []))
+
+        # Слоты раздаются по одному на двоих: 10 операций занимают 10 слотов по 0.05 с,
+        # первый из которых мог начаться чуть раньше
+        self.assertGreaterEqual(times[-1] - times[0], 0.4)
+
+    def test_idle_time_does_not_allow_burst(self):
+        limiter = SharedRateLimiter(rate=20, key="test:idle")
+        self.acquire_times(limiter, 1)
+        time.sleep(0.3)
+        times = self.acquire_times(limiter, 4)
+        # Прошедшие за простой слоты пропускаются, а не отдаются разом
+        self.assertGreaterEqual(times[-1] - times[0], 0.09)
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from habits.models import Habit
+from habits.serializers import HabitSerializer
+from users.models import CustomUser
+
+
+class HabitExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='export',
+            email='export@example.com',
+            password='testpass123'
+        )
+        self.other = CustomUser.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for number in range(5):
+            self.create_habit(self.user, f'Привычка {number}')
+        self.create_habit(self.other, 'Чужая')
+        self.url = reverse('habits:habits-export')
+
+    def create_habit(self, user, action):
+        return Habit.objects.create(
+            user=user, action=action, time='08:00', place='Дом', duration=60, reward='Награда'
+        )
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def expected(self, queryset):
+        return [json.loads(json.dumps(item)) for item in HabitSerializer(queryset.order_by('id'), many=True).data]
+
+    def test_ndjson_matches_serializer(self):
+        response, content = self.export(file_format='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        items = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(items, self.expected(Habit.objects.filter(user=self.user)))
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="habits.csv"')
+        rows = list(csv.DictReader(io.StringIO(content)))
+        expected = self.expected(Habit.objects.filter(user=self.user))
+        self.assertEqual([int(row['id']) for row in rows], [item['id'] for item in expected])
+        self.assertEqual(rows[0]['action'], expected[0]['action'])
+        self.assertEqual(rows[0]['time'], expected[0]['time'])
+
+    def test_csv_escapes_formulas(self):
+        Habit.objects.filter(user=self.user).update(action='=HYPERLINK("http://evil")', place='-1+1')
+        _, content = self.export()
+        row = next(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(row['action'], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(row['place'], "'-1+1")
+
+    @override_settings(HABITS_EXPORT_CHUNK_SIZE=2)
+    def test_single_query_across_chunks(self):
+        response = self.client.get(self.url, {'file_format': 'ndjson'})
+        with self.assertNumQueries(1):
+            chunks = list(response.streaming_content)
+        # Строки приходят порциями по HABITS_EXPORT_CHUNK_SIZE
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2, 1])
+
+    def test_staff_exports_all_users(self):
+        self.user.is_staff = True
+        self.user.save()
+        _, content = self.export(file_format='ndjson', all='true')
+        self.assertEqual(len(content.splitlines()), Habit.objects.count())
+
+    def test_all_requires_staff(self):
+        response = self.client.get(self.url, {'all': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unknown_format(self):
+        response = self.client.get(self.url, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
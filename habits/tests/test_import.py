@@ -0,0 +1,172 @@
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from habits.importing import HabitImporter, iter_json_array
+from habits.models import Habit, UserHabitStats
+from users.models import CustomUser
+
+
+class HabitImportTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='import',
+            email='import@example.com',
+            password='testpass123'
+        )
+
+    def record(self, pk=None, **fields):
+        fields = {
+            'user': self.user.pk, 'place': 'Дом', 'time': '08:00:00', 'action': f'Привычка {pk}',
+            'duration': 60, 'reward': None, 'is_pleasant': False, 'is_public': False, **fields
+        }
+        return {'model': 'habits.habit', 'pk': pk, 'fields': fields}
+
+    def write_file(self, content, suffix):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8', delete=False)
+        with file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def import_file(self, content, suffix='.json', *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_habits', self.write_file(content, suffix), *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_fixture_keeps_ids_and_created_at(self):
+        created_at = '2025-06-19T08:31:59.572446+03:00'
+        self.import_file(json.dumps([self.record(10, created_at=created_at), self.record(11)]))
+
+        habit = Habit.objects.get(pk=10)
+        self.assertEqual(habit.created_at, datetime(2025, 6, 19, 5, 31, 59, 572446, tzinfo=dt_timezone.utc))
+        self.assertEqual(habit.user, self.user)
+        self.assertIsNotNone(habit.next_due_at)
+        self.assertTrue(Habit.objects.filter(pk=11).exists())
+        # Последовательность сдвинута за импортированные id
+        self.assertGreater(Habit.objects.create(
+            user=self.user, action='Новая', time='08:00', place='Дом', duration=60
+        ).pk, 11)
+
+    def test_repo_fixture(self):
+        with open('habits_fixture.json', encoding='utf-8') as file:
+            records = json.load(file)
+        users = {record['fields']['user'] for record in records}
+        for pk in users - set(CustomUser.objects.values_list('pk', flat=True)):
+            CustomUser.objects.create_user(username=f'user{pk}', email=f'user{pk}@example.com', id=pk)
+
+        stdout, stderr = self.import_file(json.dumps(records))
+        self.assertEqual(sorted(Habit.objects.values_list('pk', flat=True)), [1, 2, 3, 4])
+        self.assertEqual(stderr, '')
+
+    def test_add_habits_rejects_fixture_with_errors(self):
+        Habit.objects.create(pk=99, user=self.user, action='Старая', time='08:00', place='Дом', duration=60)
+        # Части пользователей фикстуры нет — их записи отклоняются, и удаление старых привычек тоже откатывается
+        with self.assertRaisesMessage(CommandError, 'Отклонено записей'):
+            call_command('add_habits', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(list(Habit.objects.values_list('pk', flat=True)), [99])
+
+    def test_related_habit_linked_in_second_pass(self):
+        # Связанная привычка идет в файле после ссылающейся на нее
+        records = [self.record(1, related_habit=2), self.record(2, is_pleasant=True)]
+        stdout, _ = self.import_file(json.dumps(records))
+        self.assertEqual(Habit.objects.get(pk=1).related_habit_id, 2)
+        self.assertIn('связей: 1', stdout)
+
+    def test_related_habit_must_be_pleasant(self):
+        records = [self.record(1, related_habit=2), self.record(2), self.record(3, related_habit=404)]
+        _, stderr = self.import_file(json.dumps(records))
+        # Запись с неверной связью не попадает в базу даже без связи
+        self.assertEqual(list(Habit.objects.values_list('pk', flat=True)), [2])
+        self.assertIn('Запись 1: Связанная привычка должна быть приятной', stderr)
+        self.assertIn('Запись 3: related_habit: привычка 404 не найдена', stderr)
+
+    def test_related_habit_without_id(self):
+        pleasant = Habit.objects.create(
+            user=self.user, action='Приятная', time='09:00', place='Дом', duration=30, is_pleasant=True
+        )
+        line = json.dumps(self.record(related_habit=pleasant.pk)['fields'])
+        self.import_file(line + '\n', '.ndjson')
+        self.assertEqual(Habit.objects.get(action='Привычка None').related_habit, pleasant)
+
+    def test_invalid_rows_are_skipped(self):
+        Habit.objects.create(pk=5, user=self.user, action='Есть', time='08:00', place='Дом', duration=60)
+        records = [
+            self.record(1),
+            self.record(2, user=9999),
+            self.record(5),
+            self.record(3, periodicity='hourly'),
+            self.record(4, duration=121),
+            self.record(6, reward='Награда', related_habit=1),
+            self.record(7, time='25:00'),
+        ]
+        _, stderr = self.import_file(json.dumps(records))
+
+        self.assertEqual(sorted(Habit.objects.values_list('pk', flat=True)), [1, 5])
+        self.assertIn('Пропущено записей с ошибками: 6', stderr)
+        for message in ('Запись 2: user', 'Запись 3: id', 'Запись 4: periodicity', 'Запись 5: duration',
+                        'Запись 6: Можно указать', 'Запись 7: time'):
+            self.assertIn(message, stderr)
+
+    def test_ndjson_without_ids(self):
+        lines = [json.dumps(self.record(**{'action': f'Строка {number}'})['fields']) for number in range(3)]
+        self.import_file('\n'.join(lines) + '\n', '.ndjson')
+        self.assertEqual(
+            sorted(Habit.objects.values_list('action', flat=True)), ['Строка 0', 'Строка 1', 'Строка 2']
+        )
+
+    def test_csv_round_trip_from_export(self):
+        self.client.force_authenticate(user=self.user)
+        pleasant = Habit.objects.create(
+            user=self.user, action='Приятная', time='09:00', place='Дом', duration=30, is_pleasant=True
+        )
+        Habit.objects.create(
+            user=self.user, action='=Основная', time='08:00', place='-Дом', duration=60, related_habit=pleasant
+        )
+        response = self.client.get(reverse('habits:habits-export'), {'file_format': 'csv'})
+        content = b''.join(response.streaming_content).decode()
+        before = list(Habit.objects.order_by('id').values())
+        Habit.objects.all().delete()
+
+        self.import_file(content, '.csv')
+        self.assertEqual(list(Habit.objects.order_by('id').values()), before)
+
+    def test_stats_refreshed(self):
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='pass')
+        self.import_file(json.dumps([self.record(1), self.record(2)]))
+        self.assertEqual(UserHabitStats.objects.get(user=self.user).active_count, 2)
+        # Пользователи не из файла не пересчитываются
+        self.assertFalse(UserHabitStats.objects.filter(user=other).exists())
+
+    def test_insert_keeps_timestamps(self):
+        created_at, updated_at = '2025-06-19T08:31:59+00:00', '2025-06-20T10:00:00+00:00'
+        HabitImporter(method='insert').run([self.record(1, created_at=created_at, updated_at=updated_at)])
+        habit = Habit.objects.get(pk=1)
+        self.assertEqual(habit.created_at, datetime(2025, 6, 19, 8, 31, 59, tzinfo=dt_timezone.utc))
+        self.assertEqual(habit.updated_at, datetime(2025, 6, 20, 10, tzinfo=dt_timezone.utc))
+
+    def test_dry_run_writes_nothing(self):
+        stdout, _ = self.import_file(json.dumps([self.record(1)]), '.json', '--dry-run')
+        self.assertFalse(Habit.objects.exists())
+        self.assertIn('Проверено (без записи): 1', stdout)
+
+    def test_batches(self):
+        importer = HabitImporter(batch_size=2)
+        importer.run([self.record(pk) for pk in range(1, 6)])
+        self.assertEqual(importer.imported, 5)
+        self.assertEqual(Habit.objects.count(), 5)
+
+    def test_unknown_extension(self):
+        with self.assertRaises(CommandError):
+            self.import_file('[]', '.xml')
+
+    def test_iter_json_array_across_chunks(self):
+        items = [{'value': 'x' * number} for number in range(50)]
+        self.assertEqual(list(iter_json_array(io.StringIO(json.dumps(items)), chunk_size=16)), items)
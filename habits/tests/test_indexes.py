@@ -0,0 +1,67 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.test import TestCase
+from django.utils import timezone
+
+from habits.benchmarks import seed_habits_sql
+from habits.models import Habit
+from habits.reminders import due_habits, shard_habits
+from habits.rollover import rollover_querysets
+from habits.testing import ExplainTestMixin
+from users.models import CustomUser
+
+
+@skipUnless(connection.vendor == "postgresql", "Планы запросов проверяются только на PostgreSQL")
+class HabitIndexesTestCase(ExplainTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 50 тысяч привычек: на таком объеме планировщик сам выбирает индекс, seq scan не запрещается
+        seed_habits_sql(users=2000, habits_per_user=25, prefix="indexes")
+        # У каждого пользователя две основные привычки связаны с его первой (приятной)
+        pleasant = Habit.objects.filter(user_id=OuterRef("user_id"), action="Привычка 0").values("id")[:1]
+        Habit.objects.filter(action__in=["Привычка 1", "Привычка 2"]).update(related_habit_id=Subquery(pleasant))
+        cls.analyze(CustomUser, Habit)
+
+        cls.user = CustomUser.objects.filter(username="indexes-0").get()
+        cls.pleasant = Habit.objects.get(user=cls.user, action="Привычка 0")
+
+    def test_user_habits_by_status(self):
+        self.assertUsesIndex(
+            Habit.objects.filter(user=self.user, status="Active").order_by("-created_at"),
+            "habit_user_status_created_idx",
+        )
+
+    def test_user_active_main_habits(self):
+        self.assertUsesIndex(
+            Habit.objects.filter(user=self.user, status="Active", related_habit__isnull=True),
+            "habit_user_status_created_idx",
+        )
+
+    def test_user_list_version(self):
+        # Версия списка для ETag: COUNT и MAX(updated_at) по привычкам пользователя
+        self.assertUsesIndex(
+            Habit.objects.filter(user=self.user).order_by().values("user")
+            .annotate(count=Count("id"), modified=Max("updated_at")),
+            "habit_user_updated_idx",
+        )
+
+    def test_public_feed(self):
+        self.assertUsesIndex(
+            Habit.objects.filter(is_public=True).order_by("-created_at", "-id")[:6], "habit_public_created_idx"
+        )
+
+    def test_related_active_habits(self):
+        self.assertUsesIndex(self.pleasant.main_habits.filter(status="Active"), "habit_related_status_idx")
+
+    def test_due_reminders(self):
+        self.assertUsesIndex(due_habits(timezone.now()), "habit_due_idx")
+
+    def test_due_reminders_shard(self):
+        self.assertUsesIndex(shard_habits(timezone.now(), self.user.id, self.user.id + 100), "habit_due_idx")
+
+    def test_rollover(self):
+        for reset, overdue in rollover_querysets(timezone.localdate()):
+            self.assertUsesIndex(reset.order_by()[:1000], "habit_rollover_idx")
+            self.assertUsesIndex(overdue.order_by()[:1000], "habit_rollover_idx")
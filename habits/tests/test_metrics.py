@@ -0,0 +1,117 @@
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from config.metrics import MetricsRegistry, registry
+from config.middleware import MetricsMiddleware
+from habits.models import Habit
+from habits.tasks import rollover_habit_statuses
+from habits.testing import EagerCeleryMixin
+from users.models import CustomUser
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+
+class MetricsRegistryTestCase(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = MetricsRegistry()
+        for value in (0, 1, 4, 500):
+            metrics.observe('http_request_db_queries', {'view': 'list'}, value)
+        text = metrics.render()
+
+        self.assertIn('# TYPE http_request_db_queries histogram', text)
+        self.assertIn('http_request_db_queries_bucket{view="list",le="0"} 1', text)
+        self.assertIn('http_request_db_queries_bucket{view="list",le="5"} 3', text)
+        self.assertIn('http_request_db_queries_bucket{view="list",le="200"} 3', text)
+        self.assertIn('http_request_db_queries_bucket{view="list",le="+Inf"} 4', text)
+        self.assertIn('http_request_db_queries_sum{view="list"} 505', text)
+        self.assertIn('http_request_db_queries_count{view="list"} 4', text)
+
+    def test_label_values_are_escaped(self):
+        metrics = MetricsRegistry()
+        metrics.inc('celery_tasks_total', {'task': 'a"b\\c'})
+        self.assertIn('celery_tasks_total{task="a\\"b\\\\c"} 1', metrics.render())
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret')
+class MetricsMiddlewareTestCase(EagerCeleryMixin, APITestCase):
+    def setUp(self):
+        registry.clear()
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='metrics',
+            email='metrics@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        Habit.objects.create(user=self.user, action='Привычка', time='08:00', place='Дом', duration=60)
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def test_records_request_queries_and_timings(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('habits:habits-list'))
+        labels = '{view="habits:habits-list",method="GET"}'
+
+        text = self.metrics()
+        self.assertIn('http_requests_total{view="habits:habits-list",method="GET",status="200"} 1', text)
+        self.assertIn(f'http_request_db_queries_sum{labels} 2', text)
+        for name in ('duration', 'db', 'render'):
+            self.assertIn(f'http_request_{name}_seconds_count{labels} 1', text)
+
+    async def test_records_async_view_queries(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        response = await self.async_client.get(
+            reverse('habits:async-habits-list'), headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        labels = '{view="habits:async-habits-list",method="GET"}'
+
+        text = registry.render()
+        self.assertIn(f'http_requests_total{labels[:-1]},status="200"}} 1', text)
+        self.assertIn(f'http_request_db_queries_sum{labels} 2', text)
+
+    def test_adapts_to_chain_mode(self):
+        async def async_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(async_response)))
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(lambda request: None)))
+
+    def test_records_celery_tasks(self):
+        rollover_habit_statuses.delay()
+        text = self.metrics()
+        self.assertIn('celery_tasks_total{task="habits.tasks.rollover_habit_statuses",state="SUCCESS"} 1', text)
+        self.assertIn('celery_task_db_queries_count{task="habits.tasks.rollover_habit_statuses"} 1', text)
+
+    def test_exports_public_feed_cache_stats(self):
+        for _ in range(3):
+            self.client.get(reverse('habits:habits-public'))
+        text = self.metrics()
+        self.assertIn('public_feed_cache_requests_total{result="hits"} 2', text)
+        self.assertIn('public_feed_cache_requests_total{result="misses"} 1', text)
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_not_exposed_without_token(self):
+        for token in (None, ''):
+            with self.settings(METRICS_TOKEN=token):
+                response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get(reverse('habits:habits-list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_404_NOT_FOUND)
+        rollover_habit_statuses.delay()
+        self.assertEqual(registry.values, {})
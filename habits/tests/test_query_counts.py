@@ -0,0 +1,272 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+import habits.urls
+import users.urls
+from habits.models import Habit
+from habits.testing import EagerCeleryMixin, FakeTelegramServer, QueryCountMixin
+from users import authentication
+from users.models import CustomUser
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+# Размеры страниц и пакетов: число запросов на всех должно быть одинаковым
+SIZES = (1, 5, 20)
+
+# Потолок SQL-запросов на вызов маршрута (имя маршрута, метод). Изменения API и данных идут
+# в транзакции, поэтому к запросам добавляются SAVEPOINT/RELEASE; задачи Celery выполняются
+# внутри запроса и тоже учитываются
+ROUTE_BUDGETS = {
+    ('habits:api-root', 'GET'): 0,
+    ('habits:habits-list', 'GET'): 2,
+    ('habits:habits-list', 'POST'): 3,
+    ('habits:habits-detail', 'GET'): 2,
+    ('habits:habits-detail', 'PUT'): 4,
+    ('habits:habits-detail', 'PATCH'): 4,
+    ('habits:habits-detail', 'DELETE'): 6,
+    ('habits:habits-public', 'GET'): 1,
+    ('habits:habits-bulk', 'POST'): 4,
+    ('habits:habits-bulk', 'PATCH'): 4,
+    ('habits:habits-bulk-perform', 'POST'): 4,
+    ('habits:habits-export', 'GET'): 1,
+    ('habits:habits-stats', 'GET'): 1,
+    ('habits:habits-streak', 'GET'): 2,
+    ('habits:habits-perform', 'POST'): 4,
+    ('habits:async-habits-list', 'GET'): 2,
+    ('habits:async-habits-detail', 'GET'): 2,
+    ('habits:async-habits-public', 'GET'): 1,
+    ('users:login', 'POST'): 1,
+    ('users:token_refresh', 'POST'): 1,
+    ('users:users', 'GET'): 3,
+    ('users:users_detail', 'GET'): 1,
+    ('users:users_create', 'POST'): 5,
+    ('users:users_update', 'PATCH'): 3,
+    ('users:users_delete', 'DELETE'): 8,
+    ('users:async_users_detail', 'GET'): 1,
+    ('users:connect-telegram', 'PATCH'): 1,
+}
+
+
+def route_names(urlconf):
+    return {f'{urlconf.app_name}:{pattern.name}' for pattern in urlconf.urlpatterns}
+
+
+class RouteQueryCountTestCase(QueryCountMixin, EagerCeleryMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._current_claims.clear()
+        telegram = self.enterContext(FakeTelegramServer())
+        self.enterContext(self.settings(
+            TELEGRAM_API_URL=telegram.url, TELEGRAM_BOT_TOKEN='123:TEST', TELEGRAM_GLOBAL_RATE=1000,
+            TELEGRAM_CHAT_RATE=1000,
+        ))
+
+        self.user = self.create_user('owner', telegram_chat_id='12345')
+        self.other = self.create_user('other')
+        self.admin = self.create_user('admin', is_staff=True)
+        self.login_as(self.user)
+
+        # Связи, которые при N+1 читались бы по одной: связанные привычки, выполнения, группы
+        pleasant = self.create_habits(self.user, 1, is_pleasant=True, reward=None)[0]
+        self.habits = self.create_habits(self.user, max(SIZES), related_habit=pleasant, reward=None)
+        self.create_habits(self.other, max(SIZES), is_public=True)
+        groups = [Group.objects.create(name=f'Группа {number}') for number in range(3)]
+        for user in CustomUser.objects.all():
+            user.groups.set(groups)
+
+    def create_user(self, username, **extra):
+        return CustomUser.objects.create_user(
+            username=username, email=f'{username}@example.com', password='testpass123', **extra
+        )
+
+    def create_habits(self, user, count, **extra):
+        options = {'time': '08:00', 'place': 'Дом', 'duration': 60, 'reward': 'Награда', **extra}
+        return [Habit.objects.create(user=user, action=f'Привычка {number}', **options) for number in range(count)]
+
+    def habit_data(self, number):
+        return {'action': f'Новая {number}', 'time': '09:00:00', 'place': 'Офис', 'duration': 60, 'reward': 'Кофе'}
+
+    def login_as(self, user):
+        # Настоящий токен со сведениями о пользователе, как после входа: в бюджет входит и то,
+        # что представления дочитывают у собранного из токена пользователя
+        if user is None:
+            self.client.credentials()
+        else:
+            token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def assertRouteQueries(self, route, request, sizes=(1,)):
+        return self.assertQueriesDoNotScale(request, sizes, ROUTE_BUDGETS[route])
+
+    def assertStatus(self, response, expected=status.HTTP_200_OK):
+        self.assertEqual(response.status_code, expected, getattr(response, 'data', None))
+        return response
+
+    def test_every_route_has_budget(self):
+        budgeted = {name for name, method in ROUTE_BUDGETS}
+        self.assertEqual(route_names(habits.urls) | route_names(users.urls), budgeted)
+
+    def test_api_root(self):
+        self.assertRouteQueries(('habits:api-root', 'GET'), lambda size: self.assertStatus(
+            self.client.get(reverse('habits:api-root'))
+        ))
+
+    def test_habit_list(self):
+        def request(size):
+            response = self.assertStatus(self.client.get(reverse('habits:habits-list'), {'page_size': size}))
+            self.assertEqual(len(response.data['results']), size)
+
+        self.assertRouteQueries(('habits:habits-list', 'GET'), request, SIZES)
+
+    def test_habit_public(self):
+        def request(size):
+            response = self.assertStatus(self.client.get(reverse('habits:habits-public'), {'page_size': size}))
+            self.assertEqual(len(response.data['results']), size)
+
+        self.assertRouteQueries(('habits:habits-public', 'GET'), request, SIZES)
+
+    def test_habit_create(self):
+        self.assertRouteQueries(('habits:habits-list', 'POST'), lambda size: self.assertStatus(
+            self.client.post(reverse('habits:habits-list'), self.habit_data(size), format='json'),
+            status.HTTP_201_CREATED,
+        ))
+
+    def test_habit_detail(self):
+        url = reverse('habits:habits-detail', args=[self.create_habits(self.user, 1)[0].id])
+        self.assertRouteQueries(('habits:habits-detail', 'GET'), lambda size: self.assertStatus(self.client.get(url)))
+        self.assertRouteQueries(('habits:habits-detail', 'PUT'), lambda size: self.assertStatus(
+            self.client.put(url, self.habit_data(size), format='json')
+        ))
+        self.assertRouteQueries(('habits:habits-detail', 'PATCH'), lambda size: self.assertStatus(
+            self.client.patch(url, {'place': 'Парк'}, format='json')
+        ))
+        self.assertRouteQueries(('habits:habits-detail', 'DELETE'), lambda size: self.assertStatus(
+            self.client.delete(url), status.HTTP_204_NO_CONTENT
+        ))
+
+    def test_habit_bulk(self):
+        url = reverse('habits:habits-bulk')
+
+        def create(size):
+            data = [self.habit_data(number) for number in range(size)]
+            self.assertStatus(self.client.post(url, data, format='json'), status.HTTP_201_CREATED)
+
+        def update(size):
+            data = [{'id': habit.id, 'place': f'Офис {size}'} for habit in self.habits[:size]]
+            self.assertStatus(self.client.patch(url, data, format='json'))
+
+        self.assertRouteQueries(('habits:habits-bulk', 'POST'), create, SIZES)
+        self.assertRouteQueries(('habits:habits-bulk', 'PATCH'), update, SIZES)
+
+    def test_habit_bulk_perform(self):
+        habits = iter(self.habits)
+
+        def request(size):
+            ids = [next(habits).id for _ in range(size)]
+            response = self.client.post(reverse('habits:habits-bulk-perform'), {'ids': ids}, format='json')
+            self.assertEqual(len(self.assertStatus(response).data['completed']), size)
+
+        # Каждая выполненная привычка связана с приятной — уведомления строятся по всем связям сразу
+        self.assertRouteQueries(('habits:habits-bulk-perform', 'POST'), request, (1, 5, 10))
+
+    def test_habit_perform(self):
+        # У приятной привычки size основных: их список в уведомлении не должен читаться по одной
+        pleasant = {size: self.create_habits(self.user, 1, is_pleasant=True, reward=None)[0] for size in SIZES}
+        for size, habit in pleasant.items():
+            self.create_habits(self.user, size, related_habit=habit, reward=None)
+
+        def request(size):
+            self.assertStatus(self.client.post(reverse('habits:habits-perform', args=[pleasant[size].id])))
+
+        self.assertRouteQueries(('habits:habits-perform', 'POST'), request, SIZES)
+
+    def test_habit_export(self):
+        # Выгрузка отдает все привычки пользователя, поэтому размер задается числом привычек
+        owners = {size: self.create_user(f'export{size}') for size in SIZES}
+        for size, owner in owners.items():
+            self.create_habits(owner, size)
+
+        def request(size):
+            self.login_as(owners[size])
+            response = self.assertStatus(self.client.get(reverse('habits:habits-export'), {'file_format': 'ndjson'}))
+            self.assertEqual(len(b''.join(response.streaming_content).splitlines()), size)
+
+        self.assertRouteQueries(('habits:habits-export', 'GET'), request, SIZES)
+
+    def test_habit_stats_and_streak(self):
+        self.assertRouteQueries(('habits:habits-stats', 'GET'), lambda size: self.assertStatus(
+            self.client.get(reverse('habits:habits-stats'))
+        ))
+        self.assertRouteQueries(('habits:habits-streak', 'GET'), lambda size: self.assertStatus(
+            self.client.get(reverse('habits:habits-streak', args=[self.habits[0].id]))
+        ))
+
+    def test_async_habits(self):
+        def request(name, size):
+            response = self.assertStatus(self.client.get(reverse(name), {'page_size': size}))
+            self.assertEqual(len(response.json()['results']), size)
+
+        self.assertRouteQueries(
+            ('habits:async-habits-list', 'GET'), lambda size: request('habits:async-habits-list', size), SIZES
+        )
+        self.assertRouteQueries(
+            ('habits:async-habits-public', 'GET'), lambda size: request('habits:async-habits-public', size), SIZES
+        )
+        self.assertRouteQueries(('habits:async-habits-detail', 'GET'), lambda size: self.assertStatus(
+            self.client.get(reverse('habits:async-habits-detail', args=[self.habits[0].id]))
+        ))
+
+    def test_login_and_refresh(self):
+        self.assertRouteQueries(('users:login', 'POST'), lambda size: self.assertStatus(self.client.post(
+            reverse('users:login'), {'email': self.user.email, 'password': 'testpass123'}, format='json'
+        )))
+        refresh = str(ClaimsTokenObtainPairSerializer.get_token(self.user))
+        self.assertRouteQueries(('users:token_refresh', 'POST'), lambda size: self.assertStatus(
+            self.client.post(reverse('users:token_refresh'), {'refresh': refresh}, format='json')
+        ))
+
+    def test_user_list(self):
+        for number in range(max(SIZES)):
+            self.create_user(f'user{number}').groups.set(Group.objects.all())
+        self.login_as(self.admin)
+
+        def request(size):
+            response = self.assertStatus(self.client.get(reverse('users:users'), {'page_size': size}))
+            self.assertEqual(len(response.data['results']), size)
+
+        self.assertRouteQueries(('users:users', 'GET'), request, SIZES)
+
+    def test_user_detail(self):
+        for email in (self.user.email, self.other.email):
+            self.assertRouteQueries(('users:users_detail', 'GET'), lambda size: self.assertStatus(
+                self.client.get(reverse('users:users_detail', args=[email]))
+            ))
+
+        for email in (self.user.email, self.other.email):
+            self.assertRouteQueries(('users:async_users_detail', 'GET'), lambda size: self.assertStatus(
+                self.client.get(reverse('users:async_users_detail', args=[email]))
+            ))
+
+    def test_user_create_update_delete(self):
+        self.login_as(None)
+        self.assertRouteQueries(('users:users_create', 'POST'), lambda size: self.assertStatus(self.client.post(
+            reverse('users:users_create'),
+            {'username': 'new', 'email': 'new@example.com', 'password': 'testpass123'},
+            format='json',
+        ), status.HTTP_201_CREATED))
+
+        self.login_as(self.user)
+        self.assertRouteQueries(('users:users_update', 'PATCH'), lambda size: self.assertStatus(self.client.patch(
+            reverse('users:users_update', args=[self.user.email]), {'city': 'Omsk'}, format='json'
+        )))
+        self.assertRouteQueries(('users:connect-telegram', 'PATCH'), lambda size: self.assertStatus(self.client.patch(
+            reverse('users:connect-telegram'), {'telegram_chat_id': '777'}, format='json'
+        )))
+
+        # Удаление каскадом уносит привычки, выполнения и группы: пакетами, а не построчно
+        self.login_as(self.admin)
+        self.assertRouteQueries(('users:users_delete', 'DELETE'), lambda size: self.assertStatus(
+            self.client.delete(reverse('users:users_delete', args=[self.user.email])), status.HTTP_204_NO_CONTENT
+        ))
@@ -0,0 +1,74 @@
+import gzip
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from unittest import skipIf
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from config import renderers
+from config.renderers import FastJSONRenderer
+from habits.models import Habit
+from users.models import CustomUser
+
+
+class FastJSONRendererTestCase(SimpleTestCase):
+    data = {
+        'results': [
+            {
+                'id': 1,
+                'action': 'Зарядка\u2028утром',
+                'time': time(8, 30),
+                'created_at': datetime(2025, 3, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+                'last_completed_on': date(2025, 3, 1),
+                'rate': Decimal('0.50'),
+                'detail': gettext_lazy('Не найдено.'),
+            },
+        ],
+        1: None,
+    }
+
+    def test_matches_drf_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_falls_back_to_drf_renderer(self):
+        rendered = FastJSONRenderer().render(self.data, 'application/json; indent=2')
+        self.assertEqual(rendered, JSONRenderer().render(self.data, 'application/json; indent=2'))
+
+    @skipIf(renderers.orjson is None, 'orjson не установлен')
+    def test_uses_orjson(self):
+        self.assertEqual(FastJSONRenderer().render([1]), renderers.orjson.dumps([1]))
+
+
+class ResponseCompressionTestCase(APITestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            username='gzip',
+            email='gzip@example.com',
+            password='testpass123'
+        )
+        for i in range(20):
+            Habit.objects.create(
+                user=user, action=f'Привычка {i}', time='08:00', place='Дом', duration=60, reward='Награда',
+                is_public=True,
+            )
+        self.url = reverse('habits:habits-public')
+
+    @override_settings(GZIP_MIN_LENGTH=1024)
+    def test_large_response_is_compressed(self):
+        response = self.client.get(self.url, {'page_size': 20}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'"results"', gzip.decompress(response.content))
+
+    @override_settings(GZIP_MIN_LENGTH=1024)
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(self.url, {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(GZIP_ENABLED=False)
+    def test_can_be_disabled(self):
+        response = self.client.get(self.url, {'page_size': 20}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
@@ -0,0 +1,57 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from habits.models import Habit
+from habits.rows import RowSerializer
+from habits.serializers import HabitSerializer
+from users.models import CustomUser
+
+
+class RowSerializerTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='rows',
+            email='rows@example.com',
+            password='testpass123'
+        )
+        pleasant = Habit.objects.create(
+            user=self.user, action='Приятная', time='20:00', place='Дом', duration=60, is_pleasant=True,
+        )
+        Habit.objects.create(
+            user=self.user, action='Основная', time='08:30', place='Парк', duration=90, related_habit=pleasant,
+            is_public=True,
+        )
+        Habit.objects.filter(pk=pleasant.pk).update(status='Completed', last_completed_on='2025-03-01')
+
+    def test_matches_model_serializer(self):
+        queryset = Habit.objects.order_by('id')
+        rows = RowSerializer(HabitSerializer)
+        self.assertEqual(rows.to_representation(rows.rows(queryset)), HabitSerializer(queryset, many=True).data)
+
+    def test_single_query(self):
+        rows = RowSerializer(HabitSerializer)
+        with self.assertNumQueries(1):
+            rows.to_representation(rows.rows(Habit.objects.all()))
+
+
+class HabitListRowsTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='rowslist',
+            email='rowslist@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for i in range(3):
+            Habit.objects.create(
+                user=self.user, action=f'Привычка {i}', time='08:00', place='Дом', duration=60, reward='Награда',
+                is_public=True,
+            )
+
+    def test_list_and_public_match_detail(self):
+        detail = self.client.get(reverse('habits:habits-detail', args=[Habit.objects.latest('id').id])).data
+        listed = self.client.get(reverse('habits:habits-list')).data['results'][0]
+        public = self.client.get(reverse('habits:habits-public')).data['results'][0]
+        self.assertEqual(listed, detail)
+        self.assertEqual(public, detail)
@@ -0,0 +1,44 @@
+from datetime import date, datetime, time
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase, override_settings
+
+from habits.models import Habit
+from habits.scheduling import add_months, advance_due, first_due, next_due_after
+
+MSK = ZoneInfo('Europe/Moscow')
+
+
+@override_settings(TIME_ZONE='Europe/Moscow')
+class SchedulingTestCase(SimpleTestCase):
+    def test_first_due_later_today(self):
+        after = datetime(2025, 6, 1, 7, 0, tzinfo=MSK)
+        self.assertEqual(first_due(time(8, 30), after), datetime(2025, 6, 1, 8, 30, tzinfo=MSK))
+
+    def test_first_due_tomorrow_when_time_passed(self):
+        after = datetime(2025, 6, 1, 9, 0, tzinfo=MSK)
+        self.assertEqual(first_due(time(8, 30), after), datetime(2025, 6, 2, 8, 30, tzinfo=MSK))
+
+    def test_first_due_uses_local_time(self):
+        # 06:00 UTC — это 09:00 по Москве, поэтому 08:30 уже прошло
+        after = datetime(2025, 6, 1, 6, 0, tzinfo=ZoneInfo('UTC'))
+        self.assertEqual(first_due(time(8, 30), after), datetime(2025, 6, 2, 8, 30, tzinfo=MSK))
+
+    def test_advance_by_periodicity(self):
+        due = datetime(2025, 1, 31, 8, 0, tzinfo=MSK)
+        self.assertEqual(advance_due(due, Habit.DAILY), datetime(2025, 2, 1, 8, 0, tzinfo=MSK))
+        self.assertEqual(advance_due(due, Habit.WEEKLY), datetime(2025, 2, 7, 8, 0, tzinfo=MSK))
+        self.assertEqual(advance_due(due, Habit.MONTHLY), datetime(2025, 2, 28, 8, 0, tzinfo=MSK))
+
+    def test_add_months_across_year(self):
+        self.assertEqual(add_months(date(2024, 12, 31), 2), date(2025, 2, 28))
+
+    def test_next_due_after_skips_missed_periods(self):
+        due = datetime(2025, 6, 1, 8, 0, tzinfo=MSK)
+        after = datetime(2025, 6, 4, 12, 0, tzinfo=MSK)
+        self.assertEqual(
+            next_due_after(due, Habit.DAILY, time(8, 0), after), datetime(2025, 6, 5, 8, 0, tzinfo=MSK)
+        )
+        self.assertEqual(
+            next_due_after(None, Habit.WEEKLY, time(8, 0), after), datetime(2025, 6, 5, 8, 0, tzinfo=MSK)
+        )
@@ -0,0 +1,132 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from habits.models import Habit, UserHabitStats
+from habits.stats import refresh_user_stats
+from habits.tasks import rollover_habit_statuses
+from users.models import CustomUser
+
+
+@patch('habits.views.send_related_habits_notification.delay')
+class UserHabitStatsTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='stats',
+            email='stats@example.com',
+            password='testpass123'
+        )
+        self.other_user = CustomUser.objects.create_user(
+            username='statsother',
+            email='statsother@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('habits:habits-stats')
+
+    def create_habit(self, user=None, **extra):
+        return Habit.objects.create(
+            user=user or self.user, action='Привычка', time='08:00', place='Дом', duration=60, reward='Награда',
+            **extra
+        )
+
+    def counts(self, user=None):
+        stats = UserHabitStats.objects.get(user=user or self.user)
+        return stats.active_count, stats.completed_count, stats.overdue_count, stats.completions_count
+
+    def assertMatchesRecount(self, user=None):
+        counts = self.counts(user)
+        refresh_user_stats()
+        self.assertEqual(counts, self.counts(user))
+
+    def test_counts_follow_create_perform_and_delete(self, mock_delay):
+        habits = [self.create_habit() for _ in range(3)]
+        self.assertEqual(self.counts(), (3, 0, 0, 0))
+
+        self.client.post(reverse('habits:habits-perform', args=[habits[0].id]))
+        self.client.post(reverse('habits:habits-bulk-perform'), {'ids': [habits[1].id]}, format='json')
+        self.assertEqual(self.counts(), (1, 2, 0, 2))
+
+        habits[0].delete()
+        self.assertEqual(self.counts(), (1, 1, 0, 1))
+        self.assertMatchesRecount()
+
+    def test_status_change_and_owner_change(self, mock_delay):
+        habit = self.create_habit()
+        habit.status = 'Overdue'
+        habit.save()
+        self.assertEqual(self.counts(), (0, 0, 1, 0))
+
+        self.client.post(reverse('habits:habits-perform', args=[habit.id]))
+        self.assertEqual(self.counts(), (0, 1, 0, 1))
+
+        habit = Habit.objects.get(pk=habit.pk)
+        habit.user = self.other_user
+        habit.save()
+        self.assertEqual(self.counts(), (0, 0, 0, 1))
+        self.assertEqual(self.counts(self.other_user), (0, 1, 0, 0))
+
+    def test_bulk_endpoints(self, mock_delay):
+        data = [{'action': f'Привычка {i}', 'time': '08:00:00', 'place': 'Дом', 'duration': 60, 'reward': 'Награда'}
+                for i in range(4)]
+        response = self.client.post(reverse('habits:habits-bulk'), data, format='json')
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(self.counts(), (4, 0, 0, 0))
+
+        self.client.patch(reverse('habits:habits-bulk'), [{'id': pk, 'status': 'Overdue'} for pk in ids[:2]],
+                          format='json')
+        self.assertEqual(self.counts(), (2, 0, 2, 0))
+        self.assertMatchesRecount()
+
+    def test_rollover_shifts_stats(self, mock_delay):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for user in (self.user, self.other_user):
+            self.create_habit(user=user, status='Completed', last_completed_on=yesterday)
+            self.create_habit(user=user, status='Completed', last_completed_on=yesterday)
+        self.create_habit(status='Active', last_completed_on=yesterday - timedelta(days=2))
+        self.assertEqual(self.counts(), (1, 2, 0, 0))
+
+        rollover_habit_statuses(batch_size=3)
+        self.assertEqual(self.counts(), (2, 0, 1, 0))
+        self.assertEqual(self.counts(self.other_user), (2, 0, 0, 0))
+        self.assertMatchesRecount()
+        self.assertMatchesRecount(self.other_user)
+
+    def test_refresh_command_repairs_stats(self, mock_delay):
+        habit = self.create_habit()
+        Habit.objects.filter(pk=habit.pk).update(status='Overdue')
+        self.assertEqual(self.counts(), (1, 0, 0, 0))
+        call_command('refresh_habit_stats', stdout=StringIO())
+        self.assertEqual(self.counts(), (0, 0, 1, 0))
+
+    def test_endpoint_reads_one_row(self, mock_delay):
+        self.create_habit()
+        completed = self.create_habit()
+        self.client.post(reverse('habits:habits-perform', args=[completed.id]))
+        self.create_habit(user=self.other_user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['active_count'], 1)
+        self.assertEqual(response.data['completed_count'], 1)
+        self.assertEqual(response.data['total_count'], 2)
+        self.assertEqual(response.data['completion_rate'], 0.5)
+        self.assertEqual(response.data['completions_count'], 1)
+
+    def test_endpoint_creates_missing_row(self, mock_delay):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_count'], 0)
+        self.assertEqual(response.data['completion_rate'], 0.0)
+
+    def test_endpoint_requires_authentication(self, mock_delay):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from habits.models import Habit, HabitCompletion
+from habits.streaks import period_bounds
+from users.models import CustomUser
+
+
+class PeriodBoundsTestCase(SimpleTestCase):
+    def test_daily(self):
+        self.assertEqual(period_bounds(Habit.DAILY, date(2025, 3, 1)), (date(2025, 3, 1), date(2025, 2, 28)))
+
+    def test_weekly_starts_on_monday(self):
+        self.assertEqual(period_bounds(Habit.WEEKLY, date(2025, 6, 5)), (date(2025, 6, 2), date(2025, 5, 26)))
+
+    def test_monthly_across_year(self):
+        self.assertEqual(period_bounds(Habit.MONTHLY, date(2025, 1, 20)), (date(2025, 1, 1), date(2024, 12, 1)))
+
+
+@patch('habits.views.send_related_habits_notification.delay')
+class HabitStreakTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='streaker',
+            email='streaker@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(
+            user=self.user, action='Зарядка', time='08:00', place='Дом', duration=60, reward='Награда',
+        )
+        self.today = timezone.localdate()
+
+    def perform(self):
+        response = self.client.post(reverse('habits:habits-perform', args=[self.habit.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.habit.refresh_from_db()
+
+    def set_state(self, **fields):
+        Habit.objects.filter(pk=self.habit.pk).update(status='Active', **fields)
+
+    def test_first_completion_starts_streak_and_logs_history(self, mock_delay):
+        self.perform()
+        self.assertEqual(self.habit.current_streak, 1)
+        self.assertEqual(self.habit.longest_streak, 1)
+        self.assertEqual(self.habit.last_completed_on, self.today)
+        completion = HabitCompletion.objects.get(habit=self.habit)
+        self.assertEqual(completion.completed_on, self.today)
+        self.assertEqual(completion.user, self.user)
+
+    def test_consecutive_day_extends_streak(self, mock_delay):
+        self.set_state(last_completed_on=self.today - timedelta(days=1), current_streak=3, longest_streak=3)
+        self.perform()
+        self.assertEqual(self.habit.current_streak, 4)
+        self.assertEqual(self.habit.longest_streak, 4)
+
+    def test_gap_resets_streak_but_keeps_longest(self, mock_delay):
+        self.set_state(last_completed_on=self.today - timedelta(days=3), current_streak=2, longest_streak=5)
+        self.perform()
+        self.assertEqual(self.habit.current_streak, 1)
+        self.assertEqual(self.habit.longest_streak, 5)
+
+    def test_same_period_does_not_extend_streak(self, mock_delay):
+        self.set_state(last_completed_on=self.today, current_streak=2, longest_streak=2)
+        self.perform()
+        self.assertEqual(self.habit.current_streak, 2)
+
+    def test_weekly_previous_week_extends_streak(self, mock_delay):
+        self.set_state(
+            periodicity=Habit.WEEKLY, last_completed_on=self.today - timedelta(days=7), current_streak=1,
+            longest_streak=1,
+        )
+        self.perform()
+        self.assertEqual(self.habit.current_streak, 2)
+
+    def test_streak_endpoint(self, mock_delay):
+        HabitCompletion.objects.bulk_create([
+            HabitCompletion(habit=self.habit, user=self.user, completed_on=self.today - timedelta(days=i))
+            for i in range(1, 4)
+        ])
+        self.set_state(last_completed_on=self.today - timedelta(days=1), current_streak=3, longest_streak=3)
+        self.perform()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('habits:habits-streak', args=[self.habit.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['current_streak'], 4)
+        self.assertEqual(response.data['longest_streak'], 4)
+        self.assertEqual(response.data['completions_30d'], 4)
+        self.assertEqual(response.data['adherence_30d'], 0.13)
+
+    def test_broken_streak_is_reported_as_zero(self, mock_delay):
+        self.set_state(last_completed_on=self.today - timedelta(days=5), current_streak=3, longest_streak=3)
+        response = self.client.get(reverse('habits:habits-streak', args=[self.habit.id]))
+        self.assertEqual(response.data['current_streak'], 0)
+        self.assertEqual(response.data['longest_streak'], 3)
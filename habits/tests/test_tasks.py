@@ -1,12 +1,19 @@
-from django.test import TestCase
-from habits.tasks import send_daily_reminders, send_related_habits_notification
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from habits.delivery import DeliveryStats
+from habits.scheduling import first_due
+from habits.tasks import (
+    rollover_habit_statuses, send_daily_reminders, send_related_habits_notification, send_reminders_shard
+)
+from habits.testing import EagerCeleryMixin
 from users.models import CustomUser
 from habits.models import Habit
 from django.utils import timezone
+from datetime import time, timedelta
 from unittest.mock import patch
 
 
-class TasksTestCase(TestCase):
+class TasksTestCase(EagerCeleryMixin, TestCase):
     def setUp(self):
         self.user_with_chat = CustomUser.objects.create_user(
             username='withchat',
@@ -43,13 +50,14 @@ class TasksTestCase(TestCase):
             related_habit=self.pleasant_habit
         )
 
-    @patch('habits.tasks.bot.send_message')
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
     def test_send_daily_reminders(self, mock_send):
+        Habit.objects.update(next_due_at=timezone.now())
         send_daily_reminders()
         self.assertTrue(mock_send.called)
-        args, kwargs = mock_send.call_args
-        self.assertIn('Основные привычки', kwargs['text'])
-        self.assertEqual(kwargs['chat_id'], '12345')
+        chat_id, text = mock_send.call_args.args[0][0]
+        self.assertIn('Основные привычки', text)
+        self.assertEqual(chat_id, '12345')
 
         # Проверяем случай без chat_id
         self.user_with_chat.telegram_chat_id = None
@@ -58,7 +66,7 @@ class TasksTestCase(TestCase):
         send_daily_reminders()
         self.assertFalse(mock_send.called)
 
-    @patch('habits.tasks.bot.send_message')
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
     def test_send_related_habits_notification_with_related(self, mock_send):
         related_habit = Habit.objects.create(
             user=self.user_with_chat,
@@ -80,11 +88,11 @@ class TasksTestCase(TestCase):
         self.assertTrue(mock_send.called)
 
         # Verify message content
-        args, kwargs = mock_send.call_args
-        self.assertIn('Основная привычка выполнена', kwargs['text'])
-        self.assertIn('Дом', kwargs['text'])
+        chat_id, text = mock_send.call_args.args[0][0]
+        self.assertIn('Основная привычка выполнена', text)
+        self.assertIn('Дом', text)
 
-    @patch('habits.tasks.bot.send_message')
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
     def test_send_related_habits_notification_with_reward(self, mock_send):
         # Устанавливаем вознаграждение вместо связанной привычки
         self.main_habit.related_habit = None
@@ -93,15 +101,15 @@ class TasksTestCase(TestCase):
 
         send_related_habits_notification(self.main_habit.id, self.user_with_chat.id)
         self.assertTrue(mock_send.called)
-        args, kwargs = mock_send.call_args
-        self.assertIn('Съесть апельсин', kwargs['text'])
+        chat_id, text = mock_send.call_args.args[0][0]
+        self.assertIn('Съесть апельсин', text)
 
-    @patch('habits.tasks.bot.send_message')
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
     def test_send_related_habits_notification_no_chat_id(self, mock_send):
         send_related_habits_notification(self.main_habit.id, self.user_without_chat.id)
         self.assertFalse(mock_send.called)
 
-    @patch('habits.tasks.bot.send_message')
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
     def test_send_related_habits_notification_no_related_no_reward(self, mock_send):
         # Убираем и связанную привычку, и вознаграждение
         self.main_habit.related_habit = None
@@ -110,3 +118,192 @@ class TasksTestCase(TestCase):
 
         send_related_habits_notification(self.main_habit.id, self.user_with_chat.id)
         self.assertFalse(mock_send.called)
+
+
+class DailyRemindersBatchingTestCase(EagerCeleryMixin, TestCase):
+    def create_users_with_habits(self, count, habits_per_user=3, start=0):
+        for i in range(start, start + count):
+            user = CustomUser.objects.create_user(
+                username=f'batch{i}',
+                email=f'batch{i}@example.com',
+                password='testpass123',
+                telegram_chat_id=str(1000 + i)
+            )
+            for j in range(habits_per_user):
+                Habit.objects.create(
+                    user=user,
+                    action=f'Привычка {j}',
+                    time='08:00',
+                    place='Дом',
+                    duration=60,
+                    reward='Награда',
+                    status='Active'
+                )
+        Habit.objects.update(next_due_at=timezone.now())
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_one_message_per_user(self, mock_send):
+        self.create_users_with_habits(3)
+        send_daily_reminders()
+        messages = [message for call in mock_send.call_args_list for message in call.args[0]]
+        self.assertEqual(len(messages), 3)
+        for chat_id, text in messages:
+            self.assertEqual(text.count('- Привычка'), 3)
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_query_count_does_not_depend_on_users(self, mock_send):
+        # Бенчмарк количества запросов: границы шардов, выборка шарда и перенос сроков одной пачкой,
+        # независимо от числа пользователей
+        self.create_users_with_habits(1)
+        with self.assertNumQueries(3):
+            send_daily_reminders()
+
+        self.create_users_with_habits(25, start=1)
+        with self.assertNumQueries(3):
+            send_daily_reminders()
+
+    @override_settings(REMINDER_SHARD_SIZE=4)
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_shards_cover_all_users_once(self, mock_send):
+        self.create_users_with_habits(10)
+        result = send_daily_reminders()
+        self.assertGreater(result['shards'], 1)
+
+        chat_ids = [chat_id for call in mock_send.call_args_list for chat_id, text in call.args[0]]
+        self.assertEqual(sorted(chat_ids), sorted(str(1000 + i) for i in range(10)))
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_locked_shard_is_skipped(self, mock_send):
+        self.create_users_with_habits(2)
+        cache.add('habits:reminders:shard:0:1000000', 'other-run')
+        try:
+            result = send_reminders_shard(0, 1000000, timezone.now().timestamp())
+        finally:
+            cache.delete('habits:reminders:shard:0:1000000')
+
+        self.assertTrue(result['skipped'])
+        self.assertFalse(mock_send.called)
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_habits_are_reminded_once_per_period(self, mock_send):
+        self.create_users_with_habits(2)
+        send_daily_reminders()
+        self.assertTrue(mock_send.called)
+
+        self.assertFalse(Habit.objects.filter(next_due_at__lte=timezone.now()).exists())
+        mock_send.reset_mock()
+        send_daily_reminders()
+        self.assertFalse(mock_send.called)
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_not_due_habits_are_skipped(self, mock_send):
+        self.create_users_with_habits(2)
+        Habit.objects.update(next_due_at=timezone.now() + timedelta(hours=1))
+        result = send_daily_reminders()
+        self.assertEqual(result['shards'], 0)
+        self.assertFalse(mock_send.called)
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_overdue_habits_are_reminded(self, mock_send):
+        self.create_users_with_habits(1)
+        Habit.objects.update(status='Overdue')
+        send_daily_reminders()
+        self.assertTrue(mock_send.called)
+        self.assertFalse(Habit.objects.filter(next_due_at__lte=timezone.now()).exists())
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_users_without_chat_are_rescheduled(self, mock_send):
+        self.create_users_with_habits(1)
+        CustomUser.objects.update(telegram_chat_id=None)
+        send_daily_reminders()
+        self.assertFalse(mock_send.called)
+        self.assertFalse(Habit.objects.filter(next_due_at__lte=timezone.now()).exists())
+
+
+class RolloverTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='roller',
+            email='roller@example.com',
+            password='testpass123'
+        )
+        self.today = timezone.localdate()
+
+    def create_habit(self, status, last_completed_on=None, periodicity=Habit.DAILY, created_days_ago=0, user=None):
+        habit = Habit.objects.create(
+            user=user or self.user, action='Привычка', time='08:00', place='Дом', duration=60, reward='Награда',
+            periodicity=periodicity,
+        )
+        Habit.objects.filter(pk=habit.pk).update(
+            status=status,
+            last_completed_on=last_completed_on,
+            created_at=timezone.now() - timedelta(days=created_days_ago),
+        )
+        return habit.pk
+
+    def status_of(self, pk):
+        return Habit.objects.get(pk=pk).status
+
+    def test_daily_rollover(self):
+        yesterday = self.create_habit('Completed', self.today - timedelta(days=1))
+        today = self.create_habit('Completed', self.today)
+        missed = self.create_habit('Active', self.today - timedelta(days=3), created_days_ago=10)
+        fresh = self.create_habit('Active')
+        never_done = self.create_habit('Active', created_days_ago=2)
+        long_ago = self.create_habit('Completed', self.today - timedelta(days=3), created_days_ago=10)
+
+        result = rollover_habit_statuses()
+
+        self.assertEqual(self.status_of(yesterday), 'Active')
+        self.assertEqual(self.status_of(today), 'Completed')
+        self.assertEqual(self.status_of(missed), 'Overdue')
+        self.assertEqual(self.status_of(fresh), 'Active')
+        self.assertEqual(self.status_of(never_done), 'Overdue')
+        self.assertEqual(self.status_of(long_ago), 'Overdue')
+        self.assertEqual(result, {'reset': 2, 'overdue': 3})
+
+    @patch('habits.tasks.deliver_messages', return_value=DeliveryStats())
+    def test_reset_moves_due_time_forward(self, mock_send):
+        # Выполнена вчера раньше срока: напоминание не отправлялось, и срок остался в прошлом
+        pk = self.create_habit('Completed', self.today - timedelta(days=1))
+        Habit.objects.filter(pk=pk).update(next_due_at=first_due(time(8), timezone.now() - timedelta(days=2)))
+
+        rollover_habit_statuses()
+        habit = Habit.objects.get(pk=pk)
+        self.assertEqual(habit.status, 'Active')
+        self.assertGreater(habit.next_due_at, timezone.now())
+        self.assertEqual(timezone.localtime(habit.next_due_at).time(), habit.time)
+
+        send_daily_reminders()
+        self.assertFalse(mock_send.called)
+
+    def test_monthly_habit_completed_this_month_stays_completed(self):
+        pk = self.create_habit('Completed', self.today.replace(day=1), periodicity=Habit.MONTHLY)
+        rollover_habit_statuses()
+        self.assertEqual(self.status_of(pk), 'Completed')
+
+    def test_is_idempotent(self):
+        self.create_habit('Completed', self.today - timedelta(days=1))
+        self.create_habit('Active', self.today - timedelta(days=5), created_days_ago=10)
+        rollover_habit_statuses()
+        self.assertEqual(rollover_habit_statuses(), {'reset': 0, 'overdue': 0})
+
+    def test_small_batches_cover_all_rows(self):
+        for _ in range(5):
+            self.create_habit('Completed', self.today - timedelta(days=1))
+        result = rollover_habit_statuses(batch_size=2)
+        self.assertEqual(result['reset'], 5)
+        self.assertFalse(Habit.objects.filter(status='Completed').exists())
+
+    def test_query_count_does_not_depend_on_rows(self):
+        users = [self.user] + [
+            CustomUser.objects.create_user(username=f'roller{i}', email=f'roller{i}@example.com', password='pass')
+            for i in range(9)
+        ]
+        for user in users:
+            for _ in range(2):
+                self.create_habit('Completed', self.today - timedelta(days=1), user=user)
+        # Сброс и просрочка по каждой периодичности: выборка порции с блокировкой и SAVEPOINT/RELEASE.
+        # У непустой порции еще UPDATE ... RETURNING и один сдвиг сводок на всех ее пользователей
+        with self.assertNumQueries(20):
+            rollover_habit_statuses(batch_size=100)
@@ -1,9 +1,13 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from habits.models import Habit
 from users.models import CustomUser
 from django.utils import timezone
+from unittest.mock import patch
+from habits.paginators import HabitCursorPagination
 
 
 class HabitViewSetTestCase(APITestCase):
@@ -145,3 +149,241 @@ class HabitViewSetTestCase(APITestCase):
             'Можно указать либо вознаграждение, либо связанную привычку, но не оба',
             str(response.data)
         )
+
+
+class HabitCursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='pager',
+            email='pager@example.com',
+            password='testpass123'
+        )
+        for i in range(12):
+            Habit.objects.create(
+                user=self.user,
+                action=f'Привычка {i}',
+                time='08:00',
+                place='Дом',
+                duration=60,
+                is_public=True,
+                reward='Награда'
+            )
+
+    def test_walks_all_pages_without_duplicates(self):
+        url = reverse('habits:habits-public')
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(habit['id'] for habit in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(len(set(seen)), 12)
+
+    def test_equal_timestamps_across_page_boundary(self):
+        Habit.objects.update(created_at=timezone.now())
+        url = reverse('habits:habits-public')
+        pages = []
+        with CaptureQueriesContext(connection) as captured:
+            while url:
+                response = self.client.get(url, {'page_size': 5} if not pages else None)
+                pages.append([habit['id'] for habit in response.data['results']])
+                url = response.data['next']
+
+        seen = [pk for page in pages for pk in page]
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(set(seen)), 12)
+        for query in captured:
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+        # Обратно по ссылке previous — те же страницы
+        previous = self.client.get(response.data['previous']).data
+        self.assertEqual([habit['id'] for habit in previous['results']], pages[-2])
+
+    def test_page_size_is_capped(self):
+        with patch.object(HabitCursorPagination, 'max_page_size', 4):
+            response = self.client.get(reverse('habits:habits-public'), {'page_size': 1000000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_page_does_not_count_rows(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('habits:habits-public'), {'page_size': 3})
+
+
+class HabitBulkTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='bulk',
+            email='bulk@example.com',
+            password='testpass123'
+        )
+        self.other_user = CustomUser.objects.create_user(
+            username='bulkother',
+            email='bulkother@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('habits:habits-bulk')
+
+    def habit_data(self, i, **extra):
+        data = {'action': f'Привычка {i}', 'time': '08:00:00', 'place': 'Дом', 'duration': 60, 'reward': 'Награда'}
+        data.update(extra)
+        return data
+
+    def create_habits(self, count, user=None):
+        return [
+            Habit.objects.create(user=user or self.user, action=f'Привычка {i}', time='08:00', place='Дом',
+                                 duration=60, reward='Награда')
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        response = self.client.post(self.url, [self.habit_data(i) for i in range(5)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Habit.objects.filter(user=self.user).count(), 5)
+        self.assertFalse(Habit.objects.filter(next_due_at__isnull=True).exists())
+
+    def test_bulk_create_query_count_does_not_depend_on_size(self):
+        self.create_habits(1)
+        # INSERT привычек и сдвиг сводки пользователя; SAVEPOINT/RELEASE — от транзакции
+        with self.assertNumQueries(4):
+            self.client.post(self.url, [self.habit_data(i) for i in range(2)], format='json')
+        with self.assertNumQueries(4):
+            self.client.post(self.url, [self.habit_data(i) for i in range(50)], format='json')
+
+    def test_bulk_create_loads_related_habits_once(self):
+        pleasant = Habit.objects.create(user=self.user, action='Приятная', time='20:00', place='Дом',
+                                        duration=60, is_pleasant=True)
+
+        def data(count):
+            return [self.habit_data(i, reward=None, related_habit=pleasant.id) for i in range(count)]
+
+        # Связанные привычки одним in_bulk, INSERT и сдвиг сводки; SAVEPOINT/RELEASE — от транзакции
+        with self.assertNumQueries(5):
+            self.client.post(self.url, data(2), format='json')
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, data(30), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Habit.objects.filter(related_habit=pleasant).count(), 32)
+
+    def test_bulk_create_unknown_related_habit(self):
+        data = [
+            self.habit_data(0, reward=None, related_habit=999999),
+            self.habit_data(1, reward=None, related_habit='abc'),
+        ]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('related_habit', response.data[0])
+        self.assertIn('related_habit', response.data[1])
+
+    def test_bulk_update_rejects_malformed_ids(self):
+        for data in ([{'id': 'abc'}], [{'id': [1]}], [{'id': None}], [{'id': True}]):
+            response = self.client.patch(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
+    def test_bulk_create_validates_everything_first(self):
+        pleasant = Habit.objects.create(user=self.user, action='Приятная', time='08:00', place='Дом',
+                                        duration=60, is_pleasant=False, reward='Награда')
+        data = [self.habit_data(0), self.habit_data(1, reward=None, related_habit=pleasant.id)]
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('Связанная привычка должна быть приятной.', str(response.data[1]))
+        self.assertEqual(Habit.objects.count(), 1)
+
+    def test_bulk_create_size_limit(self):
+        with self.settings(HABITS_BULK_MAX_SIZE=2):
+            response = self.client.post(self.url, [self.habit_data(i) for i in range(3)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_partial_update(self):
+        habits = self.create_habits(3)
+        data = [{'id': habit.id, 'place': 'Офис'} for habit in habits]
+        with self.assertNumQueries(4):
+            response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Habit.objects.filter(place='Офис').count(), 3)
+
+    def test_bulk_update_foreign_habits_not_found(self):
+        own = self.create_habits(1)[0]
+        foreign = self.create_habits(1, user=self.other_user)[0]
+        data = [{'id': own.id, 'place': 'Офис'}, {'id': foreign.id, 'place': 'Офис'}]
+        response = self.client.patch(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['missing'], [foreign.id])
+        self.assertFalse(Habit.objects.filter(place='Офис').exists())
+
+    @patch('habits.views.send_related_habits_notifications.delay')
+    def test_bulk_perform(self, mock_delay):
+        habits = self.create_habits(3)
+        foreign = self.create_habits(1, user=self.other_user)[0]
+        Habit.objects.filter(pk=habits[2].pk).update(status='Completed')
+
+        ids = [habit.id for habit in habits] + [foreign.id]
+        response = self.client.post(reverse('habits:habits-bulk-perform'), {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data['completed']), [habits[0].id, habits[1].id])
+        self.assertEqual(sorted(response.data['skipped']), sorted([habits[2].id, foreign.id]))
+        self.assertEqual(Habit.objects.filter(user=self.user, status='Completed').count(), 3)
+        self.assertEqual(Habit.objects.get(pk=foreign.pk).status, 'Active')
+        mock_delay.assert_called_once()
+
+    def test_bulk_perform_rejects_malformed_ids(self):
+        for ids in ([True], [False], ['1'], [None], [], 'abc'):
+            response = self.client.post(reverse('habits:habits-bulk-perform'), {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, ids)
+
+
+class HabitPerformQueriesTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='performer',
+            email='performer@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.pleasant = Habit.objects.create(
+            user=self.user, action='Приятная', time='20:00', place='Дом', duration=60, is_pleasant=True,
+        )
+        self.habit = Habit.objects.create(
+            user=self.user, action='Основная', time='08:00', place='Дом', duration=60, reward='Награда',
+        )
+        self.url = reverse('habits:habits-perform', args=[self.habit.id])
+
+    @patch('habits.views.send_related_habits_notification.delay')
+    def test_success_is_a_single_query(self, mock_delay):
+        # Блокировка, UPDATE ... RETURNING, вставка в журнал и сдвиг сводки — один запрос
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['habit_id'], self.habit.id)
+        self.assertEqual(response.data['action'], 'Основная')
+        self.assertFalse(response.data['has_related'])
+        mock_delay.assert_called_once_with(self.habit.id, self.user.id)
+
+    @patch('habits.views.send_related_habits_notification.delay')
+    def test_has_related_is_returned_by_update(self, mock_delay):
+        Habit.objects.create(
+            user=self.user, action='Связанная', time='09:00', place='Дом', duration=60,
+            related_habit=self.pleasant,
+        )
+        response = self.client.post(reverse('habits:habits-perform', args=[self.pleasant.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['has_related'])
+
+    @patch('habits.views.send_related_habits_notification.delay')
+    def test_double_tap_completes_once(self, mock_delay):
+        first = self.client.post(self.url)
+        with self.assertNumQueries(2):
+            second = self.client.post(self.url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_called_once()
+
+    def test_missing_habit(self):
+        response = self.client.post(reverse('habits:habits-perform', args=[self.habit.id + 1000]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
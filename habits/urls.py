@@ -1,4 +1,6 @@
+import habits.async_views as async_views
 import habits.views as views
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 app_name = 'habits'
@@ -7,4 +9,9 @@ router = DefaultRouter()
 
 router.register("habits", views.HabitViewSet, basename="habits")
 
-urlpatterns = [] + router.urls
+urlpatterns = [
+    # Асинхронные чтения для запуска под ASGI (config.asgi)
+    path('async/habits/', async_views.habit_list, name='async-habits-list'),
+    path('async/habits/public/', async_views.habit_public, name='async-habits-public'),
+    path('async/habits/<int:pk>/', async_views.habit_detail, name='async-habits-detail'),
+] + router.urls
@@ -1,17 +1,27 @@
-from django.db.models import Q
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import viewsets, permissions, status
+from habits.cache import get_public_page, invalidate_public_feed, set_public_page
+from habits.conditional import make_etag, not_modified, with_validators
+from habits.export import EXPORT_FORMATS, export_response
 from habits.models import Habit
-from habits.serializers import HabitSerializer
-from habits.paginators import MyPagination
+from habits.serializers import HabitSerializer, UserHabitStatsSerializer
+from habits.stats import user_stats
+from habits.streaks import adherence, current_streak
+from habits.paginators import HabitCursorPagination
 from habits.permissions import IsOwner
-from habits.tasks import send_related_habits_notification
+from habits.rows import RowSerializer
+from habits.tasks import send_related_habits_notification, send_related_habits_notifications
 
 
 class HabitViewSet(viewsets.ModelViewSet):
     serializer_class = HabitSerializer
-    pagination_class = MyPagination
+    pagination_class = HabitCursorPagination
     permission_classes = [permissions.IsAuthenticated]  # Чтение для всех, запись для авторизованных
 
     def get_queryset(self):
@@ -19,6 +29,39 @@ class HabitViewSet(viewsets.ModelViewSet):
             return Habit.objects.filter(user=self.request.user)
         return Habit.objects.none()
 
+    def list(self, request, *args, **kwargs):
+        # Версия списка — количество привычек и время последнего изменения (по индексу user, updated_at)
+        queryset = self.filter_queryset(self.get_queryset())
+        version = queryset.aggregate(count=Count('id'), modified=Max('updated_at'))
+        etag = make_etag('habits', request.user.id, version['count'], version['modified'])
+        response = not_modified(request, etag, version['modified'])
+        if response is not None:
+            return response
+
+        # Только чтение: строки .values() отдаются словарями, без модельных объектов и полей сериализатора
+        rows = RowSerializer(HabitSerializer, context=self.get_serializer_context())
+        page = self.paginate_queryset(rows.rows(queryset))
+        if page is not None:
+            response = self.get_paginated_response(rows.to_representation(page))
+        else:
+            response = Response(rows.to_representation(rows.rows(queryset)))
+        return with_validators(response, etag, version['modified'])
+
+    def retrieve(self, request, *args, **kwargs):
+        # Версия привычки читается одной легкой выборкой; при совпадении ETag тело не строится
+        try:
+            version = self.get_queryset().filter(pk=kwargs['pk']).values_list('created_at', 'updated_at').first()
+        except (TypeError, ValueError):
+            version = None
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = make_etag('habit', kwargs['pk'], *version)
+        response = not_modified(request, etag, version[1])
+        if response is not None:
+            return response
+        return with_validators(super().retrieve(request, *args, **kwargs), etag, version[1])
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -31,46 +74,180 @@ class HabitViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def public(self, request):
-        queryset = Habit.objects.filter(is_public=True)
+        # Лента одинакова для всех, поэтому страницы отдаются из кеша до изменения публичных привычек
+        page = get_public_page(request)
+        if page is not None:
+            data, built_at = page
+            etag = make_etag('public', built_at)
+            response = not_modified(request, etag, built_at)
+            if response is not None:
+                return response
+            return with_validators(Response(data, headers={'X-Cache': 'HIT'}), etag, built_at)
+
+        rows = RowSerializer(HabitSerializer, context=self.get_serializer_context())
+        queryset = rows.rows(Habit.objects.filter(is_public=True))
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(queryset, many=True)
+            data = self.get_paginated_response(rows.to_representation(page)).data
+        else:
+            data = rows.to_representation(queryset)
+
+        built_at = set_public_page(request, data)
+        return with_validators(Response(data, headers={'X-Cache': 'MISS'}), make_etag('public', built_at), built_at)
+
+    @action(detail=False, methods=['post', 'patch'])
+    def bulk(self, request):
+        """Массовое создание (POST) или частичное обновление (PATCH, элементы с id) привычек."""
+        max_size = settings.HABITS_BULK_MAX_SIZE
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True, max_length=max_size)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        items = request.data
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict) and isinstance(item.get('id'), int) and not isinstance(item['id'], bool)
+            for item in items
+        ):
+            return Response(
+                {"detail": "Ожидается список привычек, у каждой должен быть указан целочисленный id"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_size:
+            return Response(
+                {"detail": f"Можно обновить не более {max_size} привычек за раз"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = [item['id'] for item in items]
+        if len(set(ids)) != len(ids):
+            return Response({"detail": "Идентификаторы привычек повторяются"}, status=status.HTTP_400_BAD_REQUEST)
+
+        habits = self.get_queryset().select_related('related_habit').in_bulk(ids)
+        missing = [pk for pk in ids if pk not in habits]
+        if missing:
+            return Response(
+                {"detail": "Привычки не найдены", "missing": missing},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        serializer = self.get_serializer(habits, data=items, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='bulk-perform')
+    def bulk_perform(self, request):
+        """Отмечает выполненными сразу несколько своих привычек."""
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or not all(
+            isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+        ):
+            return Response({"detail": "Ожидается непустой список ids"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.HABITS_BULK_MAX_SIZE:
+            return Response(
+                {"detail": f"Можно отметить не более {settings.HABITS_BULK_MAX_SIZE} привычек за раз"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        completed = {pk: is_public for pk, _, is_public, _ in Habit.objects.complete(ids, request.user.id)}
+
+        if completed:
+            send_related_habits_notifications.delay(list(completed), request.user.id)
+        if any(completed.values()):
+            invalidate_public_feed()
+
+        return Response(
+            {
+                "status": "success",
+                "completed": list(completed),
+                "skipped": [pk for pk in ids if pk not in completed],
+            },
+            status=status.HTTP_200_OK
+        )
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Потоковая выгрузка своих привычек (?file_format=csv|ndjson); персонал может выгрузить все (?all=true)."""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Формат выгрузки: {', '.join(EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.get_queryset()
+        if request.query_params.get('all') == 'true':
+            if not request.user.is_staff:
+                return Response(
+                    {"detail": "Выгрузка всех привычек доступна только персоналу"}, status=status.HTTP_403_FORBIDDEN
+                )
+            queryset = Habit.objects.all()
+
+        rows = RowSerializer(HabitSerializer, context=self.get_serializer_context())
+        return export_response(rows, queryset.order_by('id'), file_format, filename='habits')
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """Сводка по привычкам пользователя: одна строка вместо подсчета по всем его привычкам."""
+        return Response(UserHabitStatsSerializer(user_stats(request.user.id)).data)
+
+    @action(detail=True, methods=['get'])
+    def streak(self, request, pk=None):
+        """Серии выполнения и регулярность привычки за последние 30 дней."""
+        habit = self.get_object()
+        days = 30
+        since = timezone.localdate() - timedelta(days=days - 1)
+        completions = habit.completions.filter(completed_on__gte=since).count()
+
+        return Response({
+            "habit_id": habit.id,
+            "current_streak": current_streak(habit),
+            "longest_streak": habit.longest_streak,
+            "last_completed_on": habit.last_completed_on,
+            "completions_30d": completions,
+            "adherence_30d": adherence(habit, completions, days),
+        })
+
     @action(detail=True, methods=['post'])
     def perform(self, request, pk=None):
         try:
-            habit = Habit.objects.get(pk=pk)
-        except Habit.DoesNotExist:
+            pk = int(pk)
+        except (TypeError, ValueError):
             return Response({"detail": "Привычка не найдена"}, status=status.HTTP_404_NOT_FOUND)
 
-        if habit.user != request.user:
-            return Response(
-                {"detail": "Вы не можете отмечать выполнение чужих привычек"},
-                status=status.HTTP_403_FORBIDDEN
-            )
+        # Один условный UPDATE: без гонок при двойном нажатии и без лишних выборок
+        completed = Habit.objects.complete([pk], request.user.id)
 
-        if habit.status == "Completed":
+        if not completed:
+            # Разбираемся, почему привычка не обновилась — только на неуспешном пути
+            habit = Habit.objects.filter(pk=pk).values('user_id', 'status').first()
+            if habit is None:
+                return Response({"detail": "Привычка не найдена"}, status=status.HTTP_404_NOT_FOUND)
+            if habit['user_id'] != request.user.id:
+                return Response(
+                    {"detail": "Вы не можете отмечать выполнение чужих привычек"},
+                    status=status.HTTP_403_FORBIDDEN
+                )
             return Response(
                 {"detail": "Эта привычка уже выполнена"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Обновляем статус
-        habit.status = "Completed"
-        habit.save()
+        habit_id, habit_action, is_public, has_related = completed[0]
+        if is_public:
+            invalidate_public_feed()
 
-        send_related_habits_notification.delay(habit.id, request.user.id)
+        send_related_habits_notification.delay(habit_id, request.user.id)
 
         return Response(
             {
                 "status": "success",
                 "message": "Привычка отмечена как выполненная",
-                "habit_id": habit.id,
-                "action": habit.action,
-                "has_related": habit.main_habits.filter(status="Active").exists()
+                "habit_id": habit_id,
+                "action": habit_action,
+                "has_related": has_related
             },
             status=status.HTTP_200_OK
         )
@@ -0,0 +1,21 @@
+from rest_framework import exceptions
+
+from config.async_api import async_api_view, json_response
+from habits.rows import RowSerializer
+from users.models import CustomUser
+from users.serializers import PrivateUserSerializer, PublicUserSerializer
+
+
+@async_api_view(require_auth=True)
+async def user_detail(request, email):
+    """Асинхронный вариант CustomUserDetailAPIView: свой профиль полностью, чужой — публичные поля."""
+    # Публичные поля — часть приватных, поэтому строка читается одна, а сериализатор выбирается по id:
+    # email пользователя из claims токена не загружен
+    context = {'request': request}
+    rows = RowSerializer(PrivateUserSerializer, context=context)
+    row = await rows.rows(CustomUser.objects.filter(email=email)).afirst()
+    if row is None:
+        raise exceptions.NotFound()
+    if row['pk'] != request.user.pk:
+        rows = RowSerializer(PublicUserSerializer, context=context)
+    return json_response(rows.to_representation([row])[0])
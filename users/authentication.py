@@ -0,0 +1,119 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import CustomUser
+
+# Поля пользователя, которые кладутся в токены при выдаче и обновлении
+TOKEN_USER_CLAIMS = ('is_staff', 'is_active')
+
+CLAIMS_KEY = "users:claims:{}"
+
+# Актуальные claims в памяти процесса: id пользователя -> (claims или None, когда перепроверить)
+_current_claims = {}
+MAX_CACHED_CLAIMS = 10_000
+
+
+def set_user_claims(token, user):
+    for claim in TOKEN_USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def publish_claims(claims_by_user):
+    """Запоминает новые значения claims пользователей, например ``{id: {'is_active': False}}``.
+
+    Уже выданные токены с другими значениями (заблокированного пользователя, со снятыми
+    правами) отклоняются. Запись в общем кеше живет, пока живет access-токен; другие
+    процессы увидят ее не позже чем через JWT_REVOCATION_CHECK_TTL секунд.
+    """
+    lifetime = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set_many({CLAIMS_KEY.format(user_id): claims for user_id, claims in claims_by_user.items()}, lifetime)
+    for user_id in claims_by_user:
+        _current_claims.pop(user_id, None)
+
+
+def _remember_claims(user_id, value, now):
+    if len(_current_claims) >= MAX_CACHED_CLAIMS:
+        _current_claims.clear()
+    _current_claims[user_id] = (value, now + settings.JWT_REVOCATION_CHECK_TTL)
+    return value
+
+
+def current_claims(user_id):
+    """Claims, изменившиеся за время жизни access-токена, или None; общий кеш опрашивается не на каждый запрос."""
+    now = time.monotonic()
+    cached = _current_claims.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    return _remember_claims(user_id, cache.get(CLAIMS_KEY.format(user_id)), now)
+
+
+async def acurrent_claims(user_id):
+    """Асинхронный вариант ``current_claims``."""
+    now = time.monotonic()
+    cached = _current_claims.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    return _remember_claims(user_id, await cache.aget(CLAIMS_KEY.format(user_id)), now)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя из БД на каждый запрос.
+
+    Пользователь собирается из claims токена как частично загруженный CustomUser:
+    остальные поля подгружаются из БД, только если к ним обратятся. Токены,
+    выданные до блокировки или снятия прав, отклоняются по опубликованным claims.
+    """
+
+    def get_user(self, validated_token):
+        if not self.has_claims(validated_token):
+            # Токен выдан без claims пользователя — обычная проверка по БД
+            return super().get_user(validated_token)
+        user_id = self.get_user_id(validated_token)
+        return self.user_from_claims(validated_token, user_id, current_claims(user_id))
+
+    async def aget_user(self, validated_token):
+        """Асинхронный вариант ``get_user``: токен без claims проверяется асинхронным ORM."""
+        user_id = self.get_user_id(validated_token)
+        if self.has_claims(validated_token):
+            return self.user_from_claims(validated_token, user_id, await acurrent_claims(user_id))
+
+        user = await self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    @staticmethod
+    def has_claims(validated_token):
+        return all(claim in validated_token for claim in TOKEN_USER_CLAIMS)
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def user_from_claims(validated_token, user_id, changed):
+        if not validated_token['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if changed and any(validated_token[claim] != value for claim, value in changed.items()):
+            raise AuthenticationFailed('Токен отозван, войдите заново', code='token_revoked')
+
+        # from_db ждет значения в порядке полей модели
+        values = {claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS}
+        values[api_settings.USER_ID_FIELD] = user_id
+        field_names = [field.attname for field in CustomUser._meta.concrete_fields if field.attname in values]
+        # С алиасом базы save() обновит только загруженные поля, а не дочитает всю строку по одному полю
+        db = router.db_for_read(CustomUser)
+        return CustomUser.from_db(db, field_names, [values[name] for name in field_names])
@@ -0,0 +1,42 @@
+from django.db import connection
+from django.db.models import Q
+
+from users.models import CustomUser
+
+
+def inactive_users(cutoff):
+    """Активные пользователи, которые не заходили с ``cutoff`` или не заходили ни разу."""
+    return CustomUser.objects.filter(is_active=True).filter(Q(last_login__lt=cutoff) | Q(last_login__isnull=True))
+
+
+def deactivate_in_batches(cutoff, batch_size):
+    """Деактивирует неактивных пользователей порциями и отдает (id, email) каждой порции.
+
+    Порции идут по возрастанию id (keyset), строки в памяти не копятся. Условие
+    повторяется в UPDATE, поэтому пользователь, вошедший между выборкой порции и
+    обновлением, не деактивируется и в отчет не попадает.
+    """
+    quote = connection.ops.quote_name
+    table = quote(CustomUser._meta.db_table)
+    last_id = 0
+    while True:
+        ids = list(
+            inactive_users(cutoff).filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        last_id = ids[-1]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {quote('is_active')} = %s "
+                f"WHERE {quote('id')} IN ({', '.join(['%s'] * len(ids))}) AND {quote('is_active')} = %s "
+                f"AND ({quote('last_login')} < %s OR {quote('last_login')} IS NULL) "
+                f"RETURNING {quote('id')}, {quote('email')}",
+                [False, *ids, True, cutoff],
+            )
+            deactivated = cursor.fetchall()
+        if deactivated:
+            yield deactivated
+        if len(ids) < batch_size:
+            return
@@ -0,0 +1,89 @@
+import logging
+import smtplib
+from itertools import islice
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class MailDeferred(Exception):
+    """Временная ошибка SMTP: ``remaining`` — письма, которые еще не отправлены."""
+
+    def __init__(self, remaining, sent, failed):
+        super().__init__(f"Не отправлено писем: {len(remaining)}")
+        self.remaining = remaining
+        self.sent = sent
+        self.failed = failed
+
+
+def is_permanent(exc):
+    # 5xx и отказ всех получателей повторять бессмысленно, остальное (4xx, обрыв соединения) — временно
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+
+
+def send_messages(datatuple, connection=None):
+    """Отправляет письма ``(subject, message, from_email, recipient_list)`` через одно SMTP-соединение.
+
+    Как ``send_mass_mail``, но письмо, отклоненное сервером окончательно, пропускается,
+    а при временной ошибке поднимается ``MailDeferred`` с неотправленным остатком.
+    Возвращает пару (отправлено, отклонено).
+    """
+    datatuple = list(datatuple)
+    connection = connection or get_connection(fail_silently=False)
+    sent = failed = 0
+    try:
+        connection.open()
+    except (smtplib.SMTPException, OSError) as exc:
+        raise MailDeferred(datatuple, sent, failed) from exc
+    try:
+        for index, (subject, message, from_email, recipient_list) in enumerate(datatuple):
+            email = EmailMessage(subject, message, from_email, recipient_list, connection=connection)
+            try:
+                email.send()
+            except (smtplib.SMTPException, OSError) as exc:
+                if not is_permanent(exc):
+                    raise MailDeferred(datatuple[index:], sent, failed) from exc
+                failed += 1
+                logger.warning("Письмо для %s отклонено: %s", recipient_list, exc)
+            else:
+                sent += 1
+    finally:
+        connection.close()
+    return sent, failed
+
+
+@shared_task(bind=True)
+def send_mail_batch(self, datatuple):
+    """Порция писем одним соединением; при временной ошибке повторяется только неотправленный остаток."""
+    try:
+        sent, failed = send_messages(datatuple)
+    except MailDeferred as deferred:
+        logger.warning("Отправка отложена после %s писем: %s", deferred.sent, deferred.__cause__)
+        raise self.retry(
+            args=[deferred.remaining],
+            exc=deferred.__cause__,
+            countdown=settings.EMAIL_RETRY_BACKOFF * 2 ** self.request.retries,
+            max_retries=settings.EMAIL_SEND_RETRIES,
+        )
+    return {"sent": sent, "failed": failed}
+
+
+def queue_mass_mail(datatuple, batch_size=None):
+    """Ставит письма в очередь Celery порциями по EMAIL_BATCH_SIZE; возвращает число задач."""
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    datatuple = iter(datatuple)
+    tasks = 0
+    while batch := list(islice(datatuple, batch_size)):
+        send_mail_batch.delay(batch)
+        tasks += 1
+    return tasks
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """Неблокирующая замена ``send_mail``: письмо отправит воркер Celery."""
+    return queue_mass_mail([(subject, message, from_email, recipient_list)])
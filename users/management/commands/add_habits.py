@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from habits.importing import HabitImporter, read_records
 from habits.models import Habit
-from django.core.management import call_command
 
 
 class Command(BaseCommand):
@@ -9,10 +10,24 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write("Очистка существующих данных...")
 
-        # Удаляем все привычки
-        Habit.objects.all().delete()
+        # Потоковый импорт порциями вместо loaddata, который сохраняет каждый объект отдельным save().
+        # Если хоть одна запись отклонена, откатываются и удаление, и импорт
+        importer = HabitImporter(method='copy' if connection.vendor == 'postgresql' else 'insert')
+        with transaction.atomic():
+            # Удаляем все привычки
+            Habit.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS("Старые данные успешно удалены!"))
 
-        self.stdout.write(self.style.SUCCESS("Старые данные успешно удалены!"))
+            with open('habits_fixture.json', encoding='utf-8') as file:
+                importer.run(read_records(file, 'json'))
 
-        call_command('loaddata', 'habits_fixture.json')
-        self.stdout.write(self.style.SUCCESS('Данные успешно загружены!'))
+            if importer.error_count:
+                for number, message in importer.errors:
+                    self.stderr.write(f'Запись {number}: {message}')
+                raise CommandError(
+                    f'Отклонено записей: {importer.error_count} (корректных: {importer.imported}), изменения отменены'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные успешно загружены: {importer.imported} привычек, связей: {importer.linked}'
+        ))
@@ -0,0 +1,42 @@
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from habits.benchmarks import Timer
+from users.mailing import send_mail_batch
+from users.testing import FakeSMTPServer
+
+
+class Command(BaseCommand):
+    help = 'Отправка писем на локальную заглушку SMTP: send_mail на каждое письмо против порций одним соединением'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='Сколько писем отправить')
+        parser.add_argument('--batch-size', type=int, default=100, help='Писем на одно соединение')
+        parser.add_argument(
+            '--latency', type=float, default=0.005, help='Задержка ответа сервера на каждую команду SMTP, с'
+        )
+
+    def handle(self, *args, **options):
+        messages = [
+            (f'Письмо {number}', 'Текст письма', 'robot@example.com', [f'user{number}@example.com'])
+            for number in range(options['messages'])
+        ]
+        batch_size = options['batch_size']
+        self.stdout.write(f"Писем: {len(messages)}, задержка ответа сервера: {options['latency'] * 1000:.0f} мс")
+
+        with FakeSMTPServer(latency=options['latency']) as server, override_settings(**server.connection_settings()):
+            with Timer() as single:
+                for subject, message, from_email, recipient_list in messages:
+                    send_mail(subject, message, from_email, recipient_list)
+            self.report('send_mail на каждое письмо', single.elapsed, len(messages), server.connections)
+
+            connections = server.connections
+            with Timer() as batched:
+                for start in range(0, len(messages), batch_size):
+                    send_mail_batch.apply(args=[messages[start:start + batch_size]]).get()
+            connections = server.connections - connections
+            self.report(f'Порции по {batch_size} писем', batched.elapsed, len(messages), connections)
+
+    def report(self, label, elapsed, count, connections):
+        self.stdout.write(f"{label:<30} {elapsed:7.2f} с  {count / elapsed:8.0f} писем/с  соединений: {connections}")
@@ -43,5 +43,33 @@ class CustomUser(AbstractUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    # Поля, при изменении которых отзываются выданные токены (см. users.signals)
+    TRACKED_FIELDS = ('is_active', 'is_staff')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def _remember_loaded_values(self):
+        # Отложенные поля не запоминаются: их значение на момент загрузки неизвестно
+        self._loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def tracked_fields_changed(self):
+        """Изменились ли с момента загрузки из БД поля из TRACKED_FIELDS."""
+        loaded = getattr(self, '_loaded_values', {})
+        return any(self.__dict__.get(name) != value for name, value in loaded.items())
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_loaded_values()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Поиск давно не заходивших активных пользователей для деактивации
+            models.Index(fields=['is_active', 'last_login'], name='user_active_last_login_idx'),
+        ]
+
     def __str__(self):
         return self.email
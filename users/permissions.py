@@ -3,7 +3,8 @@ from rest_framework import permissions
 
 class IsOwnerOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.email == request.user.email or request.user.is_staff
+        # Сравнение по pk: у пользователя из токена email не загружен и читался бы отдельным запросом
+        return obj.pk == request.user.pk or request.user.is_staff
 
 
 class IsProfileOwner(permissions.BasePermission):
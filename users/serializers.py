@@ -1,4 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .authentication import TOKEN_USER_CLAIMS, set_user_claims
 from .models import CustomUser
 
 
@@ -44,6 +48,7 @@ class PublicUserSerializer(serializers.ModelSerializer):
 
 
 class PrivateUserSerializer(serializers.ModelSerializer):
+    # Поля payments здесь нет: у CustomUser нет такой связи, и с ним каждый GET своего профиля падал
     class Meta:
         model = CustomUser
         fields = [
@@ -56,7 +61,6 @@ class PrivateUserSerializer(serializers.ModelSerializer):
             'email',
             'avatar',
             'date_joined',
-            'payments'
         ]
 
 
@@ -67,3 +71,54 @@ class TelegramConnectSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'telegram_chat_id': {'required': True}
         }
+
+    def update(self, instance, validated_data):
+        # request.user собран из claims токена: в БД пишутся только присланные поля,
+        # а не is_staff и is_active, которые в токене могли устареть
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдает токены с полями пользователя, по которым ClaimsJWTAuthentication обходится без БД."""
+
+    @classmethod
+    def get_token(cls, user):
+        return set_user_claims(super().get_token(user), user)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Новый access-токен получает текущие права пользователя, а не записанные при входе."""
+
+    def validate(self, attrs):
+        # Повторяет TokenRefreshSerializer.validate, но пользователь читается один раз:
+        # та же строка проверяется и дает claims для нового токена
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = CustomUser.objects.only(*TOKEN_USER_CLAIMS).filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        ).first() if user_id else None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        set_user_claims(refresh, user)
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Приложение token_blacklist не подключено
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+
+            data['refresh'] = str(refresh)
+
+        return data
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.authentication import TOKEN_USER_CLAIMS, publish_claims
+from users.models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_changed_user_tokens(sender, instance, created=False, raw=False, **kwargs):
+    # В токенах записаны is_active и is_staff: после их изменения старые токены недействительны
+    if not created and not raw and instance.tracked_fields_changed():
+        publish_claims({instance.pk: {claim: getattr(instance, claim) for claim in TOKEN_USER_CLAIMS}})
+
+
+@receiver(post_delete, sender=CustomUser)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    publish_claims({instance.pk: {'is_active': False}})
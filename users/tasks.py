@@ -1,34 +1,40 @@
 from datetime import timedelta
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from users.models import CustomUser
-# Нужен для создания сложных запросов к бд
-from django.db.models import Q
 
-from django.core.mail import send_mail
-import config.settings as settings
+from users.authentication import publish_claims
+from users.deactivation import deactivate_in_batches
+from users.mailing import queue_mail
 
 
 @shared_task
-def check_last_login():
-    """Деактивирует пользователей, которые не заходили более 1 месяца."""
-    now = timezone.now()
-
-    one_month_ago = now - timedelta(days=30)
-
-    inactive_users = CustomUser.objects.filter(
-        is_active=True).filter(
-        Q(last_login__lt=one_month_ago) | Q(last_login__isnull=True)
-    )
-
-    subject = "Деактивация неактивных пользователей!"
-    message = f"Данные пользователи были деактивированы: {[user.email for user in inactive_users]}"
-
-    from_email = settings.EMAIL_HOST_USER
-
-    send_mail(subject, message, from_email, [from_email], fail_silently=False, )
-
-    # Массовое обновление (одним запросом к БД)
-    count_updated = inactive_users.update(is_active=False)
+def check_last_login(batch_size=None):
+    """Деактивирует пользователей, которые не заходили более INACTIVE_USER_DAYS дней.
+
+    Пользователи деактивируются порциями, в отчет попадают число деактивированных
+    и первые USERS_DEACTIVATION_REPORT_SAMPLE адресов, а не весь список.
+    """
+    batch_size = batch_size or settings.USERS_DEACTIVATION_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=settings.INACTIVE_USER_DAYS)
+
+    count_updated = 0
+    sample = []
+    for batch in deactivate_in_batches(cutoff, batch_size):
+        count_updated += len(batch)
+        sample.extend(email for _, email in batch[:settings.USERS_DEACTIVATION_REPORT_SAMPLE - len(sample)])
+        # UPDATE идет мимо сигналов: уже выданные токены отзываются явно
+        publish_claims({user_id: {'is_active': False} for user_id, _ in batch})
+
+    if count_updated:
+        subject = "Деактивация неактивных пользователей!"
+        message = f"Деактивировано пользователей: {count_updated}\n" + "\n".join(sample)
+        if count_updated > len(sample):
+            message += f"\n… и еще {count_updated - len(sample)}"
+
+        from_email = settings.EMAIL_HOST_USER
+
+        # Письмо отправит отдельная задача: деактивация не ждет SMTP-сервер
+        queue_mail(subject, message, [from_email], from_email)
 
     return count_updated
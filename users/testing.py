@@ -0,0 +1,103 @@
+import socketserver
+import threading
+import time
+
+
+class FakeSMTPServer:
+    """Локальная заглушка SMTP-сервера для тестов и бенчмарков.
+
+    Понимает EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP и QUIT, сохраняет принятые письма
+    и считает соединения. ``latency`` — задержка перед каждым ответом сервера, как при
+    сетевом обмене с настоящим SMTP. В ``failures`` можно заранее положить коды (421, 550 ...),
+    которыми сервер ответит на первые команды MAIL, прежде чем начнет их принимать.
+    """
+
+    def __init__(self, failures=None, latency=0):
+        self.messages = []
+        self.connections = 0
+        self.failures = list(failures or [])
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def host(self):
+        return self.server.server_address[0]
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                with fake.lock:
+                    fake.connections += 1
+                self.reply("220 localhost ESMTP")
+                envelope = None
+                for raw in self.rfile:
+                    command = raw.decode("utf-8", "replace").rstrip("\r\n")
+                    verb = command[:4].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250 localhost")
+                    elif verb == "MAIL":
+                        with fake.lock:
+                            status = fake.failures.pop(0) if fake.failures else 250
+                        if status != 250:
+                            self.reply(f"{status} Rejected")
+                            continue
+                        envelope = {"from": command[10:].strip("<> "), "to": []}
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        envelope["to"].append(command[8:].strip("<> "))
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        for line in self.rfile:
+                            if line in (b".\r\n", b".\n"):
+                                break
+                            lines.append(line)
+                        with fake.lock:
+                            fake.messages.append({**envelope, "data": b"".join(lines).decode("utf-8", "replace")})
+                        envelope = None
+                        self.reply("250 OK")
+                    elif verb in ("RSET", "NOOP"):
+                        envelope = None
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
+
+    def connection_settings(self):
+        """Настройки для ``override_settings``, направляющие SMTP-бэкенд Django на заглушку."""
+        return {
+            "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+            "EMAIL_HOST": self.host,
+            "EMAIL_PORT": self.port,
+            "EMAIL_USE_TLS": False,
+            "EMAIL_USE_SSL": False,
+            "EMAIL_HOST_USER": "",
+            "EMAIL_HOST_PASSWORD": "",
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
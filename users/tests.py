@@ -1,3 +1,279 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from habits.testing import EagerCeleryMixin
+from users import authentication
+from users.deactivation import inactive_users
+from users.mailing import MailDeferred, queue_mass_mail, send_messages
+from users.models import CustomUser
+from users.serializers import CustomUserSerializer
+from users.tasks import check_last_login
+from users.testing import FakeSMTPServer
+
+
+class CustomUserListTestCase(APITestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(
+            username='admin',
+            email='admin@example.com',
+            password='testpass123',
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.groups = [Group.objects.create(name=f'Группа {i}') for i in range(2)]
+        self.url = reverse('users:users')
+
+    def create_users(self, count, start=0):
+        for i in range(start, start + count):
+            user = CustomUser.objects.create_user(
+                username=f'user{i}',
+                email=f'user{i}@example.com',
+                password='testpass123',
+                city='Omsk',
+            )
+            user.groups.set(self.groups[:i % 3])
+
+    def test_matches_model_serializer(self):
+        self.create_users(3)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        users = CustomUser.objects.filter(pk__in=[item['id'] for item in response.data['results']])
+        expected = {item['id']: item for item in CustomUserSerializer(users, many=True).data}
+        for item in response.data['results']:
+            self.assertEqual(item, expected[item['id']])
+            self.assertNotIn('password', item)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.create_users(2)
+        # COUNT, страница пользователей и группы страницы
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'page_size': 2})
+        self.create_users(8, start=2)
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {'page_size': 10})
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=CustomUser.objects.create_user(
+            username='plain',
+            email='plain@example.com',
+            password='testpass123',
+        ))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ClaimsJWTAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._current_claims.clear()
+        self.user = CustomUser.objects.create_user(
+            username='claims',
+            email='claims@example.com',
+            password='testpass123',
+            is_staff=True,
+        )
+        self.habits_url = reverse('habits:habits-list')
+
+    def login(self):
+        response = self.client.post(
+            reverse('users:login'), {'email': 'claims@example.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def get(self, url, access):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_token_carries_user_claims(self):
+        access = AccessToken(self.login()['access'])
+        self.assertIs(access['is_staff'], True)
+        self.assertIs(access['is_active'], True)
+
+    def test_user_is_not_loaded_from_database(self):
+        claims_access = self.login()['access']
+        self.get(self.habits_url, claims_access)  # отметка отзыва запоминается в процессе
+
+        # Без claims пользователь читается из БД, с claims — нет
+        with self.assertNumQueries(3) as captured:
+            self.get(self.habits_url, AccessToken.for_user(self.user))
+        with self.assertNumQueries(len(captured) - 1):
+            response = self.get(self.habits_url, claims_access)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivation_revokes_token(self):
+        access = self.login()['access']
+        self.assertEqual(self.get(self.habits_url, access).status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.get(self.habits_url, access)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['code'], 'token_revoked')
+
+    def test_profile_update_keeps_token(self):
+        access = self.login()['access']
+        self.user.city = 'Omsk'
+        self.user.save()
+        self.assertEqual(self.get(self.habits_url, access).status_code, status.HTTP_200_OK)
+
+    def test_refresh_after_demotion_issues_current_claims(self):
+        tokens = self.login()
+        users_url = reverse('users:users')
+        self.assertEqual(self.get(users_url, tokens['access']).status_code, status.HTTP_200_OK)
+
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.get(users_url, tokens['access']).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(reverse('users:token_refresh'), {'refresh': tokens['refresh']}, format='json')
+        access = response.data['access']
+        self.assertIs(AccessToken(access)['is_staff'], False)
+        self.assertEqual(self.get(users_url, access).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.get(self.habits_url, access).status_code, status.HTTP_200_OK)
+
+    def test_refresh_reads_user_once(self):
+        refresh = self.login()['refresh']
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('users:token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_for_deleted_user_rejected(self):
+        refresh = self.login()['refresh']
+        self.user.delete()
+        response = self.client.post(reverse('users:token_refresh'), {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_connect_telegram_updates_only_sent_field(self):
+        access = self.login()['access']
+        # Права поменялись в обход save(): в токене остался is_staff=True
+        CustomUser.objects.filter(pk=self.user.pk).update(is_staff=False)
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch(
+                reverse('users:connect-telegram'), {'telegram_chat_id': '42'},
+                format='json', HTTP_AUTHORIZATION=f'Bearer {access}'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(captured), 1)
+        self.assertNotIn('is_staff', captured[0]['sql'])
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.telegram_chat_id, self.user.is_staff), ('42', False))
+
+    def test_deferred_fields_loaded_on_access(self):
+        access = AccessToken(self.login()['access'])
+        user = authentication.ClaimsJWTAuthentication().get_user(access)
+        self.assertEqual(user, self.user)
+        self.assertEqual((user.is_staff, user.is_active), (True, True))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'claims@example.com')
+
+
+@override_settings(EMAIL_HOST_USER='admin@example.com', USERS_DEACTIVATION_REPORT_SAMPLE=3)
+class CheckLastLoginTestCase(EagerCeleryMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        authentication._current_claims.clear()
+        now = timezone.now()
+        self.stale = [
+            self.create_user(f'stale{number}', last_login=now - timedelta(days=40) if number % 2 else None)
+            for number in range(5)
+        ]
+        self.recent = self.create_user('recent', last_login=now - timedelta(days=1))
+        self.disabled = self.create_user('disabled', last_login=None, is_active=False)
+
+    def create_user(self, name, **extra):
+        return CustomUser.objects.create_user(username=name, email=f'{name}@example.com', **extra)
+
+    def test_deactivates_in_batches(self):
+        self.assertEqual(check_last_login(batch_size=2), 5)
+        self.assertEqual(
+            set(CustomUser.objects.filter(is_active=False).values_list('pk', flat=True)),
+            {user.pk for user in [*self.stale, self.disabled]},
+        )
+        self.assertTrue(CustomUser.objects.get(pk=self.recent.pk).is_active)
+        # Повторный запуск никого не деактивирует и письмо не отправляет
+        self.assertEqual(check_last_login(batch_size=2), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_report_has_count_and_sample(self):
+        check_last_login(batch_size=2)
+        body = mail.outbox[0].body
+        self.assertIn('Деактивировано пользователей: 5', body)
+        self.assertEqual(sum(f'{user.email}' in body for user in self.stale), 3)
+        self.assertIn('… и еще 2', body)
+
+    def test_tokens_revoked(self):
+        check_last_login()
+        for user in self.stale:
+            self.assertEqual(authentication.current_claims(user.pk), {'is_active': False})
+        self.assertIsNone(authentication.current_claims(self.recent.pk))
+
+    def test_user_who_logged_in_meanwhile_is_kept(self):
+        user = self.stale[0]
+
+        # Пользователь входит после выборки порции, но до UPDATE
+        def login_after_select(*args, **kwargs):
+            ids = list(inactive_users(*args, **kwargs).values_list('pk', flat=True))
+            selected = CustomUser.objects.filter(pk__in=ids)
+            CustomUser.objects.filter(pk=user.pk).update(last_login=timezone.now())
+            return selected
+
+        with patch('users.deactivation.inactive_users', side_effect=login_after_select):
+            self.assertEqual(check_last_login(), 4)
+        self.assertTrue(CustomUser.objects.get(pk=user.pk).is_active)
+        self.assertNotIn(user.email, mail.outbox[0].body)
+
+
+class MailingTestCase(EagerCeleryMixin, SimpleTestCase):
+    def messages(self, count):
+        return [
+            (f'Тема {number}', 'Текст', 'robot@example.com', [f'user{number}@example.com']) for number in range(count)
+        ]
+
+    def test_batch_uses_one_connection(self):
+        with FakeSMTPServer() as server, self.settings(**server.connection_settings()):
+            self.assertEqual(send_messages(self.messages(20)), (20, 0))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual([message['to'] for message in server.messages], [[f'user{n}@example.com'] for n in range(20)])
+
+    def test_rejected_message_is_skipped(self):
+        with FakeSMTPServer(failures=[250, 550]) as server, self.settings(**server.connection_settings()):
+            with self.assertLogs('users.mailing', 'WARNING'):
+                self.assertEqual(send_messages(self.messages(3)), (2, 1))
+        self.assertEqual(len(server.messages), 2)
+
+    def test_transient_error_defers_remaining(self):
+        with FakeSMTPServer(failures=[250, 421]) as server, self.settings(**server.connection_settings()):
+            with self.assertRaises(MailDeferred) as raised:
+                send_messages(self.messages(3))
+        self.assertEqual(raised.exception.sent, 1)
+        remaining = [recipients for *_, recipients in raised.exception.remaining]
+        self.assertEqual(remaining, [['user1@example.com'], ['user2@example.com']])
+
+    def test_task_retries_only_unsent(self):
+        with FakeSMTPServer(failures=[250, 421]) as server, self.settings(**server.connection_settings()):
+            with self.assertLogs('users.mailing', 'WARNING'):
+                self.assertEqual(queue_mass_mail(self.messages(3)), 1)
+        # Первое письмо не отправляется повторно
+        self.assertEqual(len(server.messages), 3)
+        self.assertEqual(server.connections, 2)
+
+    def test_queue_splits_into_batches(self):
+        with FakeSMTPServer() as server, self.settings(**server.connection_settings(), EMAIL_BATCH_SIZE=5):
+            self.assertEqual(queue_mass_mail(self.messages(12)), 3)
+        self.assertEqual(len(server.messages), 12)
+        self.assertEqual(server.connections, 3)
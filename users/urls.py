@@ -1,3 +1,4 @@
+import users.async_views as async_views
 import users.views as views
 from django.urls import path
 from users.apps import UsersConfig
@@ -15,5 +16,7 @@ urlpatterns = [
     path("users/update/<str:email>/", views.CustomUserUpdateAPIView.as_view(), name="users_update"),
     path("users/delete/<str:email>/", views.CustomUserDeleteAPIView.as_view(), name="users_delete"),
 
+    path('async/users/<str:email>/', async_views.user_detail, name='async_users_detail'),
+
     path('api/connect-telegram/', views.ConnectTelegramView.as_view(), name='connect-telegram'),
 ]
@@ -1,6 +1,7 @@
 from rest_framework import generics
 from users.models import CustomUser
 from habits.paginators import MyPagination
+from habits.rows import RowSerializer
 from users.permissions import IsOwnerOrAdmin, IsProfileOwner
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
@@ -42,9 +43,18 @@ class CustomUserDeleteAPIView(generics.DestroyAPIView):
 class CustomUserListAPIView(generics.ListAPIView):
     serializer_class = CustomUserSerializer
     pagination_class = MyPagination
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.order_by('id')
     permission_classes = [IsAdminUser]
 
+    def list(self, request, *args, **kwargs):
+        # Только нужные колонки через .values(); группы страницы — одним запросом, а не на каждого пользователя
+        rows = RowSerializer(self.get_serializer_class(), context=self.get_serializer_context())
+        queryset = rows.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.to_representation(page))
+        return Response(rows.to_representation(queryset))
+
 
 # GET
 class CustomUserDetailAPIView(generics.RetrieveAPIView):
@@ -53,6 +63,12 @@ class CustomUserDetailAPIView(generics.RetrieveAPIView):
     lookup_field = 'email'
     permission_classes = [IsAuthenticated, IsProfileOwner]
 
+    def get_object(self):
+        # Профиль нужен и для выбора сериализатора, и для ответа — читаем его один раз
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
     def get_serializer_class(self):
         if self.request.user == self.get_object():
             return PrivateUserSerializer